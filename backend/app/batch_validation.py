@@ -0,0 +1,192 @@
+"""
+Validate many documents of one kind in a single transaction.
+
+A warehouse wave validates hundreds of deliveries at once. Instead of one
+request, one transaction and one stock lookup per document, the batch endpoints:
+
+- lock all listed documents with one query (in id order) and load their lines with one more;
+- fetch and lock every StockLevel row the batch touches with one query (stock.fetch_stock_levels);
+- check availability in Python, in request order, against running totals: a document
+  is accepted only if its outgoing lines fit in what is left after the documents
+  accepted before it (and after anything they moved in);
+- post all accepted documents with stock.post_document_moves (one upsert, one ledger
+  insert and one counter write for the whole batch) and commit once.
+
+A document that is unknown, already done, canceled or short of stock is reported
+with the same message as its single-document endpoint; the others are still validated.
+The number of statements does not grow with the number of documents.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from . import cache, kpis, models, stock
+
+
+class DocumentKind(NamedTuple):
+    model: type
+    items: object  # The lines relationship, e.g. models.Receipt.receipt_items
+    document_type: str  # For the ledger
+    done_field: str
+    moves: Callable[[object], List[stock.StockMove]]
+    not_found: str
+    already_done: str
+    canceled: str
+    shortage_suffix: str = ""
+
+
+def _receipt_moves(receipt: models.Receipt) -> List[stock.StockMove]:
+    return [
+        stock.StockMove(product_id=item.product_id, warehouse_id=receipt.warehouse_id, change_quantity=item.quantity_received)
+        for item in receipt.receipt_items
+    ]
+
+
+def _delivery_moves(delivery: models.DeliveryOrder) -> List[stock.StockMove]:
+    return [
+        stock.StockMove(product_id=item.product_id, warehouse_id=delivery.warehouse_id, change_quantity=-item.quantity_delivered)
+        for item in delivery.delivery_items
+    ]
+
+
+def _transfer_moves(transfer: models.InternalTransfer) -> List[stock.StockMove]:
+    moves = []
+    for item in transfer.transfer_items:
+        moves.append(stock.StockMove(item.product_id, transfer.from_warehouse_id, -item.quantity, item.from_location_id))
+        moves.append(stock.StockMove(item.product_id, transfer.to_warehouse_id, item.quantity, item.to_location_id))
+    return moves
+
+
+RECEIPTS = DocumentKind(
+    model=models.Receipt,
+    items=models.Receipt.receipt_items,
+    document_type="Receipt",
+    done_field="validated_at",
+    moves=_receipt_moves,
+    not_found="Receipt not found",
+    already_done="Receipt already validated",
+    canceled="Cannot validate a canceled receipt",
+)
+
+DELIVERIES = DocumentKind(
+    model=models.DeliveryOrder,
+    items=models.DeliveryOrder.delivery_items,
+    document_type="Delivery",
+    done_field="validated_at",
+    moves=_delivery_moves,
+    not_found="Delivery order not found",
+    already_done="Delivery order already validated",
+    canceled="Cannot validate a canceled delivery order",
+)
+
+TRANSFERS = DocumentKind(
+    model=models.InternalTransfer,
+    items=models.InternalTransfer.transfer_items,
+    document_type="Internal Transfer",
+    done_field="completed_at",
+    moves=_transfer_moves,
+    not_found="Internal transfer not found",
+    already_done="Transfer already completed",
+    canceled="Cannot complete a canceled transfer",
+    shortage_suffix=" in source warehouse",
+)
+
+
+def validate_documents(db: Session, kind: DocumentKind, document_ids: List[int]) -> dict:
+    """
+    Validate the listed documents and commit. Returns a schemas.DocumentBatchResult dict
+    with one result per listed id, in request order (an id listed twice is reported once).
+    """
+    document_ids = list(dict.fromkeys(document_ids))
+    model = kind.model
+    # Documents are locked in id order, so two batches sharing documents cannot deadlock
+    documents = {
+        document.id: document
+        for document in db.query(model).options(selectinload(kind.items))
+        .filter(model.id.in_(document_ids)).order_by(model.id).with_for_update()
+    }
+
+    errors: Dict[int, str] = {}
+    candidates = []
+    for document_id in document_ids:
+        document = documents.get(document_id)
+        if document is None:
+            errors[document_id] = kind.not_found
+        elif document.status == "Done":
+            errors[document_id] = kind.already_done
+        elif document.status == "Canceled":
+            errors[document_id] = kind.canceled
+        else:
+            candidates.append((document, kind.moves(document)))
+
+    # One locked fetch for every stock row the batch touches
+    levels = stock.fetch_stock_levels(
+        db, [(move.product_id, move.warehouse_id) for _, moves in candidates for move in moves], lock=True
+    )
+    available = {key: level.quantity or 0 for key, level in levels.items()}
+    shortages: Dict[int, tuple] = {}
+    accepted = []
+    for document, moves in candidates:
+        required: Dict[stock.StockKey, int] = {}
+        for move in moves:
+            if move.change_quantity < 0:
+                key = (move.product_id, move.warehouse_id)
+                required[key] = required.get(key, 0) - move.change_quantity
+        shortage = next(
+            ((key, available.get(key, 0), quantity) for key, quantity in required.items() if available.get(key, 0) < quantity),
+            None
+        )
+        if shortage is not None:
+            shortages[document.id] = shortage
+            continue
+        for move in moves:
+            key = (move.product_id, move.warehouse_id)
+            available[key] = available.get(key, 0) + move.change_quantity
+        accepted.append((document, moves))
+
+    if shortages:
+        names = dict(
+            db.query(models.Product.id, models.Product.name)
+            .filter(models.Product.id.in_({key[0] for key, _, _ in shortages.values()}))
+        )
+        for document_id, ((product_id, _), left, quantity) in shortages.items():
+            # Available is what the documents accepted before this one left
+            errors[document_id] = (
+                f"Insufficient stock for product {names.get(product_id, product_id)}{kind.shortage_suffix}. "
+                f"Available: {left}, Required: {quantity}"
+            )
+
+    if accepted:
+        old_statuses = [document.status for document, _ in accepted]
+        now = datetime.utcnow()
+        for document, _ in accepted:
+            document.status = "Done"
+            setattr(document, kind.done_field, now)
+        stock.post_document_moves(
+            db,
+            [stock.DocumentMoves(kind.document_type, document.id, document.created_by, moves) for document, moves in accepted],
+            levels=levels
+        )
+        # Counters last, as on the single-document paths (documents, stock rows, counters)
+        kpis.track_document_statuses(
+            db, [(document, old_status, "Done") for (document, _), old_status in zip(accepted, old_statuses)]
+        )
+        # As for single transfers: incoming lines with a location move existing destination rows there
+        for _, moves in accepted:
+            for move in moves:
+                level = levels.get((move.product_id, move.warehouse_id))
+                if move.change_quantity > 0 and move.location_id and level is not None:
+                    level.location_id = move.location_id
+
+    db.commit()
+    if accepted:
+        cache.invalidate_kpis()
+
+    results = [
+        {"document_id": document_id, "validated": document_id not in errors, "error": errors.get(document_id)}
+        for document_id in document_ids
+    ]
+    validated = sum(result["validated"] for result in results)
+    return {"total": len(results), "validated": validated, "failed": len(results) - validated, "results": results}
@@ -0,0 +1,103 @@
+"""
+Redis response cache for dashboard KPIs.
+
+Entries are keyed by a cache version and the filter combination. Endpoints that
+change stock or documents call `invalidate_kpis` after they commit; bumping the
+version makes every older entry unreachable, and those expire through their TTL.
+Cache errors never fail a request: the KPIs are then computed from the database.
+
+Lookups run on the asyncio Redis client (the dashboard is an async endpoint);
+invalidation and stats are called from sync code and use the sync client.
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+import redis
+
+from . import utils
+
+KPI_CACHE_TTL_SECONDS = int(os.getenv("KPI_CACHE_TTL_SECONDS", "60"))  # 0 disables the cache
+
+VERSION_KEY = "kpis:version"
+HITS_KEY = "kpis:hits"
+MISSES_KEY = "kpis:misses"
+ENTRY_PREFIX = "kpis:entry:"
+
+# Read the version, look up the entry and count the hit or miss in one round trip
+_LOOKUP_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+local value = redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])
+if value then
+    redis.call('INCR', KEYS[2])
+else
+    redis.call('INCR', KEYS[3])
+end
+return {version, value}
+"""
+
+_lookup_script = None
+
+
+def _filter_key(filters: dict) -> str:
+    return "|".join(f"{name}={filters[name] if filters[name] is not None else ''}" for name in sorted(filters))
+
+
+def _entry_key(version: str, filters: dict) -> str:
+    return f"{ENTRY_PREFIX}{version}:{_filter_key(filters)}"
+
+
+async def get_cached_kpis(filters: dict) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Return (version, cached KPIs). The version is passed back to `store_kpis` on a miss;
+    it is None when the cache is disabled or unavailable.
+    """
+    global _lookup_script
+    if KPI_CACHE_TTL_SECONDS <= 0:
+        return None, None
+
+    try:
+        if _lookup_script is None:
+            _lookup_script = utils.async_redis_client.register_script(_LOOKUP_SCRIPT)
+        version, value = await _lookup_script(
+            keys=[VERSION_KEY, HITS_KEY, MISSES_KEY],
+            args=[ENTRY_PREFIX, _filter_key(filters)],
+            client=utils.async_redis_client
+        )
+    except redis.RedisError:
+        return None, None
+
+    return version, json.loads(value) if value else None
+
+
+async def store_kpis(version: Optional[str], filters: dict, kpis: dict):
+    if version is None:
+        return
+    try:
+        await utils.async_redis_client.set(_entry_key(version, filters), json.dumps(kpis), ex=KPI_CACHE_TTL_SECONDS)
+    except redis.RedisError:
+        pass
+
+
+def invalidate_kpis():
+    try:
+        utils.redis_client.incr(VERSION_KEY)
+    except redis.RedisError:
+        # Entries expire through their TTL if the version cannot be bumped
+        pass
+
+
+def kpi_cache_stats() -> dict:
+    try:
+        version, hits, misses = utils.redis_client.mget(VERSION_KEY, HITS_KEY, MISSES_KEY)
+    except redis.RedisError:
+        return {"enabled": KPI_CACHE_TTL_SECONDS > 0, "available": False, "version": None, "hits": 0, "misses": 0}
+
+    return {
+        "enabled": KPI_CACHE_TTL_SECONDS > 0,
+        "available": True,
+        "version": int(version or 0),
+        "hits": int(hits or 0),
+        "misses": int(misses or 0),
+    }
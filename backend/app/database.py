@@ -1,18 +1,79 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
+
+from .db_pool import engine_options
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/stockmaster")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """
+    Map a sync database URL to the same database through its asyncio driver.
+    """
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return str(url.set(drivername=driver)) if driver else str(url)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+_engine_lock = threading.Lock()
+_sync_database = None  # (engine, session factory), created on first use
+_async_database = None
+
+def _sync():
+    global _sync_database
+    if _sync_database is None:
+        with _engine_lock:
+            if _sync_database is None:
+                engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+                _sync_database = (engine, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    return _sync_database
+
+def _async():
+    global _async_database
+    if _async_database is None:
+        with _engine_lock:
+            if _async_database is None:
+                # Async engine for read-heavy routers, so requests waiting on the database do not hold a threadpool slot
+                engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+                _async_database = (engine, sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False))
+    return _async_database
+
+_LAZY_ATTRIBUTES = {
+    "engine": lambda: _sync()[0],
+    "SessionLocal": lambda: _sync()[1],
+    "async_engine": lambda: _async()[0],
+    "AsyncSessionLocal": lambda: _async()[1],
+}
+
+def __getattr__(name):
+    """
+    `engine`, `SessionLocal`, `async_engine` and `AsyncSessionLocal` are created on first
+    access rather than at import: creating an engine imports its database driver, and a
+    worker should not pay for that before it serves a request.
+    """
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 Base = declarative_base()
 
 def get_db():
-    db = SessionLocal()
+    db = _sync()[1]()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with _async()[1]() as db:
+        yield db
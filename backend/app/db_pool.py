@@ -0,0 +1,111 @@
+"""
+Connection pool configuration and checkout metrics.
+
+Pool settings come from the environment so they can be sized per worker:
+
+    DB_POOL_SIZE        connections kept open (default 5)
+    DB_MAX_OVERFLOW     extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT     seconds to wait for a connection before failing (default 30)
+    DB_POOL_PRE_PING    test connections on checkout (default false)
+    DB_POOL_RECYCLE     replace connections older than this many seconds (default -1, never)
+
+The pools record how many checkouts happened and how long they waited for a
+connection, which `pool_status` reports together with the live pool counters.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", False),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+}
+
+
+class CheckoutStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+class _CheckoutTimingMixin:
+    """Records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine.
+    SQLite keeps SQLAlchemy's default pool, which does not take pool sizing arguments.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return dict(POOL_SETTINGS, poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool)
+
+
+def pool_status(pool) -> dict:
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+
+    stats = getattr(pool, "checkout_stats", None)
+    if stats is not None:
+        status.update({
+            "checkouts": stats.checkouts,
+            "checkout_timeouts": stats.timeouts,
+            "checkout_wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "checkout_wait_seconds_max": round(stats.wait_seconds_max, 6),
+        })
+    return status
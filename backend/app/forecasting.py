@@ -0,0 +1,222 @@
+"""
+Reorder points from ledger demand history.
+
+For each warehouse, the delivered quantity per (product, day) over the last
+FORECAST_HISTORY_DAYS is loaded into a products x days NumPy matrix. Then,
+for every series of the warehouse in one vectorized pass:
+
+    daily demand     simple exponential smoothing (FORECAST_METHOD=ses; one
+                     matrix-vector product) or a moving average (FORECAST_METHOD=moving_average)
+    safety stock     z(service level) * std(daily demand) * sqrt(lead time)
+    reorder point    ceil(daily demand * lead time + safety stock)
+
+Demand is what left through deliveries; transfers move stock between warehouses
+and adjustments correct counts, so neither is counted. Warehouses are forecast
+in parallel by a process pool. Results are written back by the parent process,
+one transaction per warehouse. Only changed reorder points are written, in
+bulk, and the dashboard counters are updated through kpis.track_stock_changes.
+
+    FORECAST_HISTORY_DAYS       days of history per series (default 90)
+    FORECAST_METHOD             "ses" (default) or "moving_average"
+    FORECAST_ALPHA              smoothing factor for ses (default 0.2)
+    FORECAST_WINDOW_DAYS        window for moving_average (default 28)
+    FORECAST_LEAD_TIME_DAYS     replenishment lead time (default 7)
+    FORECAST_SERVICE_LEVEL      chance of no stock-out during the lead time (default 0.95)
+
+forecast_reorder_points.py runs the job.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, bindparam, column, create_engine, func, select, update, values
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from . import cache, kpis, models
+
+DEMAND_DOCUMENT_TYPES = ("Delivery",)
+WRITE_BATCH_SIZE = 5000
+
+
+class ForecastSettings(NamedTuple):
+    history_days: int = int(os.getenv("FORECAST_HISTORY_DAYS", "90"))
+    method: str = os.getenv("FORECAST_METHOD", "ses")
+    alpha: float = float(os.getenv("FORECAST_ALPHA", "0.2"))
+    window_days: int = int(os.getenv("FORECAST_WINDOW_DAYS", "28"))
+    lead_time_days: float = float(os.getenv("FORECAST_LEAD_TIME_DAYS", "7"))
+    service_level: float = float(os.getenv("FORECAST_SERVICE_LEVEL", "0.95"))
+
+
+def load_daily_demand(conn: Connection, warehouse_id: int, as_of: datetime, history_days: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily demand of every stocked product of the warehouse for the `history_days` days before `as_of`.
+    Returns (product ids, sorted; float matrix of shape (products, days), oldest day first).
+    """
+    start = as_of - timedelta(days=history_days)
+    product_ids = np.array(conn.execute(
+        select(models.StockLevel.product_id).filter(models.StockLevel.warehouse_id == warehouse_id).order_by(models.StockLevel.product_id)
+    ).scalars().all(), dtype=np.int64)
+    demand = np.zeros((len(product_ids), history_days), dtype=np.float64)
+
+    entry = models.StockLedgerEntry
+    day = func.date(entry.timestamp)
+    rows = conn.execute(
+        select(entry.product_id, day, func.sum(-entry.change_quantity))
+        .filter(
+            entry.warehouse_id == warehouse_id,
+            entry.timestamp >= start,
+            entry.timestamp < as_of,
+            entry.document_type.in_(DEMAND_DOCUMENT_TYPES)
+        )
+        .group_by(entry.product_id, day)
+    ).all()
+    if not rows or not len(product_ids):
+        return product_ids, demand
+
+    row_products, row_days, quantities = zip(*rows)
+    # date() gives ISO strings on SQLite and dates on PostgreSQL; datetime64 parses both
+    day_index = (np.array(row_days, dtype="datetime64[D]") - np.datetime64(start.date(), "D")).astype(np.int64)
+    positions = np.searchsorted(product_ids, np.array(row_products, dtype=np.int64))
+    known = (positions < len(product_ids)) & (product_ids[np.minimum(positions, len(product_ids) - 1)] == row_products)
+    known &= (day_index >= 0) & (day_index < history_days)
+    np.add.at(demand, (positions[known], day_index[known]), np.array(quantities, dtype=np.float64)[known])
+    return product_ids, demand
+
+
+def forecast_demand(demand: np.ndarray, settings: ForecastSettings) -> Tuple[np.ndarray, np.ndarray]:
+    """Forecast daily demand and its standard deviation for every row of the (series, days) matrix."""
+    days = demand.shape[1]
+    if settings.method == "moving_average":
+        forecast = demand[:, -min(settings.window_days, days):].mean(axis=1)
+    elif settings.method == "ses":
+        # Exponential smoothing unrolled: the level after the last day is a weighted sum of the
+        # days (weight alpha * (1 - alpha)^age) plus the initial level, taken as the series mean
+        alpha = settings.alpha
+        weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+        forecast = demand @ weights + (1 - alpha) ** days * demand.mean(axis=1)
+    else:
+        raise ValueError(f"Unknown forecast method: {settings.method}")
+    spread = demand.std(axis=1, ddof=1) if days > 1 else np.zeros(len(demand))
+    return forecast, spread
+
+
+def reorder_points(forecast: np.ndarray, spread: np.ndarray, settings: ForecastSettings) -> np.ndarray:
+    z = NormalDist().inv_cdf(settings.service_level)
+    safety_stock = z * spread * math.sqrt(settings.lead_time_days)
+    return np.ceil(forecast * settings.lead_time_days + safety_stock).astype(np.int64)
+
+
+def forecast_warehouse(conn: Connection, warehouse_id: int, settings: ForecastSettings, as_of: datetime):
+    """Returns (warehouse_id, product ids, suggested reorder points)."""
+    product_ids, demand = load_daily_demand(conn, warehouse_id, as_of, settings.history_days)
+    return warehouse_id, product_ids, reorder_points(*forecast_demand(demand, settings), settings)
+
+
+def _forecast_worker(database_url: str, warehouse_id: int, settings: ForecastSettings, as_of: datetime):
+    # Runs in a pool process: engines and connections cannot be shared with the parent
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            return forecast_warehouse(conn, warehouse_id, settings, as_of)
+    finally:
+        engine.dispose()
+
+
+def _write_reorder_points(db: Session, updates: List[Tuple[int, int]]):
+    """Set reorder_point for (stock level id, reorder point) pairs."""
+    table = models.StockLevel.__table__
+    for start in range(0, len(updates), WRITE_BATCH_SIZE):
+        batch = updates[start:start + WRITE_BATCH_SIZE]
+        if db.get_bind().dialect.name == "postgresql":
+            # One UPDATE ... FROM (VALUES ...) per batch instead of a statement per row
+            suggested = values(column("id", Integer), column("reorder_point", Integer), name="suggested").data(batch)
+            db.execute(update(table).where(table.c.id == suggested.c.id).values(reorder_point=suggested.c.reorder_point))
+        else:
+            db.execute(
+                update(table).where(table.c.id == bindparam("stock_level_id")).values(reorder_point=bindparam("suggested")),
+                [{"stock_level_id": row_id, "suggested": point} for row_id, point in batch]
+            )
+
+
+def apply_reorder_points(db: Session, warehouse_id: int, product_ids: np.ndarray, points: np.ndarray) -> int:
+    """
+    Write the suggested reorder points of one warehouse and record the effect on the
+    low-stock counters. Returns the number of stock levels changed; the caller commits.
+    """
+    suggested = dict(zip(product_ids.tolist(), points.tolist()))
+    level = models.StockLevel
+    # Locked in the same order as stock.fetch_stock_levels, so document validations cannot deadlock with this
+    rows = db.execute(
+        select(level.id, level.product_id, level.quantity, level.reorder_point)
+        .filter(level.warehouse_id == warehouse_id)
+        .order_by(level.product_id, level.warehouse_id, level.id)
+        .with_for_update()
+    ).all()
+
+    updates, changes = [], []
+    for row in rows:
+        point = suggested.get(row.product_id)
+        if point is None or point == row.reorder_point:
+            continue
+        updates.append((row.id, point))
+        changes.append(kpis.StockChange(row.product_id, warehouse_id, row.quantity, row.reorder_point, row.quantity, point))
+
+    _write_reorder_points(db, updates)
+    for start in range(0, len(changes), WRITE_BATCH_SIZE):
+        kpis.track_stock_changes(db, changes[start:start + WRITE_BATCH_SIZE])
+    return len(updates)
+
+
+def run(
+    engine: Engine,
+    settings: ForecastSettings = ForecastSettings(),
+    as_of: Optional[datetime] = None,
+    workers: Optional[int] = None,
+    warehouse_ids: Optional[Iterable[int]] = None,
+    dry_run: bool = False
+) -> Dict[int, int]:
+    """
+    Forecast and update the reorder points of every warehouse (or `warehouse_ids`).
+    `as_of` ends the history window (default: today 00:00 UTC); workers=1 forecasts in this process.
+    Returns the number of reorder points changed per warehouse.
+    """
+    as_of = as_of or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    if warehouse_ids is None:
+        with engine.connect() as conn:
+            warehouse_ids = conn.execute(select(models.StockLevel.warehouse_id).distinct()).scalars().all()
+    warehouse_ids = sorted(warehouse_ids)
+
+    changed: Dict[int, int] = {}
+
+    def apply(result):
+        warehouse_id, product_ids, points = result
+        with Session(engine) as db:
+            changed[warehouse_id] = apply_reorder_points(db, warehouse_id, product_ids, points)
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+
+    if workers == 1 or len(warehouse_ids) <= 1:
+        for warehouse_id in warehouse_ids:
+            with engine.connect() as conn:
+                result = forecast_warehouse(conn, warehouse_id, settings, as_of)
+            apply(result)
+    else:
+        database_url = engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_forecast_worker, database_url, warehouse_id, settings, as_of) for warehouse_id in warehouse_ids]
+            # Each warehouse is written as soon as its forecast is ready, while the others are still computing
+            for future in as_completed(futures):
+                apply(future.result())
+
+    if not dry_run and any(changed.values()):
+        cache.invalidate_kpis()
+    return changed
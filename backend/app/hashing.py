@@ -0,0 +1,89 @@
+"""
+Dedicated worker pool for bcrypt.
+
+Password and OTP hashing costs 100-300 ms of CPU per call at the default cost
+factor. Running it in the request threadpool lets a burst of logins take every
+thread and stall unrelated endpoints, so the auth endpoints await it on this
+pool instead. Configuration comes from the environment:
+
+    HASH_POOL_KIND      "thread" (default) or "process"; bcrypt releases the GIL,
+                        so threads already use several cores
+    HASH_WORKERS        pool size (default: number of CPUs)
+    HASH_QUEUE_LIMIT    jobs allowed to wait for a worker before requests are
+                        rejected with 503 (default: 4 per worker)
+    BCRYPT_ROUNDS       bcrypt cost factor for new hashes (app/utils.py, default 12)
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+from . import utils
+
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 4)))
+
+_executor: Optional[Executor] = None
+_in_flight = 0  # Only touched from the event loop thread
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if HASH_POOL_KIND == "process":
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def _run(func: Callable, *args):
+    global _in_flight
+    if _in_flight >= HASH_WORKERS + HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"}
+        )
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(utils.verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run(utils.get_password_hash, password)
+
+
+async def hash_otp(otp_code: str) -> str:
+    return await _run(utils.hash_otp, otp_code)
+
+
+async def verify_otp(plain_otp: str, hashed_otp: str) -> bool:
+    return await _run(utils.verify_otp, plain_otp, hashed_otp)
+
+
+def pool_status() -> dict:
+    return {
+        "kind": HASH_POOL_KIND,
+        "workers": HASH_WORKERS,
+        "queue_limit": HASH_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "bcrypt_rounds": utils.BCRYPT_ROUNDS,
+    }
@@ -0,0 +1,220 @@
+"""
+Incrementally maintained dashboard counters.
+
+Every stock or document change records its effect on the kpi_counters row of the
+affected (warehouse, category) in the same transaction, so the dashboard reads a
+few counter rows instead of scanning stock_levels. `rebuild_counters` recomputes
+the table from scratch to repair drift (see rebuild_kpis.py).
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+PENDING_STATUSES = ["Draft", "Waiting", "Ready"]
+
+# Category key for products without a category and for per-warehouse document counts
+NO_CATEGORY = 0
+
+COUNTER_COLUMNS = [
+    "total_quantity",
+    "low_stock_items",
+    "out_of_stock_items",
+    "pending_receipts",
+    "pending_deliveries",
+    "transfers_out_scheduled",
+    "transfers_in_scheduled",
+]
+
+CounterKey = Tuple[int, int]  # (warehouse_id, category_id)
+
+
+class StockChange(NamedTuple):
+    product_id: int
+    warehouse_id: int
+    old_quantity: Optional[int]  # None if the stock row did not exist
+    old_reorder_point: Optional[int]
+    new_quantity: Optional[int]
+    new_reorder_point: Optional[int]
+
+
+def stock_counts(quantity: Optional[int], reorder_point: Optional[int]) -> Tuple[int, int, int]:
+    """
+    Contribution of one stock row to (total_quantity, low_stock_items, out_of_stock_items),
+    using the same conditions as the dashboard queries.
+    """
+    if quantity is None:
+        return 0, 0, 0
+    is_low = reorder_point is not None and 0 < quantity <= reorder_point
+    return quantity, int(is_low), int(quantity == 0)
+
+
+def _add(deltas: Dict[CounterKey, Dict[str, int]], key: CounterKey, column: str, delta: int):
+    if delta:
+        row = deltas.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+        row[column] += delta
+
+
+def _add_stock(deltas, key: CounterKey, old: Tuple[int, int, int], new: Tuple[int, int, int], sign: int = 1):
+    for column, before, after in zip(COUNTER_COLUMNS[:3], old, new):
+        _add(deltas, key, column, sign * (after - before))
+
+
+def apply_counter_deltas(db: Session, deltas: Dict[CounterKey, Dict[str, int]]):
+    """
+    Add the deltas to their counter rows, creating rows as needed.
+    Rows are written in key order so concurrent transactions lock them in the same order.
+    """
+    if not deltas:
+        return
+
+    table = models.KPICounter.__table__
+    rows = [
+        {"warehouse_id": warehouse_id, "category_id": category_id, **deltas[(warehouse_id, category_id)]}
+        for warehouse_id, category_id in sorted(deltas)
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.warehouse_id, table.c.category_id],
+            set_={column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        key_filter = and_(table.c.warehouse_id == row["warehouse_id"], table.c.category_id == row["category_id"])
+        result = db.execute(
+            table.update().where(key_filter).values({column: table.c[column] + row[column] for column in COUNTER_COLUMNS})
+        )
+        if result.rowcount == 0:
+            db.execute(table.insert(), row)
+
+
+def _category_ids(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    rows = db.query(models.Product.id, models.Product.category_id).filter(models.Product.id.in_(product_ids))
+    return {product_id: category_id or NO_CATEGORY for product_id, category_id in rows}
+
+
+def track_stock_changes(db: Session, changes: Iterable[StockChange]):
+    """
+    Record the effect of stock row changes on the counters of their (warehouse, category).
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    categories = _category_ids(db, [change.product_id for change in changes])
+    deltas: Dict[CounterKey, Dict[str, int]] = {}
+    for change in changes:
+        key = (change.warehouse_id, categories.get(change.product_id, NO_CATEGORY))
+        _add_stock(
+            deltas,
+            key,
+            stock_counts(change.old_quantity, change.old_reorder_point),
+            stock_counts(change.new_quantity, change.new_reorder_point)
+        )
+    apply_counter_deltas(db, deltas)
+
+
+def track_category_change(db: Session, product_id: int, old_category_id: Optional[int], new_category_id: Optional[int]):
+    """
+    Move the stock counts of a product from its old category to its new one.
+    """
+    old_category_id = old_category_id or NO_CATEGORY
+    new_category_id = new_category_id or NO_CATEGORY
+    if old_category_id == new_category_id:
+        return
+
+    deltas: Dict[CounterKey, Dict[str, int]] = {}
+    levels = db.query(
+        models.StockLevel.warehouse_id, models.StockLevel.quantity, models.StockLevel.reorder_point
+    ).filter(models.StockLevel.product_id == product_id)
+    for warehouse_id, quantity, reorder_point in levels:
+        counts = stock_counts(quantity, reorder_point)
+        _add_stock(deltas, (warehouse_id, old_category_id), counts, (0, 0, 0))
+        _add_stock(deltas, (warehouse_id, new_category_id), (0, 0, 0), counts)
+    apply_counter_deltas(db, deltas)
+
+
+def track_document_status(db: Session, document, old_status: Optional[str], new_status: Optional[str]):
+    """
+    Record a document being created (old_status None) or changing status.
+    Only transitions into or out of a pending status change the counters.
+    """
+    track_document_statuses(db, [(document, old_status, new_status)])
+
+
+def track_document_statuses(db: Session, transitions: Iterable[Tuple[object, Optional[str], Optional[str]]]):
+    """
+    Record several (document, old_status, new_status) transitions with one counter write.
+    """
+    deltas: Dict[CounterKey, Dict[str, int]] = {}
+    for document, old_status, new_status in transitions:
+        delta = int(new_status in PENDING_STATUSES) - int(old_status in PENDING_STATUSES)
+        if not delta:
+            continue
+        if isinstance(document, models.Receipt):
+            _add(deltas, (document.warehouse_id, NO_CATEGORY), "pending_receipts", delta)
+        elif isinstance(document, models.DeliveryOrder):
+            _add(deltas, (document.warehouse_id, NO_CATEGORY), "pending_deliveries", delta)
+        elif isinstance(document, models.InternalTransfer):
+            _add(deltas, (document.from_warehouse_id, NO_CATEGORY), "transfers_out_scheduled", delta)
+            _add(deltas, (document.to_warehouse_id, NO_CATEGORY), "transfers_in_scheduled", delta)
+    apply_counter_deltas(db, deltas)
+
+
+def rebuild_counters(db: Session):
+    """
+    Recompute kpi_counters from stock_levels and the document tables.
+    On PostgreSQL the table is locked for the rest of the transaction so concurrent
+    updates wait for the rebuild instead of being lost. The caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE kpi_counters IN EXCLUSIVE MODE"))
+
+    deltas: Dict[CounterKey, Dict[str, int]] = {}
+
+    category_id = func.coalesce(models.Product.category_id, NO_CATEGORY)
+    stock_rows = db.query(
+        models.StockLevel.warehouse_id,
+        category_id,
+        func.coalesce(func.sum(models.StockLevel.quantity), 0),
+        func.count().filter(
+            and_(
+                models.StockLevel.quantity <= models.StockLevel.reorder_point,
+                models.StockLevel.quantity > 0
+            )
+        ),
+        func.count().filter(models.StockLevel.quantity == 0)
+    ).outerjoin(
+        models.Product, models.Product.id == models.StockLevel.product_id
+    ).group_by(models.StockLevel.warehouse_id, category_id)
+    for warehouse_id, category, total_quantity, low_stock_items, out_of_stock_items in stock_rows:
+        _add_stock(deltas, (warehouse_id, category), (0, 0, 0), (total_quantity, low_stock_items, out_of_stock_items))
+
+    document_counts = [
+        (models.Receipt.warehouse_id, models.Receipt.status, "pending_receipts"),
+        (models.DeliveryOrder.warehouse_id, models.DeliveryOrder.status, "pending_deliveries"),
+        (models.InternalTransfer.from_warehouse_id, models.InternalTransfer.status, "transfers_out_scheduled"),
+        (models.InternalTransfer.to_warehouse_id, models.InternalTransfer.status, "transfers_in_scheduled"),
+    ]
+    for warehouse_column, status_column, counter in document_counts:
+        rows = db.query(warehouse_column, func.count()).filter(
+            status_column.in_(PENDING_STATUSES)
+        ).group_by(warehouse_column)
+        for warehouse_id, count in rows:
+            _add(deltas, (warehouse_id, NO_CATEGORY), counter, count)
+
+    db.query(models.KPICounter).delete(synchronize_session=False)
+    apply_counter_deltas(db, {key: row for key, row in deltas.items() if key[0] is not None})
@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from . import models
-from .routers import auth, dashboard, products, receipts, deliveries, transfers, adjustments, ledger
+from .pagination import NEXT_CURSOR_HEADER
+from . import hashing
+from .metrics import MetricsMiddleware
+from .query_stats import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryStatsMiddleware
+from .routers import auth, dashboard, products, receipts, deliveries, transfers, adjustments, ledger, stock, monitoring, metrics
 
 app = FastAPI()
 
@@ -13,11 +15,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER],
 )
 
-@app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+app.add_middleware(QueryStatsMiddleware)
+# Outermost, so the latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    hashing.shutdown()
 
 app.include_router(auth.router)
 app.include_router(dashboard.router)
@@ -27,6 +34,9 @@ app.include_router(deliveries.router)
 app.include_router(transfers.router)
 app.include_router(adjustments.router)
 app.include_router(ledger.router)
+app.include_router(stock.router)
+app.include_router(monitoring.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def read_root():
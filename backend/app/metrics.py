@@ -0,0 +1,134 @@
+"""
+Request metrics in Prometheus text format.
+
+`MetricsMiddleware` counts requests and observes their latency per route
+template (e.g. /receipts/{receipt_id}/validate), method and status. It is plain
+ASGI middleware and only ever runs on the event loop thread, so the counters
+are ordinary integers updated without locks; `render` also runs on the event
+loop (GET /metrics is async) and therefore reads a consistent snapshot.
+Histogram observations increment a single bucket and are made cumulative when
+rendered.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"  # 404s are not labeled by path, which would be unbounded
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], _Histogram] = {}
+
+    def record(self, method: str, route: str, status_code: int, seconds: float):
+        key = (method, route, status_code)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = _Histogram()
+        histogram.observe(seconds)
+
+    def clear(self):
+        self.requests.clear()
+        self.latency.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._route_templates: Dict[object, str] = {}
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if not self._route_templates:
+            self._route_templates = {route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")}
+        return self._route_templates.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+        request_metrics.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_metrics.in_flight -= 1
+            request_metrics.record(scope["method"], self._route_template(scope), status_code, time.perf_counter() - start)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples):
+        """`samples` is a list of (suffix, labels dict, value)."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            self.lines.append(f"{name}{suffix}{_labels(**labels) if labels else ''} {_number(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_request_metrics(writer: MetricsWriter, metrics: RequestMetrics = request_metrics):
+    writer.metric("http_requests_in_flight", "gauge", "Requests currently being handled.", [("", {}, metrics.in_flight)])
+    writer.metric("http_requests_total", "counter", "Requests handled, by route template, method and status.", [
+        ("", {"method": method, "route": route, "status": status_code}, count)
+        for (method, route, status_code), count in sorted(metrics.requests.items())
+    ])
+
+    samples = []
+    for (method, route), histogram in sorted(metrics.latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.buckets):
+            cumulative += count
+            samples.append(("_bucket", {"method": method, "route": route, "le": bound}, cumulative))
+        samples.append(("_sum", {"method": method, "route": route}, histogram.sum))
+        samples.append(("_count", {"method": method, "route": route}, histogram.count))
+    writer.metric("http_request_duration_seconds", "histogram", "Request latency, by route template and method.", samples)
@@ -0,0 +1,108 @@
+"""
+Idempotent schema steps for databases created by earlier versions.
+
+`Base.metadata.create_all` only creates missing tables, so indexes added to
+tables that already exist have to be created here.
+
+The API does not run these on startup; run them once per deploy, before
+starting the workers:
+
+    python -m app.migrations
+"""
+
+from sqlalchemy import Column, func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from . import kpis, models
+from . import database
+from .database import Base
+
+
+def merge_duplicate_stock_levels(engine: Engine) -> int:
+    """
+    Merge StockLevel rows that share a (product_id, warehouse_id) so the unique index
+    uq_stock_levels_product_warehouse can be created. Must run before `create_missing_indexes`.
+    The oldest row is kept with the summed quantity; its reorder point and location are kept,
+    falling back to the first duplicate that has a location. Returns the number of rows removed.
+    """
+    with Session(engine) as db:
+        keys = db.query(models.StockLevel.product_id, models.StockLevel.warehouse_id).group_by(
+            models.StockLevel.product_id, models.StockLevel.warehouse_id
+        ).having(func.count() > 1).all()
+        if not keys:
+            return 0
+
+        removed = 0
+        for product_id, warehouse_id in keys:
+            rows = db.query(models.StockLevel).filter(
+                models.StockLevel.product_id == product_id,
+                models.StockLevel.warehouse_id == warehouse_id
+            ).order_by(models.StockLevel.id).all()
+            keep, duplicates = rows[0], rows[1:]
+            keep.quantity = sum(row.quantity or 0 for row in rows)
+            if keep.location_id is None:
+                keep.location_id = next((row.location_id for row in duplicates if row.location_id is not None), None)
+            for row in duplicates:
+                db.delete(row)
+            removed += len(duplicates)
+
+        # Low / out of stock counts were per row
+        db.flush()
+        kpis.rebuild_counters(db)
+        db.commit()
+        return removed
+
+
+def create_missing_indexes(engine: Engine):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if all(isinstance(expression, Column) for expression in index.expressions):
+                index.create(bind=engine, checkfirst=True)
+            else:
+                # Reflection skips expression indexes, so checkfirst cannot see them
+                ddl = str(CreateIndex(index).compile(bind=engine)).replace("INDEX ", "INDEX IF NOT EXISTS ", 1)
+                with engine.begin() as conn:
+                    conn.execute(text(ddl))
+
+
+def backfill_kpi_counters(engine: Engine):
+    """
+    Fill kpi_counters once when it is empty, e.g. right after the table was added
+    to an existing database. Later drift is repaired with rebuild_kpis.py.
+    """
+    with Session(engine) as db:
+        if db.query(models.KPICounter).first() is None:
+            kpis.rebuild_counters(db)
+            db.commit()
+
+
+def create_trigram_indexes(engine: Engine):
+    """
+    GIN trigram indexes for product search (app/search.py). PostgreSQL only; they are
+    not part of the model metadata because they need the pg_trgm extension first.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_sku_code_trgm ON products USING gin (sku_code gin_trgm_ops)"))
+
+
+def migrate(engine: Engine):
+    """
+    Bring the database up to date: create missing tables and indexes, backfill the
+    KPI counters and, on PostgreSQL, the trigram search indexes.
+    """
+    Base.metadata.create_all(bind=engine)
+    merge_duplicate_stock_levels(engine)
+    create_missing_indexes(engine)
+    create_trigram_indexes(engine)
+    backfill_kpi_counters(engine)
+
+
+if __name__ == "__main__":
+    migrate(database.engine)
+    print("Database schema is up to date")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Float, Index, and_
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -82,6 +82,10 @@ class Location(Base):
 
 class StockLevel(Base):
     __tablename__ = "stock_levels"
+    __table_args__ = (
+        # One row per product and warehouse; location_id is the row's current location
+        Index("uq_stock_levels_product_warehouse", "product_id", "warehouse_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
@@ -93,6 +97,19 @@ class StockLevel(Base):
     warehouse = relationship("Warehouse", back_populates="stock_levels")
     location = relationship("Location", back_populates="stock_levels")
 
+# Low stock as counted on the dashboard
+LOW_STOCK_CONDITION = and_(StockLevel.quantity > 0, StockLevel.quantity <= StockLevel.reorder_point)
+
+# Partial index of the low-stock rows only, largest shortfall first, for GET /stock/low. The
+# database keeps it current on every stock write, and it stays as small as the low-stock set.
+Index(
+    "ix_stock_levels_low_stock_shortfall",
+    StockLevel.reorder_point - StockLevel.quantity,
+    StockLevel.id,
+    postgresql_where=LOW_STOCK_CONDITION,
+    sqlite_where=LOW_STOCK_CONDITION,
+)
+
 class Supplier(Base):
     __tablename__ = "suppliers"
     id = Column(Integer, primary_key=True, index=True)
@@ -102,6 +119,11 @@ class Supplier(Base):
 
 class Receipt(Base):
     __tablename__ = "receipts"
+    __table_args__ = (
+        # Keyset pagination indexes for the list endpoint, newest first
+        Index("ix_receipts_created_at_id", "created_at", "id"),
+        Index("ix_receipts_warehouse_created_at_id", "warehouse_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     document_type = Column(String, default="Receipt")
     supplier_id = Column(Integer, ForeignKey("suppliers.id"))
@@ -128,6 +150,11 @@ class ReceiptItem(Base):
 
 class DeliveryOrder(Base):
     __tablename__ = "delivery_orders"
+    __table_args__ = (
+        # Keyset pagination indexes for the list endpoint, newest first
+        Index("ix_delivery_orders_created_at_id", "created_at", "id"),
+        Index("ix_delivery_orders_warehouse_created_at_id", "warehouse_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     document_type = Column(String, default="Delivery")
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
@@ -152,6 +179,12 @@ class DeliveryOrderItem(Base):
 
 class InternalTransfer(Base):
     __tablename__ = "internal_transfers"
+    __table_args__ = (
+        # Keyset pagination indexes for the list endpoint, newest first
+        Index("ix_internal_transfers_created_at_id", "created_at", "id"),
+        Index("ix_internal_transfers_from_warehouse_created_at_id", "from_warehouse_id", "created_at", "id"),
+        Index("ix_internal_transfers_to_warehouse_created_at_id", "to_warehouse_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     document_type = Column(String, default="Internal Transfer")
     from_warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
@@ -182,6 +215,11 @@ class InternalTransferItem(Base):
 
 class StockAdjustment(Base):
     __tablename__ = "stock_adjustments"
+    __table_args__ = (
+        # Keyset pagination indexes for the list endpoint, newest first
+        Index("ix_stock_adjustments_created_at_id", "created_at", "id"),
+        Index("ix_stock_adjustments_warehouse_created_at_id", "warehouse_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     document_type = Column(String, default="Adjustment")
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
@@ -209,6 +247,14 @@ class StockAdjustmentItem(Base):
 
 class StockLedgerEntry(Base):
     __tablename__ = "stock_ledger_entries"
+    __table_args__ = (
+        # Keyset pagination indexes: each filter combination of GET /ledger/ ends in (timestamp, id)
+        Index("ix_stock_ledger_entries_timestamp_id", "timestamp", "id"),
+        Index("ix_stock_ledger_entries_product_warehouse_timestamp_id", "product_id", "warehouse_id", "timestamp", "id"),
+        Index("ix_stock_ledger_entries_product_timestamp_id", "product_id", "timestamp", "id"),
+        Index("ix_stock_ledger_entries_warehouse_timestamp_id", "warehouse_id", "timestamp", "id"),
+        Index("ix_stock_ledger_entries_document", "document_type", "document_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
@@ -224,3 +270,20 @@ class StockLedgerEntry(Base):
     warehouse = relationship("Warehouse")
     location = relationship("Location")
     created_by_user = relationship("User", back_populates="ledger_entries")
+
+class KPICounter(Base):
+    """
+    Dashboard counters per warehouse and product category, maintained by app/kpis.py
+    in the same transaction as every stock or document change.
+    Pending document counts are per warehouse and are kept on the NO_CATEGORY (0) row.
+    """
+    __tablename__ = "kpi_counters"
+    warehouse_id = Column(Integer, primary_key=True, autoincrement=False)
+    category_id = Column(Integer, primary_key=True, autoincrement=False)
+    total_quantity = Column(BigInteger, default=0, nullable=False)
+    low_stock_items = Column(Integer, default=0, nullable=False)
+    out_of_stock_items = Column(Integer, default=0, nullable=False)
+    pending_receipts = Column(Integer, default=0, nullable=False)
+    pending_deliveries = Column(Integer, default=0, nullable=False)
+    transfers_out_scheduled = Column(Integer, default=0, nullable=False)
+    transfers_in_scheduled = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,121 @@
+"""
+Password-reset OTP lifecycle and rate limiting in Redis.
+
+Requests are rate limited per email and per client IP with sliding windows
+(one sorted set of request timestamps per key), checked and recorded for both
+keys in one Lua script, so a flood is turned away before it reaches the
+database. An issued OTP is a Redis hash holding the bcrypt hash of the code and
+the number of verification attempts; it expires after OTP_TTL_SECONDS, allows
+at most OTP_MAX_ATTEMPTS verifications, and is consumed atomically on success
+so it can be used only once.
+
+Settings (environment):
+
+    OTP_TTL_SECONDS             lifetime of an OTP (default 300)
+    OTP_MAX_ATTEMPTS            verification attempts allowed per OTP (default 5)
+    OTP_EMAIL_LIMIT / _WINDOW   OTP requests per email per window in seconds (default 1 per 60)
+    OTP_IP_LIMIT / _WINDOW      OTP requests per client IP per window in seconds (default 10 per 60)
+    OTP_AUDIT_LOG               also record issued OTPs in the otps table (default false)
+"""
+
+import os
+import time
+import uuid
+from typing import Optional
+
+from . import utils
+
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_EMAIL_LIMIT = int(os.getenv("OTP_EMAIL_LIMIT", "1"))
+OTP_EMAIL_WINDOW_SECONDS = int(os.getenv("OTP_EMAIL_WINDOW", "60"))
+OTP_IP_LIMIT = int(os.getenv("OTP_IP_LIMIT", "10"))
+OTP_IP_WINDOW_SECONDS = int(os.getenv("OTP_IP_WINDOW", "60"))
+OTP_AUDIT_LOG = os.getenv("OTP_AUDIT_LOG", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Returns 0 when allowed, otherwise 1 + the index of the first key over its limit.
+# Nothing is recorded for a rejected request, so retrying does not extend the block.
+_RATE_LIMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[2 * i + 2]) then
+        return i
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, ARGV[2 * i + 1])
+end
+return 0
+"""
+
+# Count a verification attempt and return the stored hash; nil if there is no OTP
+# or its attempts are used up (the OTP is then deleted)
+_ATTEMPT_SCRIPT = """
+local hash = redis.call('HGET', KEYS[1], 'hash')
+if not hash then
+    return nil
+end
+if redis.call('HINCRBY', KEYS[1], 'attempts', 1) > tonumber(ARGV[1]) then
+    redis.call('DEL', KEYS[1])
+    return nil
+end
+return hash
+"""
+
+# Delete the OTP only if it is still the one that was verified
+_CONSUME_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'hash') == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_scripts = {}
+
+
+async def _run_script(source: str, keys: list, args: list):
+    if source not in _scripts:
+        _scripts[source] = utils.async_redis_client.register_script(source)
+    return await _scripts[source](keys=keys, args=args, client=utils.async_redis_client)
+
+
+def otp_key(email: str) -> str:
+    return f"otp:{email}"
+
+
+async def check_rate_limit(email: str, client_ip: Optional[str]) -> Optional[str]:
+    """
+    Record an OTP request. Returns None if it is allowed, otherwise "email" or "ip"
+    for the limit that was hit.
+    """
+    limits = [(f"otp:rate:email:{email.lower()}", OTP_EMAIL_WINDOW_SECONDS, OTP_EMAIL_LIMIT)]
+    if client_ip:
+        limits.append((f"otp:rate:ip:{client_ip}", OTP_IP_WINDOW_SECONDS, OTP_IP_LIMIT))
+
+    args = [int(time.time() * 1000), uuid.uuid4().hex]
+    for _, window, limit in limits:
+        args += [window * 1000, limit]
+    rejected = await _run_script(_RATE_LIMIT_SCRIPT, [key for key, _, _ in limits], args)
+    return None if rejected == 0 else ("email", "ip")[rejected - 1]
+
+
+async def store_otp(email: str, hashed_otp: str):
+    key = otp_key(email)
+    async with utils.async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping={"hash": hashed_otp, "attempts": 0})
+        pipe.expire(key, OTP_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def start_attempt(email: str) -> Optional[str]:
+    """Count a verification attempt; returns the stored OTP hash, or None if there is no usable OTP."""
+    return await _run_script(_ATTEMPT_SCRIPT, [otp_key(email)], [OTP_MAX_ATTEMPTS])
+
+
+async def consume_otp(email: str, hashed_otp: str) -> bool:
+    """Delete the verified OTP. False if it was already used or replaced in the meantime."""
+    return bool(await _run_script(_CONSUME_SCRIPT, [otp_key(email)], [hashed_otp]))
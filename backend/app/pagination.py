@@ -0,0 +1,79 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the (timestamp, id) of the last row on a page. The next page
+continues strictly after that key, so the cost of a page does not depend on how
+deep into the result it is and ties on the timestamp cannot make rows shift
+between pages.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(values: list) -> str:
+    payload = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return _encode([timestamp.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, row_id = _decode(cursor)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def encode_int_cursor(*key: int) -> str:
+    """Cursor for lists ordered by integer keys other than (timestamp, id)."""
+    return _encode(list(key))
+
+
+def decode_int_cursor(cursor: str, size: int) -> Tuple[int, ...]:
+    try:
+        key = tuple(int(value) for value in _decode(cursor))
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+    if len(key) != size:
+        raise _invalid_cursor()
+    return key
+
+
+def apply_keyset(query, timestamp_column, id_column, cursor: Optional[str]):
+    """
+    Order a query or select() newest first by (timestamp, id) and, given a cursor,
+    continue strictly after the last row of the previous page.
+    """
+    query = query.order_by(timestamp_column.desc(), id_column.desc())
+    if cursor:
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(*decode_cursor(cursor)))
+    return query
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, timestamp_field: str):
+    """
+    Put the cursor for the next page in the X-Next-Cursor header when the page is full.
+    """
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, timestamp_field), last.id)
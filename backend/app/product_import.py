@@ -0,0 +1,210 @@
+"""
+Bulk product import from CSV or NDJSON.
+
+The request body is parsed while it is received and loaded in batches of
+IMPORT_BATCH_SIZE rows. Categories are loaded once per import, existing SKUs
+are looked up with one query per batch, and each batch is written with one
+multi-row INSERT. Invalid rows are skipped and reported with their row number;
+the valid rows are committed together at the end.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+
+IMPORT_BATCH_SIZE = 1000
+
+ImportRow = Tuple[int, dict]  # (row number, raw fields)
+
+
+async def _lines(chunks: AsyncIterator[bytes], keepends: bool = False) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n" if keepends else line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _parse_record(lines: List[str]) -> Tuple[List[str], bool]:
+    """Parse one CSV record from `lines`; returns (fields, complete). Incomplete means a quoted field is still open."""
+    ran_out = False
+
+    def feed():
+        nonlocal ran_out
+        yield from lines
+        ran_out = True  # csv.reader asked for another line: the record did not end with these
+    return next(csv.reader(feed()), []), not ran_out
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """
+    CSV records from a byte stream. csv.reader decides where each record ends,
+    so quoted newlines survive and quotes inside unquoted fields are plain text.
+    """
+    record_lines: List[str] = []
+    async for line in _lines(chunks, keepends=True):
+        record_lines.append(line)
+        record, complete = _parse_record(record_lines)
+        if complete:
+            yield record
+            record_lines = []
+    if record_lines:
+        yield _parse_record(record_lines)[0]
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Rows keyed by the header line; numbered from 1 for the first data row. Empty cells are left out."""
+    header = None
+    row_number = 0
+    async for record in _csv_records(chunks):
+        if not any(field.strip() for field in record):
+            continue
+        if header is None:
+            header = [field.strip() for field in record]
+            continue
+        row_number += 1
+        yield row_number, {name: value for name, value in zip(header, record) if value != ""}
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """One JSON object per line; numbered by line. Lines that are not objects are passed on as errors."""
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            value = None
+        yield line_number, value if isinstance(value, dict) else {"__invalid__": line}
+
+
+def _first_error(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    return f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+
+
+class ProductImporter:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.category_ids: Set[int] = set()
+        self.seen_skus: Set[str] = set()
+        self.total_rows = 0
+        self.imported = 0
+        self.errors: List[dict] = []
+
+    def _error(self, row: int, sku_code: Optional[str], message: str):
+        self.errors.append({"row": row, "sku_code": sku_code, "error": message})
+
+    async def run(self, rows: AsyncIterator[ImportRow]) -> dict:
+        self.category_ids = set((await self.db.execute(select(models.Category.id))).scalars())
+
+        batch: List[Tuple[int, schemas.ProductCreate]] = []
+        async for row_number, fields in rows:
+            self.total_rows += 1
+            product = self._validate(row_number, fields)
+            if product is not None:
+                batch.append((row_number, product))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._load(batch)
+                batch = []
+        await self._load(batch)
+        await self.db.commit()
+
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+    def _validate(self, row_number: int, fields: dict) -> Optional[schemas.ProductCreate]:
+        if "__invalid__" in fields:
+            self._error(row_number, None, "Row is not a JSON object")
+            return None
+        sku_code = fields.get("sku_code")
+        try:
+            product = schemas.ProductCreate(**fields)
+        except ValidationError as exc:
+            self._error(row_number, sku_code, _first_error(exc))
+            return None
+
+        if product.category_id not in self.category_ids:
+            self._error(row_number, product.sku_code, "Category not found")
+            return None
+        if product.sku_code in self.seen_skus:
+            self._error(row_number, product.sku_code, "Duplicate SKU code in import")
+            return None
+        self.seen_skus.add(product.sku_code)
+        return product
+
+    async def _existing_skus(self, sku_codes: List[str]) -> Set[str]:
+        return set((await self.db.execute(
+            select(models.Product.sku_code).filter(models.Product.sku_code.in_(sku_codes))
+        )).scalars())
+
+    async def _load(self, batch: List[Tuple[int, schemas.ProductCreate]]):
+        if not batch:
+            return
+
+        existing = await self._existing_skus([product.sku_code for _, product in batch])
+
+        rows: Dict[str, int] = {}
+        values = []
+        for row_number, product in batch:
+            if product.sku_code in existing:
+                self._error(row_number, product.sku_code, "SKU code already exists")
+                continue
+            rows[product.sku_code] = row_number
+            values.append({
+                "name": product.name,
+                "sku_code": product.sku_code,
+                "category_id": product.category_id,
+                "unit_of_measure": product.unit_of_measure,
+                "initial_stock": product.initial_stock or 0,
+            })
+        if not values:
+            return
+
+        # ON CONFLICT DO NOTHING keeps a concurrent import of the same SKU from failing the whole batch
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(models.Product).values(values).on_conflict_do_nothing(index_elements=["sku_code"])
+            inserted = set((await self.db.execute(stmt.returning(models.Product.sku_code))).scalars())
+            for sku_code, row_number in rows.items():
+                if sku_code not in inserted:
+                    self._error(row_number, sku_code, "SKU code already exists")
+            self.imported += len(inserted)
+            return
+        if dialect == "sqlite":
+            stmt = sqlite.insert(models.Product).values(values).on_conflict_do_nothing(index_elements=["sku_code"])
+            inserted_count = (await self.db.execute(stmt)).rowcount
+            if inserted_count < len(values):
+                # No RETURNING here; the statement held the write lock, so the rows it inserted
+                # have the last `inserted_count` rowids up to last_insert_rowid()
+                last_id = (await self.db.execute(select(func.last_insert_rowid()))).scalar()
+                inserted = set((await self.db.execute(
+                    select(models.Product.sku_code).filter(models.Product.id > last_id - inserted_count, models.Product.id <= last_id)
+                )).scalars())
+                for sku_code, row_number in rows.items():
+                    if sku_code not in inserted:
+                        self._error(row_number, sku_code, "SKU code already exists")
+            self.imported += inserted_count
+            return
+
+        await self.db.execute(models.Product.__table__.insert().values(values))
+        self.imported += len(values)
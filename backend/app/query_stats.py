@@ -0,0 +1,98 @@
+"""
+Per-request SQL instrumentation.
+
+Engine event hooks count every statement and its execution time into the
+QueryStats of the current request, held in a context variable. FastAPI copies
+the context into the threadpool, so sync endpoints and async endpoints are
+both covered.
+
+    DB_DEBUG_HEADERS            add X-DB-Query-Count and X-DB-Time (ms) to responses (default false)
+    SLOW_QUERY_SECONDS          statements slower than this are logged (default 0.5)
+    SLOW_QUERY_LOG_SAMPLE_RATE  fraction of slow statements that are logged (default 1.0)
+
+Slow-query log lines name the endpoint function that issued the statement.
+"""
+
+import contextvars
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "false").strip().lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.5"))
+SLOW_QUERY_LOG_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_LOG_SAMPLE_RATE", "1.0"))
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time"
+
+
+class QueryStats:
+    __slots__ = ("scope", "count", "seconds")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+    def endpoint_name(self) -> str:
+        endpoint = self.scope.get("endpoint") if self.scope else None
+        if endpoint is None:
+            return "unknown"
+        return f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+
+current_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if elapsed >= SLOW_QUERY_SECONDS and random.random() < SLOW_QUERY_LOG_SAMPLE_RATE:
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s",
+            elapsed * 1000,
+            stats.endpoint_name() if stats is not None else "background",
+            " ".join(statement.split())[:1000]
+        )
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if DEBUG_HEADERS and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (QUERY_COUNT_HEADER.lower().encode("latin-1"), str(stats.count).encode("latin-1")),
+                    (QUERY_TIME_HEADER.lower().encode("latin-1"), f"{stats.seconds * 1000:.3f}".encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
@@ -1,72 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import datetime
 
-from .. import models, schemas
+from .. import cache, models, schemas, stock
 from ..database import get_db
+from ..security import CurrentUser, get_current_user
+from ..pagination import apply_keyset, set_next_cursor
 
 router = APIRouter(
     prefix="/adjustments",
     tags=["Adjustments"]
 )
 
+# Everything the response model reads, loaded in one query per relationship
+ADJUSTMENT_LOAD_OPTIONS = (
+    selectinload(models.StockAdjustment.warehouse),
+    selectinload(models.StockAdjustment.created_by_user),
+    selectinload(models.StockAdjustment.adjustment_items).selectinload(models.StockAdjustmentItem.product).selectinload(models.Product.category),
+    selectinload(models.StockAdjustment.adjustment_items).selectinload(models.StockAdjustmentItem.location).selectinload(models.Location.warehouse),
+)
+
 @router.post("/", response_model=schemas.StockAdjustmentOut, status_code=status.HTTP_201_CREATED)
-def create_adjustment(adjustment: schemas.StockAdjustmentCreate, db: Session = Depends(get_db), current_user_id: int = 1):
+def create_adjustment(adjustment: schemas.StockAdjustmentCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Create a stock adjustment - fixes mismatches between recorded stock vs physical count.
     This immediately updates stock levels and creates ledger entries.
-    Note: In a real implementation, current_user_id would come from JWT token authentication.
     """
     # Verify warehouse exists
     warehouse = db.query(models.Warehouse).filter(models.Warehouse.id == adjustment.warehouse_id).first()
     if not warehouse:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Warehouse not found")
     
-    # Verify all products exist
-    for item in adjustment.adjustment_items:
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found")
+    # Verify all products exist (one query for all lines)
+    missing_product_id = stock.first_missing_product(db, [item.product_id for item in adjustment.adjustment_items])
+    if missing_product_id is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {missing_product_id} not found")
     
     # Create stock adjustment
     new_adjustment = models.StockAdjustment(
         warehouse_id=adjustment.warehouse_id,
         reason=adjustment.reason,
         status="Done",  # Adjustments are immediately done
-        created_by=current_user_id
+        created_by=current_user.id
     )
     db.add(new_adjustment)
     db.flush()  # Flush to get the adjustment ID
     
+    # Fetch and lock the recorded stock for all lines at once
+    levels = stock.fetch_stock_levels(
+        db, [(item.product_id, adjustment.warehouse_id) for item in adjustment.adjustment_items], lock=True
+    )
+    system_quantities = {key: stock_level.quantity for key, stock_level in levels.items()}
+    
     # Process each adjustment item
+    moves = []
     for item in adjustment.adjustment_items:
-        # Get or create stock level
-        stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == item.product_id,
-            models.StockLevel.warehouse_id == adjustment.warehouse_id
-        ).first()
+        key = (item.product_id, adjustment.warehouse_id)
+        system_quantity = system_quantities.get(key) or 0
         
-        system_quantity = stock_level.quantity if stock_level else 0
-        
-        if not stock_level:
-            # Create new stock level
-            stock_level = models.StockLevel(
-                product_id=item.product_id,
-                warehouse_id=adjustment.warehouse_id,
-                location_id=item.location_id,
-                quantity=0,
-                reorder_point=0
-            )
-            db.add(stock_level)
-            db.flush()
-        
-        # Calculate the adjustment difference
+        # Calculate the adjustment difference; stock is set to the counted quantity
         adjustment_difference = item.counted_quantity - system_quantity
-        
-        # Update stock level to the counted quantity
-        stock_level.quantity = item.counted_quantity
-        if item.location_id:
-            stock_level.location_id = item.location_id
+        system_quantities[key] = item.counted_quantity
         
         # Create adjustment item record
         adjustment_item = models.StockAdjustmentItem(
@@ -78,31 +73,59 @@ def create_adjustment(adjustment: schemas.StockAdjustmentCreate, db: Session = D
         )
         db.add(adjustment_item)
         
-        # Create ledger entry
-        ledger_entry = models.StockLedgerEntry(
+        moves.append(stock.StockMove(
             product_id=item.product_id,
             warehouse_id=adjustment.warehouse_id,
-            location_id=item.location_id,
             change_quantity=adjustment_difference,  # Can be positive or negative
-            new_stock_level=item.counted_quantity,
-            document_type="Adjustment",
-            document_id=new_adjustment.id,
-            created_by=current_user_id
-        )
-        db.add(ledger_entry)
+            location_id=item.location_id
+        ))
+    
+    stock.post_stock_moves(db, moves, "Adjustment", new_adjustment.id, current_user.id, levels=levels)
+    
+    # Update location if specified (new stock rows are created with it)
+    for item in adjustment.adjustment_items:
+        stock_level = levels.get((item.product_id, adjustment.warehouse_id))
+        if stock_level and item.location_id:
+            stock_level.location_id = item.location_id
     
     db.commit()
-    db.refresh(new_adjustment)
-    return new_adjustment
+    cache.invalidate_kpis()
+    return db.query(models.StockAdjustment).options(*ADJUSTMENT_LOAD_OPTIONS).filter(models.StockAdjustment.id == new_adjustment.id).one()
 
 @router.get("/", response_model=List[schemas.StockAdjustmentOut])
-def get_adjustments(db: Session = Depends(get_db)):
-    adjustments = db.query(models.StockAdjustment).all()
+def get_adjustments(
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    status: Optional[str] = Query(None, description="Filter by status: Draft, Waiting, Ready, Done, Canceled"),
+    warehouse_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, description="Include documents created at or after this timestamp"),
+    date_to: Optional[datetime] = Query(None, description="Include documents created before this timestamp")
+):
+    """
+    List stock adjustments, newest first, with optional filters.
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page.
+    Lines and related records are loaded in batches (one query per relationship for the whole page).
+    """
+    query = db.query(models.StockAdjustment).options(*ADJUSTMENT_LOAD_OPTIONS)
+    
+    if status:
+        query = query.filter(models.StockAdjustment.status == status)
+    if warehouse_id:
+        query = query.filter(models.StockAdjustment.warehouse_id == warehouse_id)
+    if date_from:
+        query = query.filter(models.StockAdjustment.created_at >= date_from)
+    if date_to:
+        query = query.filter(models.StockAdjustment.created_at < date_to)
+    
+    adjustments = apply_keyset(query, models.StockAdjustment.created_at, models.StockAdjustment.id, cursor).limit(limit).all()
+    set_next_cursor(response, adjustments, limit, "created_at")
     return adjustments
 
 @router.get("/{adjustment_id}", response_model=schemas.StockAdjustmentOut)
 def get_adjustment(adjustment_id: int, db: Session = Depends(get_db)):
-    adjustment = db.query(models.StockAdjustment).filter(models.StockAdjustment.id == adjustment_id).first()
+    adjustment = db.query(models.StockAdjustment).options(*ADJUSTMENT_LOAD_OPTIONS).filter(models.StockAdjustment.id == adjustment_id).first()
     if not adjustment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stock adjustment not found")
     return adjustment
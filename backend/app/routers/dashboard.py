@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, select
 from typing import Optional
 
-from .. import models, schemas
-from ..database import get_db
+from .. import cache, kpis, models, schemas
+from ..database import get_async_db
 
 router = APIRouter(
     prefix="/dashboard",
@@ -12,8 +12,8 @@ router = APIRouter(
 )
 
 @router.get("/kpis", response_model=schemas.DashboardKPIs)
-def get_dashboard_kpis(
-    db: Session = Depends(get_db),
+async def get_dashboard_kpis(
+    db: AsyncSession = Depends(get_async_db),
     document_type: Optional[str] = Query(None, description="Filter by document type: Receipts, Delivery, Internal, Adjustments"),
     status: Optional[str] = Query(None, description="Filter by status: Draft, Waiting, Ready, Done, Canceled"),
     warehouse_id: Optional[int] = Query(None, description="Filter by warehouse ID"),
@@ -28,76 +28,94 @@ def get_dashboard_kpis(
     - Pending Receipts
     - Pending Deliveries
     - Internal Transfers Scheduled
+    KPIs are read from the incrementally maintained kpi_counters table. Counters are kept per
+    warehouse and category, so a location filter falls back to aggregating stock_levels.
+    Results are cached in Redis per filter combination until the next stock or document change.
     """
-    
-    # Build base query filters
-    filters = []
-    
-    # Filter by warehouse if provided
-    warehouse_filter = None
-    if warehouse_id:
-        warehouse_filter = models.StockLevel.warehouse_id == warehouse_id
-    
-    # Filter by location if provided
-    location_filter = None
+    filters = {
+        "document_type": document_type,
+        "status": status,
+        "warehouse_id": warehouse_id,
+        "location_id": location_id,
+        "product_category_id": product_category_id
+    }
+    version, cached = await cache.get_cached_kpis(filters)
+    if cached is not None:
+        return cached
+
     if location_id:
-        location_filter = models.StockLevel.location_id == location_id
-    
-    # Filter by product category if provided
-    category_filter = None
-    if product_category_id:
-        category_filter = models.Product.category_id == product_category_id
-    
-    # Build stock level query with filters
-    stock_query = db.query(models.StockLevel)
-    if warehouse_filter:
-        stock_query = stock_query.filter(warehouse_filter)
-    if location_filter:
-        stock_query = stock_query.filter(location_filter)
-    if category_filter:
-        stock_query = stock_query.join(models.Product).filter(category_filter)
-    
-    # Total Products in Stock (sum of all stock levels with filters applied)
-    total_products_in_stock = stock_query.with_entities(func.sum(models.StockLevel.quantity)).scalar() or 0
-    
-    # Low Stock Items (quantity <= reorder_point and > 0)
-    low_stock_query = stock_query.filter(
-        and_(
-            models.StockLevel.quantity <= models.StockLevel.reorder_point,
-            models.StockLevel.quantity > 0
-        )
+        statement = stock_level_kpis_statement(warehouse_id, location_id, product_category_id)
+    else:
+        statement = counter_kpis_statement(warehouse_id, product_category_id)
+    result = schemas.DashboardKPIs(**(await db.execute(statement)).one()._mapping)
+
+    await cache.store_kpis(version, filters, result.dict())
+    return result
+
+@router.get("/kpis/cache-stats", response_model=schemas.KPICacheStats)
+def get_kpi_cache_stats():
+    """
+    Hit/miss counts of the dashboard KPI cache (shared by all workers through Redis).
+    """
+    return cache.kpi_cache_stats()
+
+def counter_kpis_statement(warehouse_id: Optional[int] = None, product_category_id: Optional[int] = None):
+    """
+    Select the KPIs, labeled like schemas.DashboardKPIs, from the kpi_counters rows.
+    """
+    counter = models.KPICounter
+
+    # The category filter applies to stock KPIs only; document counts are per warehouse
+    def stock_sum(column):
+        total = func.sum(column)
+        if product_category_id:
+            total = total.filter(counter.category_id == product_category_id)
+        return func.coalesce(total, 0)
+
+    # Without a warehouse filter every transfer is counted once, on its source warehouse;
+    # for one warehouse, transfers into and out of it are both counted
+    transfers_scheduled = func.coalesce(func.sum(counter.transfers_out_scheduled), 0)
+    if warehouse_id:
+        transfers_scheduled = transfers_scheduled + func.coalesce(func.sum(counter.transfers_in_scheduled), 0)
+
+    statement = select(
+        stock_sum(counter.total_quantity).label("total_products_in_stock"),
+        stock_sum(counter.low_stock_items).label("low_stock_items"),
+        stock_sum(counter.out_of_stock_items).label("out_of_stock_items"),
+        func.coalesce(func.sum(counter.pending_receipts), 0).label("pending_receipts"),
+        func.coalesce(func.sum(counter.pending_deliveries), 0).label("pending_deliveries"),
+        transfers_scheduled.label("internal_transfers_scheduled")
     )
-    low_stock_items = low_stock_query.count()
-    
-    # Out of Stock Items (quantity = 0)
-    out_of_stock_query = stock_query.filter(models.StockLevel.quantity == 0)
-    out_of_stock_items = out_of_stock_query.count()
-    
+    if warehouse_id:
+        statement = statement.filter(counter.warehouse_id == warehouse_id)
+    return statement
+
+def stock_level_kpis_statement(
+    warehouse_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    product_category_id: Optional[int] = None
+):
+    """
+    Select the KPIs, labeled like schemas.DashboardKPIs, by aggregating stock_levels and the document tables.
+    """
+    # Document KPIs: pending counts of all document tables as scalar subqueries
     # Pending Receipts (status in Draft, Waiting, Ready)
-    receipt_query = db.query(models.Receipt).filter(
-        models.Receipt.status.in_(["Draft", "Waiting", "Ready"])
+    receipt_query = select(func.count(models.Receipt.id)).filter(
+        models.Receipt.status.in_(kpis.PENDING_STATUSES)
     )
     if warehouse_id:
         receipt_query = receipt_query.filter(models.Receipt.warehouse_id == warehouse_id)
-    if document_type and document_type.lower() == "receipts":
-        # Already filtered by document type
-        pass
-    pending_receipts = receipt_query.count()
-    
+
     # Pending Deliveries (status in Draft, Waiting, Ready)
-    delivery_query = db.query(models.DeliveryOrder).filter(
-        models.DeliveryOrder.status.in_(["Draft", "Waiting", "Ready"])
+    delivery_query = select(func.count(models.DeliveryOrder.id)).filter(
+        models.DeliveryOrder.status.in_(kpis.PENDING_STATUSES)
     )
     if warehouse_id:
         delivery_query = delivery_query.filter(models.DeliveryOrder.warehouse_id == warehouse_id)
-    if document_type and document_type.lower() == "delivery":
-        # Already filtered by document type
-        pass
-    pending_deliveries = delivery_query.count()
-    
+
     # Internal Transfers Scheduled (status in Draft, Waiting, Ready)
-    transfer_query = db.query(models.InternalTransfer).filter(
-        models.InternalTransfer.status.in_(["Draft", "Waiting", "Ready"])
+    transfer_query = select(func.count(models.InternalTransfer.id)).filter(
+        models.InternalTransfer.status.in_(kpis.PENDING_STATUSES)
     )
     if warehouse_id:
         transfer_query = transfer_query.filter(
@@ -106,16 +124,29 @@ def get_dashboard_kpis(
                 models.InternalTransfer.to_warehouse_id == warehouse_id
             )
         )
-    if document_type and document_type.lower() in ["internal", "internal transfer"]:
-        # Already filtered by document type
-        pass
-    internal_transfers_scheduled = transfer_query.count()
-    
-    return schemas.DashboardKPIs(
-        total_products_in_stock=total_products_in_stock,
-        low_stock_items=low_stock_items,
-        out_of_stock_items=out_of_stock_items,
-        pending_receipts=pending_receipts,
-        pending_deliveries=pending_deliveries,
-        internal_transfers_scheduled=internal_transfers_scheduled
-    )
+
+    # Stock KPIs: one pass over stock_levels with conditional aggregates
+    statement = select(
+        func.coalesce(func.sum(models.StockLevel.quantity), 0).label("total_products_in_stock"),
+        # Low Stock Items (quantity <= reorder_point and > 0)
+        func.count().filter(
+            and_(
+                models.StockLevel.quantity <= models.StockLevel.reorder_point,
+                models.StockLevel.quantity > 0
+            )
+        ).label("low_stock_items"),
+        # Out of Stock Items (quantity = 0)
+        func.count().filter(models.StockLevel.quantity == 0).label("out_of_stock_items"),
+        receipt_query.scalar_subquery().label("pending_receipts"),
+        delivery_query.scalar_subquery().label("pending_deliveries"),
+        transfer_query.scalar_subquery().label("internal_transfers_scheduled")
+    ).select_from(models.StockLevel)
+    if warehouse_id:
+        statement = statement.filter(models.StockLevel.warehouse_id == warehouse_id)
+    if location_id:
+        statement = statement.filter(models.StockLevel.location_id == location_id)
+    if product_category_id:
+        statement = statement.join(
+            models.Product, models.Product.id == models.StockLevel.product_id
+        ).filter(models.Product.category_id == product_category_id)
+    return statement
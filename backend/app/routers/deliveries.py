@@ -1,38 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 from datetime import datetime
 
-from .. import models, schemas
+from .. import batch_validation, cache, kpis, models, schemas, stock
 from ..database import get_db
+from ..security import CurrentUser, get_current_user
+from ..pagination import apply_keyset, set_next_cursor
 
 router = APIRouter(
     prefix="/deliveries",
     tags=["Deliveries"]
 )
 
+# Everything the response model reads, loaded in one query per relationship
+DELIVERY_LOAD_OPTIONS = (
+    selectinload(models.DeliveryOrder.warehouse),
+    selectinload(models.DeliveryOrder.created_by_user),
+    selectinload(models.DeliveryOrder.delivery_items).selectinload(models.DeliveryOrderItem.product).selectinload(models.Product.category),
+)
+
 @router.post("/", response_model=schemas.DeliveryOrderOut, status_code=status.HTTP_201_CREATED)
-def create_delivery(delivery: schemas.DeliveryOrderCreate, db: Session = Depends(get_db), current_user_id: int = 1):
+def create_delivery(delivery: schemas.DeliveryOrderCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Create a new delivery order (outgoing stock).
-    Note: In a real implementation, current_user_id would come from JWT token authentication.
     """
     # Verify warehouse exists
     warehouse = db.query(models.Warehouse).filter(models.Warehouse.id == delivery.warehouse_id).first()
     if not warehouse:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Warehouse not found")
     
-    # Verify all products exist
-    for item in delivery.delivery_items:
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found")
+    # Verify all products exist (one query for all lines)
+    missing_product_id = stock.first_missing_product(db, [item.product_id for item in delivery.delivery_items])
+    if missing_product_id is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {missing_product_id} not found")
     
     # Create delivery order
     new_delivery = models.DeliveryOrder(
         warehouse_id=delivery.warehouse_id,
         status=delivery.status,
-        created_by=current_user_id
+        created_by=current_user.id
     )
     db.add(new_delivery)
     db.flush()  # Flush to get the delivery ID
@@ -46,17 +53,19 @@ def create_delivery(delivery: schemas.DeliveryOrderCreate, db: Session = Depends
         )
         db.add(delivery_item)
     
+    kpis.track_document_status(db, new_delivery, None, new_delivery.status)
     db.commit()
-    db.refresh(new_delivery)
-    return new_delivery
+    cache.invalidate_kpis()
+    return db.query(models.DeliveryOrder).options(*DELIVERY_LOAD_OPTIONS).filter(models.DeliveryOrder.id == new_delivery.id).one()
 
 @router.put("/{delivery_id}/validate", response_model=schemas.DeliveryOrderOut)
-def validate_delivery(delivery_id: int, db: Session = Depends(get_db)):
+def validate_delivery(delivery_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Validate a delivery order - this decreases stock levels and creates ledger entries.
     Prevents negative stock unless explicitly allowed.
     """
-    delivery = db.query(models.DeliveryOrder).filter(models.DeliveryOrder.id == delivery_id).first()
+    # Lock the document first so a second validation of it waits and then sees it as done
+    delivery = db.query(models.DeliveryOrder).filter(models.DeliveryOrder.id == delivery_id).with_for_update().first()
     if not delivery:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delivery order not found")
     
@@ -66,61 +75,87 @@ def validate_delivery(delivery_id: int, db: Session = Depends(get_db)):
     if delivery.status == "Canceled":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot validate a canceled delivery order")
     
-    # Check stock availability before processing
+    # Check stock availability before processing (one stock fetch for all lines, rows locked until commit)
+    levels = stock.fetch_stock_levels(
+        db, [(delivery_item.product_id, delivery.warehouse_id) for delivery_item in delivery.delivery_items], lock=True
+    )
+    required = {}
     for delivery_item in delivery.delivery_items:
-        stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == delivery_item.product_id,
-            models.StockLevel.warehouse_id == delivery.warehouse_id
-        ).first()
-        
-        if not stock_level or stock_level.quantity < delivery_item.quantity_delivered:
-            product = db.query(models.Product).filter(models.Product.id == delivery_item.product_id).first()
+        required[delivery_item.product_id] = required.get(delivery_item.product_id, 0) + delivery_item.quantity_delivered
+    
+    for product_id, quantity in required.items():
+        stock_level = levels.get((product_id, delivery.warehouse_id))
+        if not stock_level or stock_level.quantity < quantity:
+            product = db.query(models.Product).filter(models.Product.id == product_id).first()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for product {product.name if product else delivery_item.product_id}. Available: {stock_level.quantity if stock_level else 0}, Required: {delivery_item.quantity_delivered}"
+                detail=f"Insufficient stock for product {product.name if product else product_id}. Available: {stock_level.quantity if stock_level else 0}, Required: {quantity}"
             )
     
-    # Update delivery status
+    # Update delivery status (counters are written last, after the stock rows: see receipts.validate_receipt)
+    old_status = delivery.status
     delivery.status = "Done"
     delivery.validated_at = datetime.utcnow()
     
-    # Process each delivery item
-    for delivery_item in delivery.delivery_items:
-        # Get stock level
-        stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == delivery_item.product_id,
-            models.StockLevel.warehouse_id == delivery.warehouse_id
-        ).first()
-        
-        # Update stock level (decrease)
-        old_quantity = stock_level.quantity
-        stock_level.quantity -= delivery_item.quantity_delivered
-        new_quantity = stock_level.quantity
-        
-        # Create ledger entry
-        ledger_entry = models.StockLedgerEntry(
+    # Post all lines together (decrease stock, one ledger insert)
+    moves = [
+        stock.StockMove(
             product_id=delivery_item.product_id,
             warehouse_id=delivery.warehouse_id,
-            change_quantity=-delivery_item.quantity_delivered,  # Negative for outgoing
-            new_stock_level=new_quantity,
-            document_type="Delivery",
-            document_id=delivery.id,
-            created_by=delivery.created_by
+            change_quantity=-delivery_item.quantity_delivered  # Negative for outgoing
         )
-        db.add(ledger_entry)
+        for delivery_item in delivery.delivery_items
+    ]
+    stock.post_stock_moves(db, moves, "Delivery", delivery.id, delivery.created_by, levels=levels)
+    kpis.track_document_status(db, delivery, old_status, "Done")
     
     db.commit()
-    db.refresh(delivery)
-    return delivery
+    cache.invalidate_kpis()
+    return db.query(models.DeliveryOrder).options(*DELIVERY_LOAD_OPTIONS).filter(models.DeliveryOrder.id == delivery.id).one()
+
+@router.post("/validate-batch", response_model=schemas.DocumentBatchResult)
+def validate_deliveries(batch: schemas.DocumentBatch, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Validate several delivery orders in one transaction, as PUT /deliveries/{id}/validate does for one.
+    Stock is checked once for the whole batch, in list order: a delivery is rejected if the deliveries
+    before it leave too little stock. Rejected deliveries are reported in the results; all others are validated.
+    """
+    return batch_validation.validate_documents(db, batch_validation.DELIVERIES, batch.document_ids)
 
 @router.get("/", response_model=List[schemas.DeliveryOrderOut])
-def get_deliveries(db: Session = Depends(get_db)):
-    deliveries = db.query(models.DeliveryOrder).all()
+def get_deliveries(
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    status: Optional[str] = Query(None, description="Filter by status: Draft, Waiting, Ready, Done, Canceled"),
+    warehouse_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, description="Include documents created at or after this timestamp"),
+    date_to: Optional[datetime] = Query(None, description="Include documents created before this timestamp")
+):
+    """
+    List delivery orders, newest first, with optional filters.
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page.
+    Lines and related records are loaded in batches (one query per relationship for the whole page).
+    """
+    query = db.query(models.DeliveryOrder).options(*DELIVERY_LOAD_OPTIONS)
+    
+    if status:
+        query = query.filter(models.DeliveryOrder.status == status)
+    if warehouse_id:
+        query = query.filter(models.DeliveryOrder.warehouse_id == warehouse_id)
+    if date_from:
+        query = query.filter(models.DeliveryOrder.created_at >= date_from)
+    if date_to:
+        query = query.filter(models.DeliveryOrder.created_at < date_to)
+    
+    deliveries = apply_keyset(query, models.DeliveryOrder.created_at, models.DeliveryOrder.id, cursor).limit(limit).all()
+    set_next_cursor(response, deliveries, limit, "created_at")
     return deliveries
 
 @router.get("/{delivery_id}", response_model=schemas.DeliveryOrderOut)
 def get_delivery(delivery_id: int, db: Session = Depends(get_db)):
-    delivery = db.query(models.DeliveryOrder).filter(models.DeliveryOrder.id == delivery_id).first()
+    delivery = db.query(models.DeliveryOrder).options(*DELIVERY_LOAD_OPTIONS).filter(models.DeliveryOrder.id == delivery_id).first()
     if not delivery:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delivery order not found")
     return delivery
@@ -1,47 +1,251 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy import select
 from typing import Optional, List
+from datetime import datetime
+import csv
+import json
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_async_db
+from ..pagination import apply_keyset, set_next_cursor
 
 router = APIRouter(
     prefix="/ledger",
     tags=["Ledger"]
 )
 
-@router.get("/", response_model=List[schemas.StockLedgerEntryOut])
-def get_ledger(
-    db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    models.StockLedgerEntry.id,
+    models.StockLedgerEntry.timestamp,
+    models.StockLedgerEntry.product_id,
+    models.Product.sku_code,
+    models.Product.name.label("product_name"),
+    models.StockLedgerEntry.warehouse_id,
+    models.Warehouse.name.label("warehouse_name"),
+    models.StockLedgerEntry.location_id,
+    models.StockLedgerEntry.change_quantity,
+    models.StockLedgerEntry.new_stock_level,
+    models.StockLedgerEntry.document_type,
+    models.StockLedgerEntry.document_id,
+    models.StockLedgerEntry.created_by,
+]
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+LocationWarehouse = aliased(models.Warehouse)
+
+# Everything StockLedgerEntryOut serializes, as plain columns of one joined query
+LIST_COLUMNS = [
+    models.StockLedgerEntry.id,
+    models.StockLedgerEntry.change_quantity,
+    models.StockLedgerEntry.new_stock_level,
+    models.StockLedgerEntry.document_type,
+    models.StockLedgerEntry.document_id,
+    models.StockLedgerEntry.timestamp,
+    models.Product.id.label("product_id"),
+    models.Product.name.label("product_name"),
+    models.Product.sku_code,
+    models.Product.category_id,
+    models.Product.unit_of_measure,
+    models.Product.initial_stock,
+    models.Category.id.label("category_row_id"),
+    models.Category.name.label("category_name"),
+    models.Warehouse.id.label("warehouse_id"),
+    models.Warehouse.name.label("warehouse_name"),
+    models.Location.id.label("location_id"),
+    models.Location.name.label("location_name"),
+    LocationWarehouse.id.label("location_warehouse_id"),
+    LocationWarehouse.name.label("location_warehouse_name"),
+    models.User.id.label("user_id"),
+    models.User.email.label("user_email"),
+    models.User.is_active.label("user_is_active"),
+]
+
+def apply_ledger_filters(
+    query,
     product_id: Optional[int] = None,
     warehouse_id: Optional[int] = None,
     location_id: Optional[int] = None,
     document_type: Optional[str] = None,
-    document_id: Optional[int] = None
+    document_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
 ):
     """
-    Get stock ledger entries (immutable audit trail) with optional filters.
+    Apply the ledger filters shared by the list and export endpoints to a select() statement.
     """
-    query = db.query(models.StockLedgerEntry)
-    
     if product_id:
         query = query.filter(models.StockLedgerEntry.product_id == product_id)
-    
+
     if warehouse_id:
         query = query.filter(models.StockLedgerEntry.warehouse_id == warehouse_id)
-    
+
     if location_id:
         query = query.filter(models.StockLedgerEntry.location_id == location_id)
-    
+
     if document_type:
         query = query.filter(models.StockLedgerEntry.document_type == document_type)
-    
+
     if document_id:
         query = query.filter(models.StockLedgerEntry.document_id == document_id)
-    
-    # Order by timestamp descending (most recent first)
-    entries = query.order_by(models.StockLedgerEntry.timestamp.desc()).offset(skip).limit(limit).all()
-    return entries
 
+    if date_from:
+        query = query.filter(models.StockLedgerEntry.timestamp >= date_from)
+
+    if date_to:
+        query = query.filter(models.StockLedgerEntry.timestamp < date_to)
+
+    return query
+
+def list_select():
+    """
+    select() of LIST_COLUMNS with the joins they need. A product's category and an entry's
+    creator are optional, so those joins are outer joins and such entries are still listed.
+    """
+    return (
+        select(*LIST_COLUMNS)
+        .join(models.Product, models.Product.id == models.StockLedgerEntry.product_id)
+        .outerjoin(models.Category, models.Category.id == models.Product.category_id)
+        .join(models.Warehouse, models.Warehouse.id == models.StockLedgerEntry.warehouse_id)
+        .outerjoin(models.Location, models.Location.id == models.StockLedgerEntry.location_id)
+        .outerjoin(LocationWarehouse, LocationWarehouse.id == models.Location.warehouse_id)
+        .outerjoin(models.User, models.User.id == models.StockLedgerEntry.created_by)
+    )
+
+def ledger_entry_dict(row) -> dict:
+    """Shape a LIST_COLUMNS row like StockLedgerEntryOut."""
+    return {
+        "id": row.id,
+        "product": {
+            "name": row.product_name,
+            "sku_code": row.sku_code,
+            "category_id": row.category_id,
+            "unit_of_measure": row.unit_of_measure,
+            "initial_stock": row.initial_stock,
+            "id": row.product_id,
+            "category": None if row.category_row_id is None else {"name": row.category_name, "id": row.category_row_id},
+        },
+        "warehouse": {"name": row.warehouse_name, "id": row.warehouse_id},
+        "location": None if row.location_id is None else {
+            "name": row.location_name,
+            "warehouse_id": row.location_warehouse_id,
+            "id": row.location_id,
+            "warehouse": {"name": row.location_warehouse_name, "id": row.location_warehouse_id},
+        },
+        "change_quantity": row.change_quantity,
+        "new_stock_level": row.new_stock_level,
+        "document_type": row.document_type,
+        "document_id": row.document_id,
+        "timestamp": row.timestamp,
+        "created_by_user": None if row.user_id is None else {
+            "id": row.user_id, "email": row.user_email, "is_active": row.user_is_active
+        },
+    }
+
+@router.get("/", response_model=List[schemas.StockLedgerEntryOut])
+async def get_ledger(
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    product_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    document_type: Optional[str] = None,
+    document_id: Optional[int] = None
+):
+    """
+    Get stock ledger entries (immutable audit trail) with optional filters.
+    Entries are returned newest first, ordered by (timestamp, id).
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page;
+    pass it back as `cursor` instead of increasing `skip`, which gets slower the deeper you page.
+    """
+    # Rows are read as plain tuples and encoded with orjson; validating a large page into
+    # Pydantic models costs more than the query. The response model only documents the shape.
+    query = apply_ledger_filters(
+        list_select(),
+        product_id=product_id,
+        warehouse_id=warehouse_id,
+        location_id=location_id,
+        document_type=document_type,
+        document_id=document_id
+    )
+
+    # Order by timestamp descending (most recent first), id breaks ties
+    query = apply_keyset(query, models.StockLedgerEntry.timestamp, models.StockLedgerEntry.id, cursor)
+    if not cursor:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.limit(limit))).all()
+    response = ORJSONResponse([ledger_entry_dict(row) for row in rows])
+    set_next_cursor(response, rows, limit, "timestamp")
+    return response
+
+class _LineBuffer:
+    """File-like object for csv.writer that hands each written line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+async def _csv_chunks(rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for batch in rows.partitions(EXPORT_BATCH_SIZE):
+        yield "".join(writer.writerow(row) for row in batch)
+
+async def _ndjson_chunks(rows):
+    async for batch in rows.partitions(EXPORT_BATCH_SIZE):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=datetime.isoformat) + "\n"
+            for row in batch
+        )
+
+@router.get("/export")
+async def export_ledger(
+    db: AsyncSession = Depends(get_async_db),
+    export_format: str = Query("csv", alias="format", regex="^(csv|ndjson)$"),
+    date_from: Optional[datetime] = Query(None, description="Include entries at or after this timestamp"),
+    date_to: Optional[datetime] = Query(None, description="Include entries before this timestamp"),
+    product_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    document_type: Optional[str] = None,
+    document_id: Optional[int] = None
+):
+    """
+    Stream stock ledger entries as CSV or NDJSON, oldest first, with the same filters as GET /ledger/
+    plus a date range. Rows are read through a server-side cursor and written out in batches,
+    so memory use stays constant regardless of how many entries match.
+    """
+    query = apply_ledger_filters(
+        select(*EXPORT_COLUMNS)
+        .join(models.Product, models.Product.id == models.StockLedgerEntry.product_id)
+        .join(models.Warehouse, models.Warehouse.id == models.StockLedgerEntry.warehouse_id),
+        product_id=product_id,
+        warehouse_id=warehouse_id,
+        location_id=location_id,
+        document_type=document_type,
+        document_id=document_id,
+        date_from=date_from,
+        date_to=date_to
+    ).order_by(models.StockLedgerEntry.timestamp, models.StockLedgerEntry.id)
+
+    rows = await db.stream(query.execution_options(max_row_buffer=EXPORT_BATCH_SIZE))
+
+    if export_format == "ndjson":
+        return StreamingResponse(
+            _ndjson_chunks(rows),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="stock_ledger.ndjson"'}
+        )
+
+    return StreamingResponse(
+        _csv_chunks(rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="stock_ledger.csv"'}
+    )
@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import time
+import redis
+
+from .. import database, hashing, utils
+from ..db_pool import pool_status
+from ..metrics import MetricsWriter, render_request_metrics
+
+router = APIRouter(
+    tags=["Monitoring"]
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# pool_status key -> (metric name, type, help)
+POOL_METRICS = {
+    "checked_out": ("db_pool_checked_out", "gauge", "Connections currently checked out."),
+    "checked_in": ("db_pool_checked_in", "gauge", "Idle connections in the pool."),
+    "overflow": ("db_pool_overflow", "gauge", "Overflow connections in use."),
+    "size": ("db_pool_size", "gauge", "Configured pool size."),
+    "checkouts": ("db_pool_checkouts_total", "counter", "Connection checkouts."),
+    "checkout_timeouts": ("db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out waiting for a connection."),
+    "checkout_wait_seconds_total": ("db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    "checkout_wait_seconds_max": ("db_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a connection."),
+}
+
+async def _redis_ping_seconds():
+    start = time.perf_counter()
+    try:
+        await utils.async_redis_client.ping()
+    except redis.RedisError:
+        return None
+    return time.perf_counter() - start
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Request, connection pool, Redis and hashing pool metrics of this worker in Prometheus text format.
+    """
+    writer = MetricsWriter()
+    render_request_metrics(writer)
+
+    pools = {"sync": pool_status(database.engine.pool), "async": pool_status(database.async_engine.sync_engine.pool)}
+    for key, (name, kind, help_text) in POOL_METRICS.items():
+        samples = [("", {"engine": label}, status[key]) for label, status in pools.items() if key in status]
+        if samples:
+            writer.metric(name, kind, help_text, samples)
+
+    ping_seconds = await _redis_ping_seconds()
+    writer.metric("redis_up", "gauge", "Whether Redis answered a PING.", [("", {}, int(ping_seconds is not None))])
+    if ping_seconds is not None:
+        writer.metric("redis_ping_seconds", "gauge", "Round trip of a Redis PING.", [("", {}, ping_seconds)])
+
+    hash_pool = hashing.pool_status()
+    writer.metric("hash_pool_in_flight", "gauge", "bcrypt jobs running or queued.", [("", {}, hash_pool["in_flight"])])
+    writer.metric("hash_pool_workers", "gauge", "bcrypt worker pool size.", [("", {}, hash_pool["workers"])])
+
+    return PlainTextResponse(writer.text(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+
+from .. import database, hashing
+from ..db_pool import pool_status
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["Monitoring"]
+)
+
+@router.get("/db-pool")
+def get_db_pool_status():
+    """
+    Live connection pool metrics for this worker: checked-out connections, overflow in use,
+    and how many checkouts waited for a connection and for how long in total.
+    """
+    return {
+        "sync": pool_status(database.engine.pool),
+        "async": pool_status(database.async_engine.sync_engine.pool),
+    }
+
+@router.get("/hash-pool")
+def get_hash_pool_status():
+    """
+    Size and load of the bcrypt worker pool for this worker.
+    """
+    return hashing.pool_status()
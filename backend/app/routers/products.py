@@ -1,18 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select
 from typing import Optional, List
 
-from .. import models, schemas
-from ..database import get_db
+from .. import cache, kpis, models, product_import, schemas
+from .. import search as search_module
+from ..database import get_db, get_async_db
+from ..security import CurrentUser, get_current_user
 
 router = APIRouter(
     prefix="/products",
     tags=["Products"]
 )
 
+# Everything ProductOut serializes, as plain columns of one joined query
+LIST_COLUMNS = [
+    models.Product.id,
+    models.Product.name,
+    models.Product.sku_code,
+    models.Product.category_id,
+    models.Product.unit_of_measure,
+    models.Product.initial_stock,
+    models.Category.name.label("category_name"),
+]
+
+def product_dict(row) -> dict:
+    """Shape a LIST_COLUMNS row like ProductOut."""
+    return {
+        "name": row.name,
+        "sku_code": row.sku_code,
+        "category_id": row.category_id,
+        "unit_of_measure": row.unit_of_measure,
+        "initial_stock": row.initial_stock,
+        "id": row.id,
+        "category": {"name": row.category_name, "id": row.category_id},
+    }
+
 @router.get("/", response_model=List[schemas.ProductOut])
-def get_products(
-    db: Session = Depends(get_db),
+async def get_products(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     category_id: Optional[int] = None,
@@ -23,9 +51,20 @@ def get_products(
     Get all products with optional filters:
     - category_id: Filter by product category
     - sku_code: Filter by SKU code (exact match)
-    - search: Search by product name or SKU (partial match)
+    - search: Search by product name or SKU (partial match), best matches first
     """
-    query = db.query(models.Product)
+    # Rows are read as plain tuples and encoded with orjson instead of going through ProductOut
+    query = select(*LIST_COLUMNS).join(models.Category, models.Category.id == models.Product.category_id)
+    
+    if search and not search_module.supports_trigram_search(db):
+        # No trigram index in the database: rank with the in-process index and load only the requested page
+        await search_module.product_index.ensure_loaded(db)
+        ranked_ids = search_module.product_index.search(search, category_id, sku_code)[skip:skip + limit]
+        if not ranked_ids:
+            return ORJSONResponse([])
+        rows = (await db.execute(query.filter(models.Product.id.in_(ranked_ids)))).all()
+        position = {product_id: index for index, product_id in enumerate(ranked_ids)}
+        return ORJSONResponse([product_dict(row) for row in sorted(rows, key=lambda row: position[row.id])])
     
     if category_id:
         query = query.filter(models.Product.category_id == category_id)
@@ -34,23 +73,48 @@ def get_products(
         query = query.filter(models.Product.sku_code == sku_code)
     
     if search:
-        query = query.filter(
-            (models.Product.name.ilike(f"%{search}%")) |
-            (models.Product.sku_code.ilike(f"%{search}%"))
+        query = query.filter(search_module.trigram_search_filter(search)).order_by(
+            search_module.trigram_rank(search).desc(),
+            models.Product.id
         )
+    else:
+        # A stable order, so pages fetched with skip neither repeat nor miss products
+        query = query.order_by(models.Product.id)
     
-    products = query.offset(skip).limit(limit).all()
-    return products
+    rows = (await db.execute(query.offset(skip).limit(limit))).all()
+    return ORJSONResponse([product_dict(row) for row in rows])
+
+@router.post("/import", response_model=schemas.ProductImportResult)
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    import_format: str = Query("csv", alias="format", regex="^(csv|ndjson)$")
+):
+    """
+    Create products in bulk from the request body, either CSV with a header line
+    or NDJSON, using the fields of POST /products/.
+    Rows with errors (invalid fields, unknown category, SKU already taken or repeated
+    in the file) are skipped and listed in the response; all other rows are created.
+    """
+    parse = product_import.ndjson_rows if import_format == "ndjson" else product_import.csv_rows
+    result = await product_import.ProductImporter(db).run(parse(request.stream()))
+    if result["imported"]:
+        # Reloaded from the database on the next search
+        search_module.product_index.clear()
+    return result
 
 @router.get("/{product_id}", response_model=schemas.ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    product = (await db.execute(
+        select(models.Product).options(selectinload(models.Product.category)).filter(models.Product.id == product_id)
+    )).scalars().first()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     return product
 
 @router.post("/", response_model=schemas.ProductOut, status_code=status.HTTP_201_CREATED)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
+def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     # Check if SKU code already exists
     existing_product = db.query(models.Product).filter(models.Product.sku_code == product.sku_code).first()
     if existing_product:
@@ -71,6 +135,7 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     db.add(new_product)
     db.commit()
     db.refresh(new_product)
+    search_module.product_index.upsert(new_product)
     
     # If initial_stock is provided, create stock level entries
     # Note: This would typically require a warehouse_id, but for simplicity,
@@ -83,7 +148,8 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
 def update_product(
     product_id: int,
     product_update: schemas.ProductUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
@@ -103,9 +169,16 @@ def update_product(
     
     # Update product fields
     update_data = product_update.dict(exclude_unset=True)
+    category_changed = "category_id" in update_data and update_data["category_id"] != product.category_id
+    if category_changed:
+        # Stock counts on the dashboard are kept per category
+        kpis.track_category_change(db, product.id, product.category_id, update_data["category_id"])
     for field, value in update_data.items():
         setattr(product, field, value)
     
     db.commit()
+    if category_changed:
+        cache.invalidate_kpis()
     db.refresh(product)
+    search_module.product_index.upsert(product)
     return product
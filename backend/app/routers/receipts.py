@@ -1,22 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from .. import models, schemas
+from .. import batch_validation, cache, kpis, models, schemas, stock
 from ..database import get_db
+from ..security import CurrentUser, get_current_user
+from ..pagination import apply_keyset, set_next_cursor
 
 router = APIRouter(
     prefix="/receipts",
     tags=["Receipts"]
 )
 
+# Everything the response model reads, loaded in one query per relationship
+RECEIPT_LOAD_OPTIONS = (
+    selectinload(models.Receipt.supplier),
+    selectinload(models.Receipt.warehouse),
+    selectinload(models.Receipt.created_by_user),
+    selectinload(models.Receipt.receipt_items).selectinload(models.ReceiptItem.product).selectinload(models.Product.category),
+)
+
 @router.post("/", response_model=schemas.ReceiptOut, status_code=status.HTTP_201_CREATED)
-def create_receipt(receipt: schemas.ReceiptCreate, db: Session = Depends(get_db), current_user_id: int = 1):
+def create_receipt(receipt: schemas.ReceiptCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Create a new receipt (incoming stock).
-    Note: In a real implementation, current_user_id would come from JWT token authentication.
     """
     # Verify supplier exists
     supplier = db.query(models.Supplier).filter(models.Supplier.id == receipt.supplier_id).first()
@@ -28,18 +37,17 @@ def create_receipt(receipt: schemas.ReceiptCreate, db: Session = Depends(get_db)
     if not warehouse:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Warehouse not found")
     
-    # Verify all products exist
-    for item in receipt.receipt_items:
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found")
+    # Verify all products exist (one query for all lines)
+    missing_product_id = stock.first_missing_product(db, [item.product_id for item in receipt.receipt_items])
+    if missing_product_id is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {missing_product_id} not found")
     
     # Create receipt
     new_receipt = models.Receipt(
         supplier_id=receipt.supplier_id,
         warehouse_id=receipt.warehouse_id,
         status=receipt.status,
-        created_by=current_user_id
+        created_by=current_user.id
     )
     db.add(new_receipt)
     db.flush()  # Flush to get the receipt ID
@@ -53,16 +61,18 @@ def create_receipt(receipt: schemas.ReceiptCreate, db: Session = Depends(get_db)
         )
         db.add(receipt_item)
     
+    kpis.track_document_status(db, new_receipt, None, new_receipt.status)
     db.commit()
-    db.refresh(new_receipt)
-    return new_receipt
+    cache.invalidate_kpis()
+    return db.query(models.Receipt).options(*RECEIPT_LOAD_OPTIONS).filter(models.Receipt.id == new_receipt.id).one()
 
 @router.put("/{receipt_id}/validate", response_model=schemas.ReceiptOut)
-def validate_receipt(receipt_id: int, db: Session = Depends(get_db)):
+def validate_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Validate a receipt - this increases stock levels and creates ledger entries.
     """
-    receipt = db.query(models.Receipt).filter(models.Receipt.id == receipt_id).first()
+    # Lock the document first so a second validation of it waits and then sees it as done
+    receipt = db.query(models.Receipt).filter(models.Receipt.id == receipt_id).with_for_update().first()
     if not receipt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Receipt not found")
     
@@ -72,58 +82,77 @@ def validate_receipt(receipt_id: int, db: Session = Depends(get_db)):
     if receipt.status == "Canceled":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot validate a canceled receipt")
     
+    # Locks are taken in the same order on every validation path: the document, then its
+    # stock rows (product_id, warehouse_id order, including rows created here), then the
+    # kpi_counters rows. Concurrent receipts, deliveries and transfers on the same stock
+    # wait for each other instead of deadlocking.
+    levels = stock.fetch_stock_levels(
+        db, [(receipt_item.product_id, receipt.warehouse_id) for receipt_item in receipt.receipt_items], lock=True
+    )
+    
     # Update receipt status
+    old_status = receipt.status
     receipt.status = "Done"
     receipt.validated_at = datetime.utcnow()
     
-    # Process each receipt item
-    for receipt_item in receipt.receipt_items:
-        # Get or create stock level for this product and warehouse
-        stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == receipt_item.product_id,
-            models.StockLevel.warehouse_id == receipt.warehouse_id
-        ).first()
-        
-        if not stock_level:
-            # Create new stock level
-            stock_level = models.StockLevel(
-                product_id=receipt_item.product_id,
-                warehouse_id=receipt.warehouse_id,
-                quantity=0,
-                reorder_point=0
-            )
-            db.add(stock_level)
-            db.flush()
-        
-        # Update stock level (increase)
-        old_quantity = stock_level.quantity
-        stock_level.quantity += receipt_item.quantity_received
-        new_quantity = stock_level.quantity
-        
-        # Create ledger entry
-        ledger_entry = models.StockLedgerEntry(
+    # Post all lines together: one insert for new stock rows, one ledger insert
+    moves = [
+        stock.StockMove(
             product_id=receipt_item.product_id,
             warehouse_id=receipt.warehouse_id,
-            change_quantity=receipt_item.quantity_received,  # Positive for incoming
-            new_stock_level=new_quantity,
-            document_type="Receipt",
-            document_id=receipt.id,
-            created_by=receipt.created_by
+            change_quantity=receipt_item.quantity_received  # Positive for incoming
         )
-        db.add(ledger_entry)
+        for receipt_item in receipt.receipt_items
+    ]
+    stock.post_stock_moves(db, moves, "Receipt", receipt.id, receipt.created_by, levels=levels)
+    kpis.track_document_status(db, receipt, old_status, "Done")
     
     db.commit()
-    db.refresh(receipt)
-    return receipt
+    cache.invalidate_kpis()
+    return db.query(models.Receipt).options(*RECEIPT_LOAD_OPTIONS).filter(models.Receipt.id == receipt.id).one()
+
+@router.post("/validate-batch", response_model=schemas.DocumentBatchResult)
+def validate_receipts(batch: schemas.DocumentBatch, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Validate several receipts in one transaction, as PUT /receipts/{id}/validate does for one.
+    Receipts that cannot be validated are reported in the results; all others are validated.
+    """
+    return batch_validation.validate_documents(db, batch_validation.RECEIPTS, batch.document_ids)
 
 @router.get("/", response_model=List[schemas.ReceiptOut])
-def get_receipts(db: Session = Depends(get_db)):
-    receipts = db.query(models.Receipt).all()
+def get_receipts(
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    status: Optional[str] = Query(None, description="Filter by status: Draft, Waiting, Ready, Done, Canceled"),
+    warehouse_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, description="Include documents created at or after this timestamp"),
+    date_to: Optional[datetime] = Query(None, description="Include documents created before this timestamp")
+):
+    """
+    List receipts, newest first, with optional filters.
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page.
+    Lines and related records are loaded in batches (one query per relationship for the whole page).
+    """
+    query = db.query(models.Receipt).options(*RECEIPT_LOAD_OPTIONS)
+    
+    if status:
+        query = query.filter(models.Receipt.status == status)
+    if warehouse_id:
+        query = query.filter(models.Receipt.warehouse_id == warehouse_id)
+    if date_from:
+        query = query.filter(models.Receipt.created_at >= date_from)
+    if date_to:
+        query = query.filter(models.Receipt.created_at < date_to)
+    
+    receipts = apply_keyset(query, models.Receipt.created_at, models.Receipt.id, cursor).limit(limit).all()
+    set_next_cursor(response, receipts, limit, "created_at")
     return receipts
 
 @router.get("/{receipt_id}", response_model=schemas.ReceiptOut)
 def get_receipt(receipt_id: int, db: Session = Depends(get_db)):
-    receipt = db.query(models.Receipt).filter(models.Receipt.id == receipt_id).first()
+    receipt = db.query(models.Receipt).options(*RECEIPT_LOAD_OPTIONS).filter(models.Receipt.id == receipt_id).first()
     if not receipt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Receipt not found")
     return receipt
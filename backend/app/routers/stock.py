@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from typing import List, Optional
+
+from .. import models, schemas
+from ..database import get_async_db
+from ..pagination import NEXT_CURSOR_HEADER, decode_int_cursor, encode_int_cursor
+
+router = APIRouter(
+    prefix="/stock",
+    tags=["Stock"]
+)
+
+# Same expression as the ix_stock_levels_low_stock_shortfall index, so the index provides the order
+SHORTFALL = models.StockLevel.reorder_point - models.StockLevel.quantity
+
+@router.get("/low", response_model=List[schemas.LowStockItemOut])
+async def get_low_stock(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    warehouse_id: Optional[int] = None
+):
+    """
+    Stock levels at or below their reorder point but not out of stock (the dashboard's low stock
+    items), largest shortfall first. Rows are read from a partial index that holds only low-stock
+    rows, so a page costs the same however large stock_levels is.
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    query = (
+        select(
+            models.StockLevel.id.label("stock_level_id"),
+            models.StockLevel.product_id,
+            models.Product.sku_code,
+            models.Product.name.label("product_name"),
+            models.StockLevel.warehouse_id,
+            models.Warehouse.name.label("warehouse_name"),
+            models.StockLevel.location_id,
+            models.StockLevel.quantity,
+            models.StockLevel.reorder_point,
+            SHORTFALL.label("shortfall"),
+        )
+        .join(models.Product, models.Product.id == models.StockLevel.product_id)
+        .join(models.Warehouse, models.Warehouse.id == models.StockLevel.warehouse_id)
+        .filter(models.LOW_STOCK_CONDITION)
+        .order_by(SHORTFALL.desc(), models.StockLevel.id.desc())
+    )
+    if warehouse_id:
+        query = query.filter(models.StockLevel.warehouse_id == warehouse_id)
+    if cursor:
+        query = query.filter(tuple_(SHORTFALL, models.StockLevel.id) < tuple_(*decode_int_cursor(cursor, 2)))
+
+    rows = (await db.execute(query.limit(limit))).all()
+    if len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_int_cursor(rows[-1].shortfall, rows[-1].stock_level_id)
+    return rows
@@ -1,21 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_
+from typing import List, Optional
 from datetime import datetime
 
-from .. import models, schemas
+from .. import batch_validation, cache, kpis, models, schemas, stock
 from ..database import get_db
+from ..security import CurrentUser, get_current_user
+from ..pagination import apply_keyset, set_next_cursor
 
 router = APIRouter(
     prefix="/transfers",
     tags=["Transfers"]
 )
 
+# Everything the response model reads, loaded in one query per relationship
+TRANSFER_LOAD_OPTIONS = (
+    selectinload(models.InternalTransfer.from_warehouse),
+    selectinload(models.InternalTransfer.to_warehouse),
+    selectinload(models.InternalTransfer.created_by_user),
+    selectinload(models.InternalTransfer.transfer_items).selectinload(models.InternalTransferItem.product).selectinload(models.Product.category),
+    selectinload(models.InternalTransfer.transfer_items).selectinload(models.InternalTransferItem.from_location).selectinload(models.Location.warehouse),
+    selectinload(models.InternalTransfer.transfer_items).selectinload(models.InternalTransferItem.to_location).selectinload(models.Location.warehouse),
+)
+
 @router.post("/", response_model=schemas.InternalTransferOut, status_code=status.HTTP_201_CREATED)
-def create_transfer(transfer: schemas.InternalTransferCreate, db: Session = Depends(get_db), current_user_id: int = 1):
+def create_transfer(transfer: schemas.InternalTransferCreate, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Create a new internal transfer (moving stock between warehouses/locations).
-    Note: In a real implementation, current_user_id would come from JWT token authentication.
     """
     # Verify warehouses exist
     from_warehouse = db.query(models.Warehouse).filter(models.Warehouse.id == transfer.from_warehouse_id).first()
@@ -29,18 +41,17 @@ def create_transfer(transfer: schemas.InternalTransferCreate, db: Session = Depe
     if transfer.from_warehouse_id == transfer.to_warehouse_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Source and destination warehouses cannot be the same")
     
-    # Verify all products exist
-    for item in transfer.transfer_items:
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found")
+    # Verify all products exist (one query for all lines)
+    missing_product_id = stock.first_missing_product(db, [item.product_id for item in transfer.transfer_items])
+    if missing_product_id is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {missing_product_id} not found")
     
     # Create internal transfer
     new_transfer = models.InternalTransfer(
         from_warehouse_id=transfer.from_warehouse_id,
         to_warehouse_id=transfer.to_warehouse_id,
         status=transfer.status,
-        created_by=current_user_id
+        created_by=current_user.id
     )
     db.add(new_transfer)
     db.flush()  # Flush to get the transfer ID
@@ -56,17 +67,19 @@ def create_transfer(transfer: schemas.InternalTransferCreate, db: Session = Depe
         )
         db.add(transfer_item)
     
+    kpis.track_document_status(db, new_transfer, None, new_transfer.status)
     db.commit()
-    db.refresh(new_transfer)
-    return new_transfer
+    cache.invalidate_kpis()
+    return db.query(models.InternalTransfer).options(*TRANSFER_LOAD_OPTIONS).filter(models.InternalTransfer.id == new_transfer.id).one()
 
 @router.put("/{transfer_id}/complete", response_model=schemas.InternalTransferOut)
-def complete_transfer(transfer_id: int, db: Session = Depends(get_db)):
+def complete_transfer(transfer_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """
     Complete an internal transfer - this moves stock from source to destination warehouse.
     Stock total stays the same; only location changes.
     """
-    transfer = db.query(models.InternalTransfer).filter(models.InternalTransfer.id == transfer_id).first()
+    # Lock the document first so a second completion of it waits and then sees it as done
+    transfer = db.query(models.InternalTransfer).filter(models.InternalTransfer.id == transfer_id).with_for_update().first()
     if not transfer:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Internal transfer not found")
     
@@ -76,95 +89,110 @@ def complete_transfer(transfer_id: int, db: Session = Depends(get_db)):
     if transfer.status == "Canceled":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot complete a canceled transfer")
     
+    # Fetch and lock source and destination stock for all lines at once
+    levels = stock.fetch_stock_levels(
+        db,
+        [(transfer_item.product_id, transfer.from_warehouse_id) for transfer_item in transfer.transfer_items] +
+        [(transfer_item.product_id, transfer.to_warehouse_id) for transfer_item in transfer.transfer_items],
+        lock=True
+    )
+    
     # Check stock availability in source warehouse
+    required = {}
     for transfer_item in transfer.transfer_items:
-        stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == transfer_item.product_id,
-            models.StockLevel.warehouse_id == transfer.from_warehouse_id
-        ).first()
-        
-        if not stock_level or stock_level.quantity < transfer_item.quantity:
-            product = db.query(models.Product).filter(models.Product.id == transfer_item.product_id).first()
+        required[transfer_item.product_id] = required.get(transfer_item.product_id, 0) + transfer_item.quantity
+    
+    for product_id, quantity in required.items():
+        stock_level = levels.get((product_id, transfer.from_warehouse_id))
+        if not stock_level or stock_level.quantity < quantity:
+            product = db.query(models.Product).filter(models.Product.id == product_id).first()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for product {product.name if product else transfer_item.product_id} in source warehouse. Available: {stock_level.quantity if stock_level else 0}, Required: {transfer_item.quantity}"
+                detail=f"Insufficient stock for product {product.name if product else product_id} in source warehouse. Available: {stock_level.quantity if stock_level else 0}, Required: {quantity}"
             )
     
-    # Update transfer status
+    # Update transfer status (counters are written last, after the stock rows: see receipts.validate_receipt)
+    old_status = transfer.status
     transfer.status = "Done"
     transfer.completed_at = datetime.utcnow()
     
-    # Process each transfer item
+    # Each line moves stock out of the source warehouse and into the destination warehouse
+    moves = []
     for transfer_item in transfer.transfer_items:
-        # Decrease stock in source warehouse
-        from_stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == transfer_item.product_id,
-            models.StockLevel.warehouse_id == transfer.from_warehouse_id
-        ).first()
-        
-        from_stock_level.quantity -= transfer_item.quantity
-        from_new_quantity = from_stock_level.quantity
-        
-        # Create ledger entry for source warehouse (outgoing)
-        from_ledger_entry = models.StockLedgerEntry(
+        moves.append(stock.StockMove(
             product_id=transfer_item.product_id,
             warehouse_id=transfer.from_warehouse_id,
-            location_id=transfer_item.from_location_id,
             change_quantity=-transfer_item.quantity,  # Negative for outgoing
-            new_stock_level=from_new_quantity,
-            document_type="Internal Transfer",
-            document_id=transfer.id,
-            created_by=transfer.created_by
-        )
-        db.add(from_ledger_entry)
-        
-        # Increase stock in destination warehouse
-        to_stock_level = db.query(models.StockLevel).filter(
-            models.StockLevel.product_id == transfer_item.product_id,
-            models.StockLevel.warehouse_id == transfer.to_warehouse_id
-        ).first()
-        
-        if not to_stock_level:
-            # Create new stock level for destination warehouse
-            to_stock_level = models.StockLevel(
-                product_id=transfer_item.product_id,
-                warehouse_id=transfer.to_warehouse_id,
-                location_id=transfer_item.to_location_id,
-                quantity=0,
-                reorder_point=0
-            )
-            db.add(to_stock_level)
-            db.flush()
-        
-        to_stock_level.quantity += transfer_item.quantity
-        to_stock_level.location_id = transfer_item.to_location_id  # Update location if specified
-        to_new_quantity = to_stock_level.quantity
-        
-        # Create ledger entry for destination warehouse (incoming)
-        to_ledger_entry = models.StockLedgerEntry(
+            location_id=transfer_item.from_location_id
+        ))
+        moves.append(stock.StockMove(
             product_id=transfer_item.product_id,
             warehouse_id=transfer.to_warehouse_id,
-            location_id=transfer_item.to_location_id,
             change_quantity=transfer_item.quantity,  # Positive for incoming
-            new_stock_level=to_new_quantity,
-            document_type="Internal Transfer",
-            document_id=transfer.id,
-            created_by=transfer.created_by
-        )
-        db.add(to_ledger_entry)
+            location_id=transfer_item.to_location_id
+        ))
+    stock.post_stock_moves(db, moves, "Internal Transfer", transfer.id, transfer.created_by, levels=levels)
+    kpis.track_document_status(db, transfer, old_status, "Done")
+    
+    # Update destination location if specified (new destination rows are created with it)
+    for transfer_item in transfer.transfer_items:
+        to_stock_level = levels.get((transfer_item.product_id, transfer.to_warehouse_id))
+        if to_stock_level and transfer_item.to_location_id:
+            to_stock_level.location_id = transfer_item.to_location_id
     
     db.commit()
-    db.refresh(transfer)
-    return transfer
+    cache.invalidate_kpis()
+    return db.query(models.InternalTransfer).options(*TRANSFER_LOAD_OPTIONS).filter(models.InternalTransfer.id == transfer.id).one()
+
+@router.post("/complete-batch", response_model=schemas.DocumentBatchResult)
+def complete_transfers(batch: schemas.DocumentBatch, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Complete several internal transfers in one transaction, as PUT /transfers/{id}/complete does for one.
+    Source stock is checked once for the whole batch, in list order, including stock moved in by earlier
+    transfers of the batch. Rejected transfers are reported in the results; all others are completed.
+    """
+    return batch_validation.validate_documents(db, batch_validation.TRANSFERS, batch.document_ids)
 
 @router.get("/", response_model=List[schemas.InternalTransferOut])
-def get_transfers(db: Session = Depends(get_db)):
-    transfers = db.query(models.InternalTransfer).all()
+def get_transfers(
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    status: Optional[str] = Query(None, description="Filter by status: Draft, Waiting, Ready, Done, Canceled"),
+    warehouse_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, description="Include documents created at or after this timestamp"),
+    date_to: Optional[datetime] = Query(None, description="Include documents created before this timestamp")
+):
+    """
+    List internal transfers, newest first, with optional filters.
+    When a full page is returned, the X-Next-Cursor response header holds the cursor for the next page.
+    Lines and related records are loaded in batches (one query per relationship for the whole page).
+    """
+    query = db.query(models.InternalTransfer).options(*TRANSFER_LOAD_OPTIONS)
+    
+    if status:
+        query = query.filter(models.InternalTransfer.status == status)
+    if warehouse_id:
+        # A transfer belongs to both its source and destination warehouse
+        query = query.filter(
+            or_(
+                models.InternalTransfer.from_warehouse_id == warehouse_id,
+                models.InternalTransfer.to_warehouse_id == warehouse_id
+            )
+        )
+    if date_from:
+        query = query.filter(models.InternalTransfer.created_at >= date_from)
+    if date_to:
+        query = query.filter(models.InternalTransfer.created_at < date_to)
+    
+    transfers = apply_keyset(query, models.InternalTransfer.created_at, models.InternalTransfer.id, cursor).limit(limit).all()
+    set_next_cursor(response, transfers, limit, "created_at")
     return transfers
 
 @router.get("/{transfer_id}", response_model=schemas.InternalTransferOut)
 def get_transfer(transfer_id: int, db: Session = Depends(get_db)):
-    transfer = db.query(models.InternalTransfer).filter(models.InternalTransfer.id == transfer_id).first()
+    transfer = db.query(models.InternalTransfer).options(*TRANSFER_LOAD_OPTIONS).filter(models.InternalTransfer.id == transfer_id).first()
     if not transfer:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Internal transfer not found")
     return transfer
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, conlist
 from datetime import datetime
 from typing import Optional, List
 import enum
@@ -71,11 +71,23 @@ class ProductUpdate(ProductBase):
 
 class ProductOut(ProductBase):
     id: int
-    category: CategoryOut
+    category_id: Optional[int]
+    category: Optional[CategoryOut]
 
     class Config:
         orm_mode = True
 
+class ProductImportError(BaseModel):
+    row: int
+    sku_code: Optional[str]
+    error: str
+
+class ProductImportResult(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[ProductImportError]
+
 class WarehouseBase(BaseModel):
     name: str
 
@@ -118,6 +130,21 @@ class StockLevelOut(StockLevelBase):
     class Config:
         orm_mode = True
 
+class LowStockItemOut(BaseModel):
+    stock_level_id: int
+    product_id: int
+    sku_code: str
+    product_name: str
+    warehouse_id: int
+    warehouse_name: str
+    location_id: Optional[int]
+    quantity: int
+    reorder_point: int
+    shortfall: int  # reorder_point - quantity
+
+    class Config:
+        orm_mode = True
+
 class SupplierBase(BaseModel):
     name: str
 
@@ -237,6 +264,23 @@ class InternalTransferOut(InternalTransferBase):
     class Config:
         orm_mode = True
 
+# Batch validation (POST /receipts/validate-batch, /deliveries/validate-batch, /transfers/complete-batch)
+MAX_BATCH_DOCUMENTS = 1000
+
+class DocumentBatch(BaseModel):
+    document_ids: conlist(int, min_items=1, max_items=MAX_BATCH_DOCUMENTS)
+
+class DocumentBatchItemResult(BaseModel):
+    document_id: int
+    validated: bool
+    error: Optional[str] = None
+
+class DocumentBatchResult(BaseModel):
+    total: int
+    validated: int
+    failed: int
+    results: List[DocumentBatchItemResult]
+
 class StockAdjustmentItemBase(BaseModel):
     product_id: int
     counted_quantity: int
@@ -282,7 +326,7 @@ class StockLedgerEntryOut(BaseModel):
     document_type: str
     document_id: int
     timestamp: datetime
-    created_by_user: UserOut
+    created_by_user: Optional[UserOut]
 
     class Config:
         orm_mode = True
@@ -296,6 +340,13 @@ class DashboardKPIs(BaseModel):
     pending_deliveries: int
     internal_transfers_scheduled: int
 
+class KPICacheStats(BaseModel):
+    enabled: bool
+    available: bool
+    version: Optional[int]
+    hits: int
+    misses: int
+
 class DashboardFilterParams(BaseModel):
     document_type: Optional[str] = None # Receipts, Delivery, Internal, Adjustments
     status: Optional[str] = None # Draft, Waiting, Ready, Done, Canceled
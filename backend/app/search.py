@@ -0,0 +1,158 @@
+"""
+Substring search over product names and SKU codes, ranked by trigram similarity.
+
+On PostgreSQL the `search` filter stays an ILIKE '%term%' match, which the
+pg_trgm GIN indexes created by `migrations.create_trigram_indexes` serve
+without a sequential scan, and results are ordered by `similarity()`.
+
+Other databases (SQLite in development and tests) have no trigram index, so
+`ProductSearchIndex` keeps an in-process one: every lowercase 3-character
+substring of a name or SKU maps to the products containing it. A term of three
+or more characters only has to be checked against the products that contain
+all of its trigrams. Similarity is computed the way pg_trgm does it, so both
+paths rank the same way. The index is loaded on first use and kept current by
+the product endpoints of this process.
+"""
+
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def pg_trigrams(text: str) -> Set[str]:
+    """Trigrams as pg_trgm extracts them: per lowercase word, padded with two spaces in front and one behind."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(left: str, right: str) -> float:
+    """Equivalent of pg_trgm `similarity()`: shared trigrams over all trigrams of both strings."""
+    left_grams, right_grams = pg_trigrams(left), pg_trigrams(right)
+    if not left_grams or not right_grams:
+        return 0.0
+    return len(left_grams & right_grams) / len(left_grams | right_grams)
+
+
+def _substrings(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Entry(NamedTuple):
+    name: str  # Lowercase, for matching
+    sku: str  # Lowercase, for matching
+    sku_code: Optional[str]
+    category_id: Optional[int]
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries: Dict[int, _Entry] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._entries = {}
+            self._postings = {}
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        rows = await db.execute(select(
+            models.Product.id, models.Product.name, models.Product.sku_code, models.Product.category_id
+        ))
+        with self._lock:
+            if not self._loaded:
+                for product_id, name, sku_code, category_id in rows:
+                    self._add(product_id, name, sku_code, category_id)
+                self._loaded = True
+
+    def upsert(self, product: models.Product):
+        """Reflect a created or updated product. Does nothing until the index has been loaded."""
+        with self._lock:
+            if self._loaded:
+                self._remove(product.id)
+                self._add(product.id, product.name, product.sku_code, product.category_id)
+
+    def _add(self, product_id: int, name: Optional[str], sku_code: Optional[str], category_id: Optional[int]):
+        entry = _Entry((name or "").lower(), (sku_code or "").lower(), sku_code, category_id)
+        self._entries[product_id] = entry
+        for gram in _substrings(entry.name) | _substrings(entry.sku):
+            self._postings.setdefault(gram, set()).add(product_id)
+
+    def _remove(self, product_id: int):
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return
+        for gram in _substrings(entry.name) | _substrings(entry.sku):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(product_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(
+        self,
+        term: str,
+        category_id: Optional[int] = None,
+        sku_code: Optional[str] = None
+    ) -> List[int]:
+        """
+        Ids of the products whose name or SKU contains `term` (case-insensitive),
+        best match first; ties are broken by id.
+        """
+        term = term.lower()
+        with self._lock:
+            grams = _substrings(term)
+            if grams:
+                postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+            else:
+                # Terms shorter than a trigram cannot be narrowed down
+                candidates = set(self._entries)
+            entries = [(product_id, self._entries[product_id]) for product_id in candidates]
+
+        ranked = []
+        for product_id, entry in entries:
+            if category_id and entry.category_id != category_id:
+                continue
+            if sku_code and entry.sku_code != sku_code:
+                continue
+            if term not in entry.name and term not in entry.sku:
+                continue
+            score = max(similarity(entry.name, term), similarity(entry.sku, term))
+            ranked.append((-score, product_id))
+
+        ranked.sort()
+        return [product_id for _, product_id in ranked]
+
+
+product_index = ProductSearchIndex()
+
+
+def supports_trigram_search(db) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def trigram_search_filter(term: str):
+    pattern = f"%{term}%"
+    return or_(models.Product.name.ilike(pattern), models.Product.sku_code.ilike(pattern))
+
+
+def trigram_rank(term: str):
+    return func.greatest(
+        func.similarity(models.Product.name, term),
+        func.similarity(models.Product.sku_code, term)
+    )
@@ -0,0 +1,148 @@
+"""
+Bearer token authentication for the API routers.
+
+`get_current_user` verifies access tokens issued by `utils.create_access_token`
+and resolves them to the user. Verified tokens are kept in a bounded in-process
+cache for AUTH_CACHE_TTL_SECONDS (never past the token's expiry), so a cached
+request costs one dictionary lookup instead of a signature check and a User
+query.
+
+A password reset drops the user's cached tokens in this process and records the
+reset time in Redis; tokens issued before it are rejected by every worker once
+their cache entries expire.
+
+    AUTH_CACHE_TTL_SECONDS      how long a verified token is trusted (default 60)
+    AUTH_CACHE_MAX_ENTRIES      tokens kept per worker, least recently used dropped (default 10000)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import redis
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, utils
+from .database import get_async_db
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+PASSWORD_CHANGED_PREFIX = "auth:password_changed:"
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class CurrentUser(NamedTuple):
+    id: int
+    email: str
+
+
+class TokenCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[float, CurrentUser]] = OrderedDict()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: CurrentUser, expires_at: float):
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_email(self, email: str):
+        with self._lock:
+            for token in [token for token, (_, user) in self._entries.items() if user.email == email]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(AUTH_CACHE_MAX_ENTRIES)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+async def _password_changed_at(email: str) -> int:
+    try:
+        value = await utils.async_redis_client.get(PASSWORD_CHANGED_PREFIX + email)
+    except redis.RedisError:
+        # Without Redis, revocation falls back to the token expiry
+        return 0
+    return int(value) if value else 0
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    if credentials is None:
+        raise _credentials_exception()
+    token = credentials.credentials
+
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    try:
+        payload = utils.decode_token(token)
+    except ValueError:
+        raise _credentials_exception()
+    email = payload.get("sub")
+    # Password reset tokens are signed with the same key but do not grant API access
+    if email is None or payload.get("type") is not None:
+        raise _credentials_exception()
+    if payload.get("iat", 0) < await _password_changed_at(email):
+        raise _credentials_exception()
+
+    row = (await db.execute(
+        select(models.User.id, models.User.email).filter(models.User.email == email)
+    )).first()
+    if row is None:
+        raise _credentials_exception()
+
+    user = CurrentUser(row.id, row.email)
+    expires_at = time.time() + AUTH_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        expires_at = min(expires_at, payload["exp"])
+    token_cache.put(token, user, expires_at)
+    return user
+
+
+async def revoke_user_tokens(email: str):
+    """Reject the user's tokens issued up to now; called after a password change."""
+    token_cache.invalidate_email(email)
+    try:
+        await utils.async_redis_client.set(
+            PASSWORD_CHANGED_PREFIX + email,
+            int(time.time()),  # Whole seconds, like the token's iat
+            ex=utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+    except redis.RedisError:
+        pass
@@ -0,0 +1,232 @@
+"""
+Set-based stock posting shared by the document routers.
+
+A validated document is turned into a list of StockMove lines and posted in
+one go: the affected StockLevel rows are fetched with a single query, missing
+rows are created with one multi-row INSERT (and read back with one more query),
+every ledger line is written
+with one multi-row INSERT, so the number of round trips does not grow with
+the number of lines on the document. The dashboard counters (app/kpis.py) are
+updated in the same transaction. post_document_moves does the same for several
+documents at once (see app/batch_validation.py).
+
+Quantities are read, checked and written back in Python, so the StockLevel rows
+are fetched with SELECT ... FOR UPDATE. The rows are locked in (product_id,
+warehouse_id) order, which is the same order for every document: concurrent
+validations touching the same products wait for each other instead of
+overselling, and cannot deadlock on each other's rows.
+
+Across a whole validation the order is: the document row(s), then the stock rows
+(fetched with lock=True before anything else is written, then any rows created
+by the posting), then the kpi_counters rows. Callers write document status
+counters after posting, so no path holds a counter row while waiting for a stock row.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import kpis, models
+
+StockKey = Tuple[int, int]  # (product_id, warehouse_id)
+
+
+class StockMove(NamedTuple):
+    product_id: int
+    warehouse_id: int
+    change_quantity: int  # Positive for incoming, negative for outgoing
+    location_id: Optional[int] = None
+
+
+def stock_key_filter(keys: Iterable[StockKey]):
+    """
+    Build a WHERE clause matching StockLevel rows for the given (product_id, warehouse_id) keys,
+    grouped per warehouse so it stays a handful of IN lists instead of one OR per key.
+    """
+    by_warehouse: Dict[int, List[int]] = {}
+    for product_id, warehouse_id in keys:
+        by_warehouse.setdefault(warehouse_id, []).append(product_id)
+
+    return or_(*[
+        and_(
+            models.StockLevel.warehouse_id == warehouse_id,
+            models.StockLevel.product_id.in_(product_ids)
+        )
+        for warehouse_id, product_ids in by_warehouse.items()
+    ])
+
+
+def first_missing_product(db: Session, product_ids: List[int]) -> Optional[int]:
+    """
+    Check that all products exist with one query.
+    Returns the first id (in the given order) that does not exist, or None.
+    """
+    unique_ids = set(product_ids)
+    if not unique_ids:
+        return None
+    found = {product_id for product_id, in db.query(models.Product.id).filter(models.Product.id.in_(unique_ids))}
+    return next((product_id for product_id in product_ids if product_id not in found), None)
+
+
+def fetch_stock_levels(db: Session, keys: Iterable[StockKey], lock: bool = False) -> Dict[StockKey, models.StockLevel]:
+    """
+    Load the StockLevel rows for all keys with one query.
+    There is one row per key (uq_stock_levels_product_warehouse); on a database where
+    migrations.merge_duplicate_stock_levels has not run yet, the oldest row (lowest id) is used.
+    With `lock`, the rows stay locked until the transaction ends; pass it when the quantities
+    are checked or changed.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+
+    query = db.query(models.StockLevel).filter(stock_key_filter(keys)).order_by(
+        # Also the lock order (rows are locked as the sorted result is read)
+        models.StockLevel.product_id,
+        models.StockLevel.warehouse_id,
+        models.StockLevel.id
+    )
+    if lock:
+        query = query.with_for_update()
+    rows = query.all()
+
+    levels: Dict[StockKey, models.StockLevel] = {}
+    for row in rows:
+        levels.setdefault((row.product_id, row.warehouse_id), row)
+    return levels
+
+
+def create_stock_levels(db: Session, rows: List[dict]) -> Set[StockKey]:
+    """
+    Create missing StockLevel rows (quantity 0) with one multi-row INSERT ... ON CONFLICT DO NOTHING.
+    Returns the keys of the rows this call created; a key missing from the result was created by
+    another transaction after it was looked up, and the row it created is kept as it is.
+    """
+    table = models.StockLevel.__table__
+    rows = sorted(rows, key=lambda row: (row["product_id"], row["warehouse_id"]))
+    keys = [(row["product_id"], row["warehouse_id"]) for row in rows]
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table).values(rows).on_conflict_do_nothing(
+            index_elements=[table.c.product_id, table.c.warehouse_id]
+        ).returning(table.c.product_id, table.c.warehouse_id)
+        return {tuple(key) for key in db.execute(stmt)}
+
+    if dialect == "sqlite":
+        stmt = sqlite.insert(table).values(rows).on_conflict_do_nothing(
+            index_elements=[table.c.product_id, table.c.warehouse_id]
+        )
+        created_count = db.execute(stmt).rowcount
+        if created_count == len(rows):
+            return set(keys)
+        # No RETURNING here; the statement held the write lock, so the rows it created
+        # have the last `created_count` rowids up to last_insert_rowid()
+        last_id = db.execute(select(func.last_insert_rowid())).scalar()
+        return {tuple(key) for key in db.execute(
+            select(table.c.product_id, table.c.warehouse_id).where(table.c.id > last_id - created_count, table.c.id <= last_id)
+        )}
+
+    db.execute(table.insert(), rows)
+    return set(keys)
+
+
+class DocumentMoves(NamedTuple):
+    document_type: str
+    document_id: int
+    created_by: Optional[int]
+    moves: List[StockMove]
+
+
+def post_stock_moves(
+    db: Session,
+    moves: List[StockMove],
+    document_type: str,
+    document_id: int,
+    created_by: Optional[int],
+    levels: Optional[Dict[StockKey, models.StockLevel]] = None
+) -> Dict[StockKey, int]:
+    """
+    Apply all moves of a document and write one ledger entry per move.
+    Ledger `new_stock_level` values are running totals, so several lines for the same
+    product on one document still produce a consistent history.
+    `levels` can be passed when the caller already fetched the rows with `lock=True` (e.g. for an availability check).
+    Returns the resulting quantity per (product_id, warehouse_id).
+    Changes are left in the session; the caller commits.
+    """
+    return post_document_moves(db, [DocumentMoves(document_type, document_id, created_by, moves)], levels=levels)
+
+
+def post_document_moves(
+    db: Session,
+    documents: List[DocumentMoves],
+    levels: Optional[Dict[StockKey, models.StockLevel]] = None
+) -> Dict[StockKey, int]:
+    """
+    Apply the moves of several documents as post_stock_moves does for one, with the same
+    number of statements: running totals carry over from one document to the next, in list order.
+    """
+    if not any(document.moves for document in documents):
+        return {}
+
+    keys = [(move.product_id, move.warehouse_id) for document in documents for move in document.moves]
+    levels = dict(levels) if levels is not None else fetch_stock_levels(db, keys, lock=True)
+
+    # Missing rows are created empty and then locked and read like existing ones, so the ledger
+    # totals and counter changes start from what is stored even if another transaction created
+    # the row in the meantime
+    missing: Dict[StockKey, dict] = {}
+    for document in documents:
+        for move in document.moves:
+            key = (move.product_id, move.warehouse_id)
+            if key not in levels and key not in missing:
+                missing[key] = {
+                    "product_id": move.product_id,
+                    "warehouse_id": move.warehouse_id,
+                    "location_id": move.location_id,
+                    "quantity": 0,
+                    "reorder_point": 0
+                }
+    created: Set[StockKey] = set()
+    if missing:
+        created = create_stock_levels(db, list(missing.values()))
+        levels.update(fetch_stock_levels(db, missing, lock=True))
+        for key in missing.keys() - created:
+            # As the first move would have set it on a new row
+            if missing[key]["location_id"]:
+                levels[key].location_id = missing[key]["location_id"]
+
+    quantities: Dict[StockKey, int] = {}
+    ledger_rows = []
+    for document in documents:
+        for move in document.moves:
+            key = (move.product_id, move.warehouse_id)
+            if key not in quantities:
+                quantities[key] = levels[key].quantity or 0
+            quantities[key] += move.change_quantity
+            ledger_rows.append({
+                "product_id": move.product_id,
+                "warehouse_id": move.warehouse_id,
+                "location_id": move.location_id,
+                "change_quantity": move.change_quantity,
+                "new_stock_level": quantities[key],
+                "document_type": document.document_type,
+                "document_id": document.document_id,
+                "created_by": document.created_by
+            })
+
+    changes = []
+    for key, quantity in quantities.items():
+        level = levels[key]
+        if key in created:
+            changes.append(kpis.StockChange(*key, None, None, quantity, level.reorder_point))
+        else:
+            changes.append(kpis.StockChange(*key, level.quantity, level.reorder_point, quantity, level.reorder_point))
+        # Rows are updated through the unit of work (one executemany UPDATE on flush)
+        level.quantity = quantity
+
+    db.execute(models.StockLedgerEntry.__table__.insert(), ledger_rows)
+    kpis.track_stock_changes(db, changes)
+    return quantities
@@ -0,0 +1,425 @@
+"""
+Synthetic inventory data at production scale.
+
+`generate` simulates years of warehouse activity and bulk-loads the result:
+receipts, deliveries, internal transfers and adjustments with their lines,
+the stock ledger they post, and stock levels equal to the ledger sums.
+
+- Product popularity follows a Zipf distribution, so a few SKUs move most
+  of the volume, and warehouses are skewed the same way, more gently.
+- Deliveries never take more than is on hand. Receipts top stock back up
+  to about a month of observed demand, in the product's pack size, so
+  slow movers run out now and then. Each reorder point covers about two
+  weeks of the product's demand in that warehouse.
+- The output depends only on the options: the same seed and end date
+  produce the same rows.
+- Rows get their ids here and are written in batches. PostgreSQL gets
+  COPY, SQLite gets executemany on a raw cursor, and other databases get
+  Core executemany.
+
+seed_data.py is the command line for this module.
+"""
+
+import csv
+import io
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from . import models
+
+CATEGORY_NAMES = [
+    "Electronics", "Furniture", "Raw Materials", "Tools", "Office Supplies", "Fasteners", "Packaging",
+    "Cleaning", "Safety Equipment", "Electrical", "Plumbing", "Paint", "Adhesives", "Lighting",
+    "Hardware", "Textiles", "Chemicals", "Spare Parts", "Storage", "Lubricants",
+]
+PRODUCT_NOUNS = [
+    "Bolt", "Nut", "Washer", "Screw", "Cable", "Panel", "Drill", "Tape", "Glove", "Valve", "Pipe",
+    "Bracket", "Hinge", "Switch", "Lamp", "Filter", "Hose", "Clamp", "Sealant", "Box", "Pallet", "Sheet",
+]
+PRODUCT_ADJECTIVES = [
+    "Steel", "Brass", "Heavy-Duty", "Compact", "Galvanized", "Industrial", "Flexible", "Insulated",
+    "Stainless", "Reinforced", "Plastic", "Copper", "Aluminium", "Coated",
+]
+UNITS = ["pcs", "pcs", "pcs", "box", "kg", "m", "l"]
+WAREHOUSE_NAMES = ["Main Warehouse", "North Warehouse", "South Warehouse", "East Warehouse", "West Warehouse"]
+
+# Document mix of the simulation; transfers need a second warehouse
+DOCUMENT_WEIGHTS = {"Receipt": 25, "Delivery": 55, "Internal Transfer": 10, "Adjustment": 10}
+LINES_PER_DOCUMENT = ([1, 2, 3, 4, 5, 6, 7, 8], [30, 22, 16, 11, 8, 6, 4, 3])
+RECEIPT_PACK_SIZES = [12, 24, 48, 60, 100, 120, 250]
+REORDER_COVER_DAYS = 14
+REPLENISH_COVER_DAYS = 30  # Receipts top stock up to this many days of observed demand
+PENDING_STATUSES = ["Draft", "Waiting", "Ready"]
+
+
+class GeneratorOptions(NamedTuple):
+    seed: int = 42
+    products: int = 2000
+    categories: int = 20
+    warehouses: int = 3
+    locations_per_warehouse: int = 4
+    suppliers: int = 50
+    ledger_rows: int = 100_000
+    years: float = 2.0
+    end: Optional[datetime] = None  # Defaults to today 00:00 UTC
+    zipf_exponent: float = 1.1
+    pending_documents: int = 60
+    batch_size: int = 10_000
+
+
+class BulkWriter:
+    """
+    Buffers rows per table as tuples and writes them in batches with the fastest
+    bulk path the connection's driver offers.
+
+    Register parent tables before the tables that reference them and append a
+    parent row before its children: when any buffer fills, every table is flushed
+    in registration order, so no row reaches the database before the row its
+    foreign key points to.
+    """
+
+    def __init__(self, conn: Connection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.counts: Dict[str, int] = {}
+        self._buffers: Dict[str, List[tuple]] = {}
+        self._writers: Dict[str, Callable[[List[tuple]], None]] = {}
+
+    def table(self, model, columns: Sequence[str]) -> Callable[[tuple], None]:
+        """Register a table; returns the function that appends one row (values in `columns` order)."""
+        table = model.__table__
+        buffer = self._buffers[table.name] = []
+        self.counts[table.name] = 0
+        self._writers[table.name] = self._bulk_writer(table, list(columns))
+
+        def append(row: tuple):
+            buffer.append(row)
+            if len(buffer) >= self.batch_size:
+                self.flush()
+        return append
+
+    def _bulk_writer(self, table, columns: List[str]) -> Callable[[List[tuple]], None]:
+        dialect = self.conn.dialect
+        if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+            copy_sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+            def copy(rows):
+                data = io.StringIO()
+                csv.writer(data).writerows(rows)  # None is written as an empty field, which COPY reads as NULL
+                data.seek(0)
+                with self.conn.connection.cursor() as cursor:
+                    cursor.copy_expert(copy_sql, data)
+            return copy
+
+        if dialect.name == "sqlite":
+            insert_sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+            def executemany(rows):
+                cursor = self.conn.connection.cursor()
+                try:
+                    cursor.executemany(insert_sql, rows)
+                finally:
+                    cursor.close()
+            return executemany
+
+        def core_executemany(rows):
+            self.conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+        return core_executemany
+
+    def _flush(self, name: str):
+        buffer = self._buffers[name]
+        if buffer:
+            self._writers[name](buffer)
+            self.counts[name] += len(buffer)
+            buffer.clear()
+
+    def flush(self):
+        for name in self._buffers:
+            self._flush(name)
+
+
+def _zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class _Simulation:
+    """State of one generate() run: ids, stock on hand and the writers for every table."""
+
+    def __init__(self, conn: Connection, options: GeneratorOptions, user_ids: List[int]):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.user_ids = user_ids
+        self.end = options.end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.end - timedelta(days=365 * options.years)
+        self.writer = BulkWriter(conn, options.batch_size)
+        self.ids = {name: itertools.count(1) for name in ("document", "line", "ledger")}
+
+        # Popularity rank -> product id, shuffled so popularity is unrelated to id and category
+        self.product_ids = list(range(1, options.products + 1))
+        self.rng.shuffle(self.product_ids)
+        self.product_weights = _zipf_cum_weights(options.products, options.zipf_exponent)
+        self.warehouse_ids = list(range(1, options.warehouses + 1))
+        self.warehouse_weights = _zipf_cum_weights(options.warehouses, 0.8)
+
+        self.stock: Dict[Tuple[int, int], int] = {}
+        self.delivered: Dict[Tuple[int, int], int] = {}
+        self.ledger_rows = 0
+
+        self.add_ledger = self.writer.table(models.StockLedgerEntry, (
+            "id", "product_id", "warehouse_id", "location_id", "change_quantity", "new_stock_level",
+            "document_type", "document_id", "timestamp", "created_by",
+        ))
+
+    def home_location(self, product_id: int, warehouse_id: int) -> int:
+        """Each product is stored at one location per warehouse."""
+        per_warehouse = self.options.locations_per_warehouse
+        return (warehouse_id - 1) * per_warehouse + product_id % per_warehouse + 1
+
+    def pick_products(self) -> List[int]:
+        count = self.rng.choices(*LINES_PER_DOCUMENT)[0]
+        picked = self.rng.choices(self.product_ids, cum_weights=self.product_weights, k=count)
+        return list(dict.fromkeys(picked))  # Lines of a document are distinct products
+
+    def pack_size(self, product_id: int) -> int:
+        return RECEIPT_PACK_SIZES[product_id % len(RECEIPT_PACK_SIZES)]
+
+    def replenishment(self, product_id: int, warehouse_id: int, elapsed_days: float) -> int:
+        """Quantity to receive: whole packs up to REPLENISH_COVER_DAYS of demand, at least one pack when out of stock."""
+        key = (product_id, warehouse_id)
+        on_hand = self.stock.get(key, 0)
+        target = self.delivered.get(key, 0) / max(elapsed_days, 7) * REPLENISH_COVER_DAYS
+        if on_hand > 0 and on_hand >= target:
+            return 0
+        pack = self.pack_size(product_id)
+        return pack * max(1, math.ceil((target - on_hand) / pack))
+
+    def pick_warehouse(self) -> int:
+        return self.rng.choices(self.warehouse_ids, cum_weights=self.warehouse_weights)[0]
+
+    def post(self, product_id: int, warehouse_id: int, change: int, document_type: str, document_id: int,
+             timestamp: datetime, user_id: int):
+        key = (product_id, warehouse_id)
+        level = self.stock.get(key, 0) + change
+        self.stock[key] = level
+        self.add_ledger((
+            next(self.ids["ledger"]), product_id, warehouse_id, self.home_location(product_id, warehouse_id),
+            change, level, document_type, document_id, timestamp, user_id,
+        ))
+        self.ledger_rows += 1
+
+    def run(self) -> Dict[str, int]:
+        options, rng = self.options, self.rng
+        add_receipt = self.writer.table(models.Receipt, (
+            "id", "document_type", "supplier_id", "warehouse_id", "status", "created_at", "validated_at", "created_by",
+        ))
+        add_receipt_item = self.writer.table(models.ReceiptItem, ("id", "receipt_id", "product_id", "quantity_received"))
+        add_delivery = self.writer.table(models.DeliveryOrder, (
+            "id", "document_type", "warehouse_id", "status", "created_at", "validated_at", "created_by",
+        ))
+        add_delivery_item = self.writer.table(models.DeliveryOrderItem, ("id", "delivery_order_id", "product_id", "quantity_delivered"))
+        add_transfer = self.writer.table(models.InternalTransfer, (
+            "id", "document_type", "from_warehouse_id", "to_warehouse_id", "status", "created_at", "completed_at", "created_by",
+        ))
+        add_transfer_item = self.writer.table(models.InternalTransferItem, (
+            "id", "internal_transfer_id", "product_id", "quantity", "from_location_id", "to_location_id",
+        ))
+        add_adjustment = self.writer.table(models.StockAdjustment, (
+            "id", "document_type", "warehouse_id", "status", "created_at", "created_by", "reason",
+        ))
+        add_adjustment_item = self.writer.table(models.StockAdjustmentItem, (
+            "id", "stock_adjustment_id", "product_id", "counted_quantity", "system_quantity", "location_id",
+        ))
+
+        document_types = [name for name in DOCUMENT_WEIGHTS if options.warehouses > 1 or name != "Internal Transfer"]
+        document_weights = [DOCUMENT_WEIGHTS[name] for name in document_types]
+        span = self.end - self.start
+
+        while self.ledger_rows < options.ledger_rows:
+            # Time advances with the ledger, so history spans the whole period whatever the mix
+            # Documents are posted in ledger order and were created a little earlier
+            completed_at = self.start + span * ((self.ledger_rows + rng.random()) / options.ledger_rows)
+            timestamp = completed_at - timedelta(minutes=rng.randint(5, 240))
+            document_type = rng.choices(document_types, document_weights)[0]
+            user_id = rng.choice(self.user_ids)
+            warehouse_id = self.pick_warehouse()
+            document_id = next(self.ids["document"])
+            items = []  # Line rows, written after their document
+
+            if document_type == "Receipt":
+                elapsed_days = (completed_at - self.start).total_seconds() / 86400
+                for product_id in self.pick_products():
+                    quantity = self.replenishment(product_id, warehouse_id, elapsed_days)
+                    if quantity <= 0:
+                        continue
+                    items.append((next(self.ids["line"]), document_id, product_id, quantity))
+                    self.post(product_id, warehouse_id, quantity, document_type, document_id, completed_at, user_id)
+                if items:
+                    add_receipt((document_id, "Receipt", rng.randint(1, options.suppliers), warehouse_id, "Done",
+                                 timestamp, completed_at, user_id))
+                    for item in items:
+                        add_receipt_item(item)
+
+            elif document_type == "Delivery":
+                for product_id in self.pick_products():
+                    on_hand = self.stock.get((product_id, warehouse_id), 0)
+                    quantity = min(on_hand, 1 + int(rng.expovariate(1 / 6)))
+                    if quantity <= 0:
+                        continue
+                    key = (product_id, warehouse_id)
+                    self.delivered[key] = self.delivered.get(key, 0) + quantity
+                    items.append((next(self.ids["line"]), document_id, product_id, quantity))
+                    self.post(product_id, warehouse_id, -quantity, "Delivery", document_id, completed_at, user_id)
+                if items:
+                    add_delivery((document_id, "Delivery", warehouse_id, "Done", timestamp, completed_at, user_id))
+                    for item in items:
+                        add_delivery_item(item)
+
+            elif document_type == "Internal Transfer":
+                to_warehouse_id = rng.choice([w for w in self.warehouse_ids if w != warehouse_id])
+                for product_id in self.pick_products():
+                    quantity = min(self.stock.get((product_id, warehouse_id), 0), rng.randint(1, 30))
+                    if quantity <= 0:
+                        continue
+                    items.append((
+                        next(self.ids["line"]), document_id, product_id, quantity,
+                        self.home_location(product_id, warehouse_id), self.home_location(product_id, to_warehouse_id),
+                    ))
+                    self.post(product_id, warehouse_id, -quantity, document_type, document_id, completed_at, user_id)
+                    self.post(product_id, to_warehouse_id, quantity, document_type, document_id, completed_at, user_id)
+                if items:
+                    add_transfer((document_id, "Internal Transfer", warehouse_id, to_warehouse_id, "Done",
+                                  timestamp, completed_at, user_id))
+                    for item in items:
+                        add_transfer_item(item)
+
+            else:
+                for product_id in self.pick_products():
+                    system_quantity = self.stock.get((product_id, warehouse_id), 0)
+                    counted_quantity = max(0, system_quantity + rng.choice([-3, -2, -1, -1, 1, 2]))
+                    if counted_quantity == system_quantity:
+                        continue
+                    items.append((
+                        next(self.ids["line"]), document_id, product_id, counted_quantity, system_quantity,
+                        self.home_location(product_id, warehouse_id),
+                    ))
+                    self.post(product_id, warehouse_id, counted_quantity - system_quantity, "Adjustment",
+                              document_id, completed_at, user_id)
+                if items:
+                    add_adjustment((document_id, "Adjustment", warehouse_id, "Done", completed_at, user_id,
+                                    rng.choice(["Cycle count", "Damaged goods", "Found in stock", "Stocktake"])))
+                    for item in items:
+                        add_adjustment_item(item)
+
+        # Open documents from the last few days: counted on the dashboard, nothing posted yet
+        pending_types = [name for name in document_types if name != "Adjustment"]
+        for _ in range(options.pending_documents):
+            timestamp = self.end - timedelta(days=3 * rng.random())
+            status = rng.choice(PENDING_STATUSES)
+            user_id = rng.choice(self.user_ids)
+            warehouse_id = self.pick_warehouse()
+            document_id = next(self.ids["document"])
+            products = self.pick_products()
+            kind = rng.choice(pending_types)
+            if kind == "Receipt":
+                add_receipt((document_id, "Receipt", rng.randint(1, options.suppliers), warehouse_id, status,
+                             timestamp, None, user_id))
+                for product_id in products:
+                    add_receipt_item((next(self.ids["line"]), document_id, product_id, self.pack_size(product_id)))
+            elif kind == "Delivery":
+                add_delivery((document_id, "Delivery", warehouse_id, status, timestamp, None, user_id))
+                for product_id in products:
+                    add_delivery_item((next(self.ids["line"]), document_id, product_id, 1 + int(rng.expovariate(1 / 6))))
+            else:
+                to_warehouse_id = rng.choice([w for w in self.warehouse_ids if w != warehouse_id])
+                add_transfer((document_id, "Internal Transfer", warehouse_id, to_warehouse_id, status, timestamp, None, user_id))
+                for product_id in products:
+                    add_transfer_item((
+                        next(self.ids["line"]), document_id, product_id, rng.randint(1, 30),
+                        self.home_location(product_id, warehouse_id), self.home_location(product_id, to_warehouse_id),
+                    ))
+
+        # Stock levels are the ledger sums; reorder points cover REORDER_COVER_DAYS of observed demand
+        add_stock_level = self.writer.table(models.StockLevel, (
+            "id", "product_id", "warehouse_id", "location_id", "quantity", "reorder_point",
+        ))
+        days = max(span.total_seconds() / 86400, 1)
+        for stock_level_id, key in enumerate(sorted(self.stock), start=1):
+            product_id, warehouse_id = key
+            reorder_point = math.ceil(self.delivered.get(key, 0) / days * REORDER_COVER_DAYS)
+            add_stock_level((stock_level_id, product_id, warehouse_id, self.home_location(product_id, warehouse_id),
+                             self.stock[key], reorder_point))
+
+        self.writer.flush()
+        return self.writer.counts
+
+
+def generate(conn: Connection, options: GeneratorOptions, users: Sequence[Tuple[str, str]]) -> Dict[str, int]:
+    """
+    Load a synthetic dataset into empty tables through `conn`; `users` are (email, hashed_password)
+    pairs that create the documents. Returns the number of rows written per table.
+    The caller commits, resets id sequences (`reset_sequences`) and rebuilds the KPI counters.
+    """
+    rng = random.Random(options.seed)
+    writer = BulkWriter(conn, options.batch_size)
+
+    add_user = writer.table(models.User, ("id", "email", "hashed_password", "is_active"))
+    for user_id, (email, hashed_password) in enumerate(users, start=1):
+        add_user((user_id, email, hashed_password, True))
+
+    add_category = writer.table(models.Category, ("id", "name"))
+    for category_id in range(1, options.categories + 1):
+        name = CATEGORY_NAMES[category_id - 1] if category_id <= len(CATEGORY_NAMES) else f"Category {category_id}"
+        add_category((category_id, name))
+
+    add_supplier = writer.table(models.Supplier, ("id", "name"))
+    for supplier_id in range(1, options.suppliers + 1):
+        add_supplier((supplier_id, f"Supplier {supplier_id:03d}"))
+
+    add_warehouse = writer.table(models.Warehouse, ("id", "name"))
+    add_location = writer.table(models.Location, ("id", "name", "warehouse_id"))
+    location_ids = itertools.count(1)
+    for warehouse_id in range(1, options.warehouses + 1):
+        name = WAREHOUSE_NAMES[warehouse_id - 1] if warehouse_id <= len(WAREHOUSE_NAMES) else f"Warehouse {warehouse_id}"
+        add_warehouse((warehouse_id, name))
+        for aisle in range(1, options.locations_per_warehouse + 1):
+            add_location((next(location_ids), f"WH{warehouse_id}-A{aisle:02d}", warehouse_id))
+
+    add_product = writer.table(models.Product, ("id", "name", "sku_code", "category_id", "unit_of_measure", "initial_stock"))
+    for product_id in range(1, options.products + 1):
+        name = f"{rng.choice(PRODUCT_ADJECTIVES)} {rng.choice(PRODUCT_NOUNS)} {rng.choice(['S', 'M', 'L', 'XL'])}"
+        add_product((product_id, name, f"SKU-{product_id:07d}", rng.randint(1, options.categories), rng.choice(UNITS), 0))
+
+    # Parents first: the simulation's tables reference these
+    writer.flush()
+    counts = dict(writer.counts)
+    counts.update(_Simulation(conn, options, list(range(1, len(users) + 1))).run())
+    return counts
+
+
+def reset_sequences(conn: Connection):
+    """Move PostgreSQL id sequences past the ids written by `generate`."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in models.Base.metadata.sorted_tables:
+        if table.autoincrement_column is not None and table.autoincrement_column.name == "id":
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table.name}"
+            ))
+
+
+def stock_level_mismatches(conn: Connection) -> List[tuple]:
+    """(product_id, warehouse_id, stock quantity, ledger sum) for every stock level that differs from its ledger."""
+    return conn.execute(text(
+        "SELECT s.product_id, s.warehouse_id, s.quantity, COALESCE(l.total, 0) "
+        "FROM stock_levels s LEFT JOIN ("
+        "  SELECT product_id, warehouse_id, SUM(change_quantity) AS total "
+        "  FROM stock_ledger_entries GROUP BY product_id, warehouse_id"
+        ") l ON l.product_id = s.product_id AND l.warehouse_id = s.warehouse_id "
+        "WHERE s.quantity <> COALESCE(l.total, 0)"
+    )).all()
@@ -1,34 +1,65 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+"""
+Password hashing, tokens and the shared Redis clients.
+
+passlib and jose are imported on first use and the Redis clients are created
+on first access, so importing the app stays cheap for workers that are
+starting up.
+"""
+
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 import os
-import redis
 import random
 import bcrypt
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Cost factor for new hashes; existing hashes keep theirs
 
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
-redis_client = redis.StrictRedis.from_url(REDIS_URL, decode_responses=True)
+
+@lru_cache()
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+def __getattr__(name):
+    # redis_client / async_redis_client: created on first access and then kept as module attributes
+    if name == "redis_client":
+        import redis
+        client = redis.StrictRedis.from_url(REDIS_URL, decode_responses=True)
+    elif name == "async_redis_client":
+        import redis.asyncio
+        client = redis.asyncio.StrictRedis.from_url(REDIS_URL, decode_responses=True)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return globals().setdefault(name, client)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
+
+def decode_token(token: str) -> dict:
+    """Verify a token issued by `create_access_token` and return its claims; raises ValueError if it is invalid."""
+    from jose import JWTError, jwt
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as error:
+        raise ValueError(str(error)) from error
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -37,7 +68,7 @@ def generate_otp():
 
 def hash_otp(otp_code: str) -> str:
     # Hash the OTP using bcrypt as required by the PDF
-    hashed_otp = bcrypt.hashpw(otp_code.encode('utf-8'), bcrypt.gensalt())
+    hashed_otp = bcrypt.hashpw(otp_code.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
     return hashed_otp.decode('utf-8')
 
 def verify_otp(plain_otp: str, hashed_otp: str) -> bool:
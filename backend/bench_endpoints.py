@@ -0,0 +1,264 @@
+"""
+Endpoint benchmark suite.
+
+Loads a synthetic dataset (N products, M warehouses, K ledger rows) into a
+fresh database with the same generator as seed_data.py (app/synthetic.py), then
+calls the API in-process and reports, per scenario and concurrency level,
+requests per second and p50/p95/p99 latency as JSON, so runs can be compared
+over time. At concurrency N, N threads send requests through one shared client,
+so they queue for the same event loop, worker threads, connection pool and
+row locks as in one API process. rps is completed requests / wall-clock time.
+
+The target database is recreated: point --database-url at a scratch database.
+
+Usage:
+    python bench_endpoints.py [--products 10000] [--warehouses 5] [--ledger-rows 200000]
+                              [--requests 200] [--concurrency 1,8,32]
+                              [--database-url sqlite:///./benchmark.db]
+                              [--fakeredis] [--output results.json]
+
+--fakeredis runs the Redis-backed features (KPI cache, auth revocation) against an
+in-memory Redis; without it REDIS_URL must point at a running server.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--warehouses", type=int, default=5)
+    parser.add_argument("--ledger-rows", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=5, help="lines per document in the validation scenarios")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 8, 32],
+        help="comma-separated numbers of concurrent clients; every scenario runs at each level"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--fakeredis", action="store_true")
+    parser.add_argument("--scenarios", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+def load_dataset(engine, args):
+    """Recreate the schema and load a synthetic dataset; user 1 (bench@example.com) creates the documents."""
+    from app import kpis, migrations, models, synthetic
+    from app.database import Base
+    from sqlalchemy.orm import Session
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # As in seed_data.py: the ledger indexes are built once after loading
+    for index in models.StockLedgerEntry.__table__.indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+    options = synthetic.GeneratorOptions(
+        seed=args.seed, products=args.products, warehouses=args.warehouses, ledger_rows=args.ledger_rows
+    )
+    with engine.begin() as conn:
+        synthetic.generate(conn, options, [("bench@example.com", "-")])
+        synthetic.reset_sequences(conn)
+
+    migrations.migrate(engine)
+    with Session(engine) as db:
+        kpis.rebuild_counters(db)
+        db.commit()
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class Scenario(NamedTuple):
+    call: Callable  # Sends one request; gets what `prepare` returned
+    prepare: Optional[Callable] = None  # Untimed, one per call, before the timed calls start
+    setup: Callable = nullcontext  # Context manager around the whole scenario
+
+def measure(name, scenario, concurrency, args):
+    """
+    Send `args.warmup` untimed requests, then `args.requests` timed ones from `concurrency` threads.
+    Failed requests are counted in "errors" (lock timeouts under load are results too); a scenario
+    where every request fails raises.
+    """
+    prepare = scenario.prepare or (lambda _: None)
+
+    def timed(prepared):
+        start = time.perf_counter()
+        response = scenario.call(prepared)
+        return time.perf_counter() - start, response
+
+    for i in range(args.warmup):
+        scenario.call(prepare(i))
+    prepared = [prepare(i) for i in range(args.requests)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        outcomes = list(executor.map(timed, prepared))
+        wall_seconds = time.perf_counter() - start
+
+    failures = [response for _, response in outcomes if response.status_code >= 400]
+    if len(failures) == len(outcomes):
+        raise RuntimeError(f"{name}: HTTP {failures[0].status_code} {failures[0].text[:200]}")
+    if failures:
+        print(f"{name} x{concurrency}: first error HTTP {failures[0].status_code} {failures[0].text[:200]}", file=sys.stderr)
+    latencies = sorted(elapsed for elapsed, _ in outcomes)
+    return {
+        "requests": len(latencies),
+        "errors": len(failures),
+        "rps": round(len(latencies) / wall_seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+    }
+
+def build_scenarios(client, headers, args):
+    from unittest.mock import patch
+    from app import cache
+
+    rng = random.Random(args.seed + 1)
+    search_terms = ["bolt", "washer", "SKU-00012", "drill", "cab"]
+
+    def random_lines(field):
+        return [
+            {"product_id": product_id, field: rng.randint(1, 5)}
+            for product_id in rng.sample(range(1, args.products + 1), min(args.lines, args.products))
+        ]
+
+    def create(path, body):
+        response = client.post(path, json=body, headers=headers)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def stocked_lines(field, warehouse_id):
+        # The generated stock follows real demand and may be short; an untimed receipt covers the lines first
+        lines = random_lines(field)
+        receipt_id = create("/receipts/", {
+            "supplier_id": 1,
+            "warehouse_id": warehouse_id,
+            "receipt_items": [{"product_id": line["product_id"], "quantity_received": line[field]} for line in lines]
+        })
+        client.put(f"/receipts/{receipt_id}/validate", headers=headers).raise_for_status()
+        return lines
+
+    def cache_disabled():
+        # For the whole scenario: toggling it per request would race between the client threads
+        return patch.object(cache, "KPI_CACHE_TTL_SECONDS", 0)
+
+    other_warehouse = 2 if args.warehouses > 1 else 1
+    return {
+        "products_list": Scenario(lambda _: client.get("/products/", params={"skip": rng.randint(0, max(args.products - 100, 0))})),
+        "products_search": Scenario(lambda _: client.get("/products/", params={"search": rng.choice(search_terms)})),
+        "ledger_list": Scenario(lambda _: client.get("/ledger/", params={"limit": 100})),
+        "ledger_by_product": Scenario(lambda _: client.get("/ledger/", params={"product_id": rng.randint(1, args.products), "limit": 100})),
+        "dashboard_kpis_cached": Scenario(lambda _: client.get("/dashboard/kpis")),
+        "dashboard_kpis_uncached": Scenario(
+            lambda _: client.get("/dashboard/kpis", params={"warehouse_id": rng.randint(1, args.warehouses)}),
+            setup=cache_disabled
+        ),
+        "receipt_validate": Scenario(
+            lambda receipt_id: client.put(f"/receipts/{receipt_id}/validate", headers=headers),
+            lambda _: create("/receipts/", {"supplier_id": 1, "warehouse_id": 1, "receipt_items": random_lines("quantity_received")})
+        ),
+        "delivery_validate": Scenario(
+            lambda delivery_id: client.put(f"/deliveries/{delivery_id}/validate", headers=headers),
+            lambda _: create("/deliveries/", {"warehouse_id": 1, "delivery_items": stocked_lines("quantity_delivered", 1)})
+        ),
+        "transfer_complete": Scenario(
+            lambda transfer_id: client.put(f"/transfers/{transfer_id}/complete", headers=headers),
+            lambda _: create("/transfers/", {
+                "from_warehouse_id": 1,
+                "to_warehouse_id": other_warehouse,
+                "transfer_items": stocked_lines("quantity", 1)
+            })
+        ),
+    }
+
+def run():
+    args = parse_args()
+    # Settings are read when the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    from app import utils
+    from app.database import engine
+    from app.main import app
+
+    patches = []
+    if args.fakeredis:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        patches = [
+            patch.object(utils, "redis_client", fakeredis.FakeStrictRedis(server=server, decode_responses=True)),
+            patch.object(utils, "async_redis_client", fakeredis.FakeAsyncRedis(server=server, decode_responses=True)),
+        ]
+    for active in patches:
+        active.start()
+
+    load_started = time.perf_counter()
+    load_dataset(engine, args)
+    load_seconds = time.perf_counter() - load_started
+
+    headers = {"Authorization": f"Bearer {utils.create_access_token({'sub': 'bench@example.com'})}"}
+    results = {}
+    # Server errors become 500 responses, as from a real server, and are counted per scenario
+    with TestClient(app, raise_server_exceptions=False) as client:
+        scenarios = build_scenarios(client, headers, args)
+        selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+        for name in selected:
+            results[name] = {}
+            with scenarios[name].setup():
+                for concurrency in args.concurrency:
+                    result = results[name][f"concurrency_{concurrency}"] = measure(name, scenarios[name], concurrency, args)
+                    print(
+                        f"{name} x{concurrency}: {result['rps']} req/s, p50 {result['p50_ms']} ms, "
+                        f"p95 {result['p95_ms']} ms, {result['errors']} errors",
+                        file=sys.stderr
+                    )
+
+    for active in patches:
+        active.stop()
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fakeredis": args.fakeredis,
+        },
+        "dataset": {
+            "products": args.products,
+            "warehouses": args.warehouses,
+            "ledger_rows": args.ledger_rows,
+            "document_lines": args.lines,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "load_seconds": round(load_seconds, 2),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    run()
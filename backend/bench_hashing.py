@@ -0,0 +1,47 @@
+"""
+Benchmark password verification throughput of the bcrypt pool (app/hashing.py).
+Runs concurrent verify_password calls the way POST /auth/login does and reports
+logins per second, overall and per worker. Uses the same environment settings
+as the API (HASH_POOL_KIND, HASH_WORKERS, BCRYPT_ROUNDS).
+
+Usage:
+    python bench_hashing.py [--logins 200] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import hashing, utils
+
+async def run_logins(logins: int, hashed_password: str) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*[hashing.verify_password("benchmark-password", hashed_password) for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return elapsed
+
+def benchmark(logins: int, worker_counts):
+    hashed_password = utils.get_password_hash("benchmark-password")
+    print(f"bcrypt rounds: {utils.BCRYPT_ROUNDS}, pool: {hashing.HASH_POOL_KIND}, CPUs: {os.cpu_count()}")
+
+    for workers in worker_counts:
+        hashing.shutdown()
+        hashing.HASH_WORKERS = workers
+        hashing.HASH_QUEUE_LIMIT = logins  # Measure throughput, not rejections
+        elapsed = asyncio.run(run_logins(logins, hashed_password))
+        per_second = logins / elapsed
+        print(f"workers={workers:>3}  {per_second:8.1f} logins/s  {per_second / workers:7.1f} logins/s per worker")
+    hashing.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, hashing.HASH_WORKERS})))
+    args = parser.parse_args()
+    benchmark(args.logins, [int(n) for n in args.workers.split(",")])
@@ -0,0 +1,108 @@
+"""
+Benchmark the JSON response path of GET /ledger/.
+
+Compares, for one page of ledger entries, the response_model path (ORM objects
+with eager-loaded relationships, validated into StockLedgerEntryOut and encoded
+with the stdlib json module, as FastAPI does) with the fast path the endpoint
+uses (plain rows from one joined query, shaped into dicts and encoded with
+orjson). Query and serialization time are reported separately.
+
+The dataset is loaded with the same loader as bench_endpoints.py, into a
+recreated database: point --database-url at a scratch database.
+
+Usage:
+    python bench_serialization.py [--page-size 1000] [--repeat 50] [--database-url sqlite:///./benchmark.db]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+def timed(function, repeat):
+    """Median seconds of `repeat` calls, and the last result."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+def benchmark(args):
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session, selectinload
+
+    from app import models, schemas
+    from app.routers import ledger
+    from bench_endpoints import load_dataset
+
+    engine = create_engine(args.database_url)
+    load_dataset(engine, argparse.Namespace(
+        products=args.products, warehouses=args.warehouses, ledger_rows=args.page_size * 5, seed=args.seed
+    ))
+    field = create_response_field(name="Response_get_ledger", type_=List[schemas.StockLedgerEntryOut])
+    order = (models.StockLedgerEntry.timestamp.desc(), models.StockLedgerEntry.id.desc())
+
+    def orm_query():
+        with Session(engine) as db:
+            entries = db.execute(
+                select(models.StockLedgerEntry).options(
+                    selectinload(models.StockLedgerEntry.product).selectinload(models.Product.category),
+                    selectinload(models.StockLedgerEntry.warehouse),
+                    selectinload(models.StockLedgerEntry.location).selectinload(models.Location.warehouse),
+                    selectinload(models.StockLedgerEntry.created_by_user)
+                ).order_by(*order).limit(args.page_size)
+            ).scalars().all()
+            db.expunge_all()
+        return entries
+
+    def rows_query():
+        with engine.connect() as conn:
+            return conn.execute(ledger.list_select().order_by(*order).limit(args.page_size)).all()
+
+    entries = orm_query()
+    rows = rows_query()
+    assert len(entries) == len(rows) == args.page_size
+
+    def orm_serialize():
+        content = asyncio.run(serialize_response(field=field, response_content=entries))
+        return JSONResponse(content).body
+
+    def rows_serialize():
+        return ORJSONResponse([ledger.ledger_entry_dict(row) for row in rows]).body
+
+    results = {
+        "response_model": (timed(orm_query, args.repeat)[0], timed(orm_serialize, args.repeat)),
+        "rows_orjson": (timed(rows_query, args.repeat)[0], timed(rows_serialize, args.repeat)),
+    }
+
+    print(f"GET /ledger/ page of {args.page_size} entries, {engine.dialect.name}, median of {args.repeat} runs")
+    for name, (query_seconds, (serialize_seconds, body)) in results.items():
+        print(
+            f"{name:>15}: query {query_seconds * 1000:8.2f} ms  serialize {serialize_seconds * 1000:8.2f} ms  "
+            f"total {(query_seconds + serialize_seconds) * 1000:8.2f} ms  ({len(body)} bytes)"
+        )
+    speedup = results["response_model"][1][0] / results["rows_orjson"][1][0]
+    print(f"serialization speedup: {speedup:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--warehouses", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    args = parser.parse_args()
+    # Settings are read when the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    benchmark(args)
@@ -0,0 +1,53 @@
+"""
+Set StockLevel.reorder_point from the delivery history in the stock ledger.
+See app/forecasting.py for the method; options default to the FORECAST_* settings.
+
+Usage:
+    python forecast_reorder_points.py [--workers N] [--as-of 2025-01-01] [--method ses|moving_average]
+                                      [--alpha 0.2] [--window 28] [--history-days 90] [--lead-time 7]
+                                      [--service-level 0.95] [--warehouse ID ...] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import database, forecasting
+
+def main():
+    defaults = forecasting.ForecastSettings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="forecasting processes (default: one per CPU; 1 runs inline)")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None, help="end of the history window (default: today)")
+    parser.add_argument("--method", choices=("ses", "moving_average"), default=defaults.method)
+    parser.add_argument("--alpha", type=float, default=defaults.alpha)
+    parser.add_argument("--window", type=int, default=defaults.window_days)
+    parser.add_argument("--history-days", type=int, default=defaults.history_days)
+    parser.add_argument("--lead-time", type=float, default=defaults.lead_time_days)
+    parser.add_argument("--service-level", type=float, default=defaults.service_level)
+    parser.add_argument("--warehouse", type=int, action="append", dest="warehouses", help="only this warehouse (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="report the changes without writing them")
+    args = parser.parse_args()
+
+    settings = forecasting.ForecastSettings(
+        history_days=args.history_days, method=args.method, alpha=args.alpha, window_days=args.window,
+        lead_time_days=args.lead_time, service_level=args.service_level
+    )
+    start = time.perf_counter()
+    changed = forecasting.run(
+        database.engine, settings, as_of=args.as_of, workers=args.workers,
+        warehouse_ids=args.warehouses, dry_run=args.dry_run
+    )
+    verb = "Would change" if args.dry_run else "Changed"
+    print(
+        f"{verb} {sum(changed.values())} reorder points in {len(changed)} warehouses "
+        f"({settings.method}, {settings.history_days} days of history) in {time.perf_counter() - start:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Rebuild the dashboard KPI counters (kpi_counters) from stock levels and documents.
+Run this to repair drift, e.g. after editing stock rows directly in the database.
+
+Usage:
+    python rebuild_kpis.py
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import SessionLocal
+from app import kpis, models
+
+def rebuild():
+    db = SessionLocal()
+    try:
+        kpis.rebuild_counters(db)
+        db.commit()
+        rows = db.query(models.KPICounter).count()
+        print(f"Rebuilt KPI counters: {rows} warehouse/category rows")
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding KPI counters: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
@@ -1,11 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
+from unittest.mock import patch
+import fakeredis
 import pytest
 
 from ..app.main import app
-from ..app.database import Base, get_db
-from ..app import models
+from ..app.database import Base, get_db, get_async_db
+from ..app import models, query_stats, search, security, utils
 from fastapi.testclient import TestClient
 
 # Setup test database
@@ -16,6 +19,11 @@ engine = create_engine(
 )
 SessionTesting = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async routers read the same SQLite file through aiosqlite; NullPool because every
+# TestClient runs its own event loop and connections cannot be shared between loops
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncSessionTesting = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(name="db_session")
 def db_session_fixture():
@@ -28,12 +36,69 @@ def db_session_fixture():
         Base.metadata.drop_all(bind=engine)  # Drop tables after test
 
 
+@pytest.fixture(name="redis_client")
+def redis_client_fixture():
+    server = fakeredis.FakeServer()
+    fake_redis = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+    fake_async_redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    with patch.object(utils, "redis_client", fake_redis), patch.object(utils, "async_redis_client", fake_async_redis):
+        yield fake_redis
+
+
 @pytest.fixture(name="client")
-def client_fixture(db_session):
+def client_fixture(db_session, redis_client):
     def override_get_db():
         yield db_session
 
+    async def override_get_async_db():
+        async with AsyncSessionTesting() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Write endpoints act as the inventory fixture's user; test_security.py removes this override
+    app.dependency_overrides[security.get_current_user] = lambda: security.CurrentUser(1, "stock@example.com")
+    search.product_index.clear()  # Every test starts from an empty database
+    security.token_cache.clear()
+    # Every response reports its statement count, for the query_budget fixture
+    with patch.object(query_stats, "DEBUG_HEADERS", True), TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="query_budget")
+def query_budget_fixture():
+    """Assert that a response issued at most `max_queries` SQL statements; returns the count."""
+    def check(response, max_queries: int) -> int:
+        count = int(response.headers[query_stats.QUERY_COUNT_HEADER])
+        assert count <= max_queries, f"{response.request.method} {response.request.url} issued {count} queries (budget {max_queries})"
+        return count
+    return check
+
+
+@pytest.fixture(name="inventory")
+def inventory_fixture(db_session):
+    """Minimal master data for document tests: one user, supplier, category, two warehouses, three products."""
+    user = models.User(id=1, email="stock@example.com", hashed_password="not-a-real-hash")
+    supplier = models.Supplier(name="Test Supplier")
+    category = models.Category(name="Test Category")
+    main_warehouse = models.Warehouse(name="Main Warehouse")
+    second_warehouse = models.Warehouse(name="Second Warehouse")
+    db_session.add_all([user, supplier, category, main_warehouse, second_warehouse])
+    db_session.flush()
+
+    products = [
+        models.Product(name=f"Product {i}", sku_code=f"SKU-{i}", category_id=category.id, unit_of_measure="pcs")
+        for i in range(1, 4)
+    ]
+    db_session.add_all(products)
+    db_session.commit()
+
+    return {
+        "user_id": user.id,
+        "supplier_id": supplier.id,
+        "category_id": category.id,
+        "warehouse_id": main_warehouse.id,
+        "second_warehouse_id": second_warehouse.id,
+        "product_ids": [product.id for product in products],
+    }
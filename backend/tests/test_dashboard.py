@@ -0,0 +1,155 @@
+from fastapi.testclient import TestClient
+
+from ..app import kpis, models, schemas
+from ..app.routers.dashboard import stock_level_kpis_statement
+
+
+def test_dashboard_kpis(client: TestClient, db_session, inventory):
+    first, second, third = inventory["product_ids"]
+    warehouse_id = inventory["warehouse_id"]
+    second_warehouse_id = inventory["second_warehouse_id"]
+    db_session.add_all([
+        models.StockLevel(product_id=first, warehouse_id=warehouse_id, quantity=50, reorder_point=10),
+        models.StockLevel(product_id=second, warehouse_id=warehouse_id, quantity=5, reorder_point=10),
+        models.StockLevel(product_id=third, warehouse_id=warehouse_id, quantity=0, reorder_point=10),
+        models.StockLevel(product_id=first, warehouse_id=second_warehouse_id, quantity=3, reorder_point=5),
+        models.Receipt(supplier_id=inventory["supplier_id"], warehouse_id=warehouse_id, status="Draft", created_by=1),
+        models.Receipt(supplier_id=inventory["supplier_id"], warehouse_id=warehouse_id, status="Done", created_by=1),
+        models.DeliveryOrder(warehouse_id=second_warehouse_id, status="Ready", created_by=1),
+        models.InternalTransfer(
+            from_warehouse_id=warehouse_id, to_warehouse_id=second_warehouse_id, status="Waiting", created_by=1
+        ),
+    ])
+    db_session.commit()
+    kpis.rebuild_counters(db_session)
+    db_session.commit()
+
+    response = client.get("/dashboard/kpis")
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_products_in_stock": 58,
+        "low_stock_items": 2,
+        "out_of_stock_items": 1,
+        "pending_receipts": 1,
+        "pending_deliveries": 1,
+        "internal_transfers_scheduled": 1,
+    }
+
+    response = client.get("/dashboard/kpis", params={"warehouse_id": warehouse_id})
+    assert response.json() == {
+        "total_products_in_stock": 55,
+        "low_stock_items": 1,
+        "out_of_stock_items": 1,
+        "pending_receipts": 1,
+        "pending_deliveries": 0,
+        "internal_transfers_scheduled": 1,
+    }
+
+
+def test_dashboard_kpis_empty(client: TestClient, inventory):
+    response = client.get("/dashboard/kpis", params={"product_category_id": inventory["category_id"]})
+    assert response.status_code == 200
+    assert response.json()["total_products_in_stock"] == 0
+    assert response.json()["pending_receipts"] == 0
+
+
+def test_dashboard_counters_follow_documents(client: TestClient, db_session, inventory):
+    first, second, third = inventory["product_ids"]
+    warehouse_id = inventory["warehouse_id"]
+    second_warehouse_id = inventory["second_warehouse_id"]
+
+    receipt = client.post("/receipts/", json={
+        "supplier_id": inventory["supplier_id"],
+        "warehouse_id": warehouse_id,
+        "receipt_items": [
+            {"product_id": first, "quantity_received": 20},
+            {"product_id": second, "quantity_received": 4},
+        ],
+    }).json()
+    assert client.get("/dashboard/kpis").json()["pending_receipts"] == 1
+    assert client.put(f"/receipts/{receipt['id']}/validate").status_code == 200
+
+    delivery = client.post("/deliveries/", json={
+        "warehouse_id": warehouse_id,
+        "delivery_items": [{"product_id": second, "quantity_delivered": 4}],
+    }).json()
+    assert client.put(f"/deliveries/{delivery['id']}/validate").status_code == 200
+
+    transfer = client.post("/transfers/", json={
+        "from_warehouse_id": warehouse_id,
+        "to_warehouse_id": second_warehouse_id,
+        "transfer_items": [{"product_id": first, "quantity": 5}],
+    }).json()
+    assert client.get("/dashboard/kpis", params={"warehouse_id": second_warehouse_id}).json()["internal_transfers_scheduled"] == 1
+    assert client.put(f"/transfers/{transfer['id']}/complete").status_code == 200
+
+    assert client.post("/adjustments/", json={
+        "warehouse_id": warehouse_id,
+        "reason": "Cycle count",
+        "adjustment_items": [
+            {"product_id": first, "counted_quantity": 12},
+            {"product_id": third, "counted_quantity": 0},
+        ],
+    }).status_code == 201
+
+    other_category = models.Category(name="Other Category")
+    db_session.add(other_category)
+    db_session.commit()
+    assert client.put(f"/products/{first}", json={"category_id": other_category.id}).status_code == 200
+
+    # Pending delivery left open
+    client.post("/deliveries/", json={
+        "warehouse_id": second_warehouse_id,
+        "delivery_items": [{"product_id": first, "quantity_delivered": 1}],
+    })
+
+    for params in [
+        {},
+        {"warehouse_id": warehouse_id},
+        {"warehouse_id": second_warehouse_id},
+        {"product_category_id": other_category.id},
+        {"warehouse_id": warehouse_id, "product_category_id": inventory["category_id"]},
+    ]:
+        statement = stock_level_kpis_statement(
+            params.get("warehouse_id"), product_category_id=params.get("product_category_id")
+        )
+        expected = schemas.DashboardKPIs(**db_session.execute(statement).one()._mapping)
+        assert client.get("/dashboard/kpis", params=params).json() == expected.dict()
+
+    counters = client.get("/dashboard/kpis").json()
+    assert counters == {
+        "total_products_in_stock": 17,
+        "low_stock_items": 0,
+        "out_of_stock_items": 2,
+        "pending_receipts": 0,
+        "pending_deliveries": 1,
+        "internal_transfers_scheduled": 0,
+    }
+
+    # A rebuild from scratch yields the same counters
+    kpis.rebuild_counters(db_session)
+    db_session.commit()
+    assert client.get("/dashboard/kpis").json() == counters
+
+
+def test_dashboard_kpis_cache(client: TestClient, inventory):
+    first = inventory["product_ids"][0]
+    warehouse_id = inventory["warehouse_id"]
+
+    assert client.get("/dashboard/kpis").json()["total_products_in_stock"] == 0
+    assert client.get("/dashboard/kpis").json()["total_products_in_stock"] == 0
+    client.get("/dashboard/kpis", params={"warehouse_id": warehouse_id})
+
+    stats = client.get("/dashboard/kpis/cache-stats").json()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    # A stock change invalidates every cached filter combination
+    assert client.post("/adjustments/", json={
+        "warehouse_id": warehouse_id,
+        "adjustment_items": [{"product_id": first, "counted_quantity": 9}],
+    }).status_code == 201
+    assert client.get("/dashboard/kpis").json()["total_products_in_stock"] == 9
+    assert client.get("/dashboard/kpis", params={"warehouse_id": warehouse_id}).json()["total_products_in_stock"] == 9
+
+    stats = client.get("/dashboard/kpis/cache-stats").json()
+    assert (stats["hits"], stats["misses"], stats["version"]) == (1, 4, 1)
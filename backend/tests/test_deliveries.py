@@ -0,0 +1,111 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from ..app import kpis, models
+
+
+def create_delivery(client: TestClient, inventory, items):
+    response = client.post(
+        "/deliveries/",
+        json={"warehouse_id": inventory["warehouse_id"], "delivery_items": items},
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_validate_delivery_checks_total_per_product(client: TestClient, db_session, inventory):
+    product_id = inventory["product_ids"][0]
+    db_session.add(models.StockLevel(product_id=product_id, warehouse_id=inventory["warehouse_id"], quantity=5, reorder_point=0))
+    db_session.commit()
+
+    # Each line fits on its own, together they do not
+    delivery_id = create_delivery(client, inventory, [
+        {"product_id": product_id, "quantity_delivered": 3},
+        {"product_id": product_id, "quantity_delivered": 3},
+    ])
+    response = client.put(f"/deliveries/{delivery_id}/validate")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Insufficient stock for product Product 1. Available: 5, Required: 6"
+
+    delivery_id = create_delivery(client, inventory, [{"product_id": product_id, "quantity_delivered": 5}])
+    assert client.put(f"/deliveries/{delivery_id}/validate").status_code == 200
+    assert client.put(f"/deliveries/{delivery_id}/validate").json() == {"detail": "Delivery order already validated"}
+
+    db_session.expire_all()
+    level = db_session.query(models.StockLevel).filter(models.StockLevel.product_id == product_id).one()
+    assert level.quantity == 0
+
+
+def test_validate_deliveries_batch_checks_stock_across_documents(client: TestClient, db_session, inventory, query_budget):
+    first, second, _ = inventory["product_ids"]
+    db_session.add_all([
+        models.StockLevel(product_id=first, warehouse_id=inventory["warehouse_id"], quantity=10, reorder_point=0),
+        models.StockLevel(product_id=second, warehouse_id=inventory["warehouse_id"], quantity=100, reorder_point=0),
+    ])
+    db_session.commit()
+    kpis.rebuild_counters(db_session)  # Stock rows added directly
+    db_session.commit()
+
+    done = create_delivery(client, inventory, [{"product_id": second, "quantity_delivered": 1}])
+    assert client.put(f"/deliveries/{done}/validate").status_code == 200
+    # Every delivery fits on its own; the third no longer does after the first two
+    wave = [
+        create_delivery(client, inventory, [{"product_id": first, "quantity_delivered": 4}, {"product_id": second, "quantity_delivered": 2}])
+        for _ in range(3)
+    ]
+
+    response = client.post("/deliveries/validate-batch", json={"document_ids": wave + [done, 999, wave[0]]})
+    assert response.status_code == 200
+    query_budget(response, 10)
+    assert response.json() == {
+        "total": 5,
+        "validated": 2,
+        "failed": 3,
+        "results": [
+            {"document_id": wave[0], "validated": True, "error": None},
+            {"document_id": wave[1], "validated": True, "error": None},
+            {"document_id": wave[2], "validated": False, "error": "Insufficient stock for product Product 1. Available: 2, Required: 4"},
+            {"document_id": done, "validated": False, "error": "Delivery order already validated"},
+            {"document_id": 999, "validated": False, "error": "Delivery order not found"},
+        ],
+    }
+
+    db_session.expire_all()
+    levels = {
+        level.product_id: level.quantity
+        for level in db_session.query(models.StockLevel).filter(models.StockLevel.warehouse_id == inventory["warehouse_id"])
+    }
+    assert levels == {first: 2, second: 95}
+    entries = db_session.query(models.StockLedgerEntry).filter(
+        models.StockLedgerEntry.document_type == "Delivery", models.StockLedgerEntry.product_id == first
+    ).order_by(models.StockLedgerEntry.id).all()
+    assert [(e.document_id, e.change_quantity, e.new_stock_level) for e in entries] == [(wave[0], -4, 6), (wave[1], -4, 2)]
+    assert client.get(f"/deliveries/{wave[2]}").json()["status"] != "Done"
+
+    # The counters maintained by the batch agree with a full rebuild
+    def counters():
+        return sorted(tuple(row) for row in db_session.execute(select(models.KPICounter.__table__)))
+    maintained = counters()
+    kpis.rebuild_counters(db_session)
+    db_session.commit()
+    assert counters() == maintained
+
+
+def test_validate_deliveries_batch_statement_count_is_constant(client: TestClient, db_session, inventory, query_budget):
+    product_ids = inventory["product_ids"]
+    db_session.add_all([
+        models.StockLevel(product_id=product_id, warehouse_id=inventory["warehouse_id"], quantity=1000, reorder_point=0)
+        for product_id in product_ids
+    ])
+    db_session.commit()
+
+    counts = []
+    for size in (1, 20):
+        wave = [
+            create_delivery(client, inventory, [{"product_id": product_id, "quantity_delivered": 1} for product_id in product_ids])
+            for _ in range(size)
+        ]
+        response = client.post("/deliveries/validate-batch", json={"document_ids": wave})
+        assert response.json()["validated"] == size
+        counts.append(query_budget(response, 9))
+    assert counts[0] == counts[1]
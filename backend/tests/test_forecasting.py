@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from ..app import forecasting, kpis, models, synthetic
+from ..app.database import Base
+
+OPTIONS = synthetic.GeneratorOptions(
+    seed=11, products=150, warehouses=3, locations_per_warehouse=2, suppliers=5,
+    ledger_rows=6000, years=1, end=datetime(2025, 1, 1), pending_documents=5, batch_size=500,
+)
+AS_OF = datetime(2025, 1, 1)
+SETTINGS = forecasting.ForecastSettings(
+    history_days=90, method="ses", alpha=0.2, window_days=28, lead_time_days=7, service_level=0.95
+)
+
+
+def generated_engine(tmp_path, name="forecast.db"):
+    # A file database, so pool workers can open it too
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        synthetic.generate(conn, OPTIONS, [("a@example.com", "-")])
+    with Session(engine) as db:
+        kpis.rebuild_counters(db)
+        db.commit()
+    return engine
+
+
+def counters(engine):
+    with engine.connect() as conn:
+        return sorted(conn.execute(select(models.KPICounter.__table__)).all())
+
+
+def reorder_point_map(engine):
+    with engine.connect() as conn:
+        return {(row.product_id, row.warehouse_id): row.reorder_point for row in conn.execute(
+            select(models.StockLevel.product_id, models.StockLevel.warehouse_id, models.StockLevel.reorder_point)
+        )}
+
+
+def test_vectorized_forecast_matches_recurrences():
+    demand = np.random.default_rng(3).poisson(4, size=(50, 30)).astype(float)
+    demand[0] = 0  # A product that never sold
+
+    forecast, spread = forecasting.forecast_demand(demand, SETTINGS)
+    for row, series in enumerate(demand):
+        level = series.mean()
+        for value in series:
+            level = SETTINGS.alpha * value + (1 - SETTINGS.alpha) * level
+        assert np.isclose(forecast[row], level)
+        assert np.isclose(spread[row], np.std(series, ddof=1))
+
+    moving, _ = forecasting.forecast_demand(demand, SETTINGS._replace(method="moving_average", window_days=7))
+    assert np.allclose(moving, demand[:, -7:].mean(axis=1))
+
+    points = forecasting.reorder_points(forecast, spread, SETTINGS)
+    assert points[0] == 0
+    # Safety stock puts the reorder point above the expected lead-time demand when demand varies
+    assert (points[1:] >= np.ceil(forecast[1:] * SETTINGS.lead_time_days)).all()
+
+
+def test_load_daily_demand_sums_deliveries_per_day(tmp_path):
+    engine = generated_engine(tmp_path)
+    warehouse_id = 1
+    with engine.connect() as conn:
+        product_ids, demand = forecasting.load_daily_demand(conn, warehouse_id, AS_OF, 90)
+        delivered = -conn.execute(
+            select(func.sum(models.StockLedgerEntry.change_quantity)).filter(
+                models.StockLedgerEntry.warehouse_id == warehouse_id,
+                models.StockLedgerEntry.document_type == "Delivery",
+                models.StockLedgerEntry.timestamp >= datetime(2024, 10, 3),  # 90 days before AS_OF
+                models.StockLedgerEntry.timestamp < AS_OF,
+            )
+        ).scalar()
+
+    assert list(product_ids) == sorted(product_ids)
+    assert demand.shape == (len(product_ids), 90)
+    assert demand.min() >= 0
+    assert demand.sum() == delivered > 0
+
+
+def test_run_updates_reorder_points_and_counters(tmp_path):
+    engine = generated_engine(tmp_path)
+    before = reorder_point_map(engine)
+
+    assert sum(forecasting.run(engine, SETTINGS, as_of=AS_OF, workers=1, dry_run=True).values()) > 0
+    assert reorder_point_map(engine) == before
+
+    changed = forecasting.run(engine, SETTINGS, as_of=AS_OF, workers=1)
+    after = reorder_point_map(engine)
+    assert sum(changed.values()) == sum(after[key] != before[key] for key in before) > 0
+
+    with engine.connect() as conn:
+        product_ids, demand = forecasting.load_daily_demand(conn, 2, AS_OF, SETTINGS.history_days)
+    expected = forecasting.reorder_points(*forecasting.forecast_demand(demand, SETTINGS), SETTINGS)
+    assert [after[(product_id, 2)] for product_id in product_ids.tolist()] == expected.tolist()
+
+    # The incrementally maintained counters agree with a full rebuild
+    maintained = counters(engine)
+    with Session(engine) as db:
+        kpis.rebuild_counters(db)
+        db.commit()
+    assert maintained == counters(engine)
+
+    # Running again with the same history changes nothing
+    assert sum(forecasting.run(engine, SETTINGS, as_of=AS_OF, workers=1).values()) == 0
+
+
+def test_process_pool_matches_inline(tmp_path):
+    inline = generated_engine(tmp_path, "inline.db")
+    pooled = generated_engine(tmp_path, "pooled.db")
+
+    forecasting.run(inline, SETTINGS, as_of=AS_OF, workers=1)
+    forecasting.run(pooled, SETTINGS, as_of=AS_OF, workers=2)
+    assert reorder_point_map(inline) == reorder_point_map(pooled)
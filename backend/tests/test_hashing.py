@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from ..app import hashing
+
+
+def test_signup_and_login_use_hash_pool(client: TestClient, db_session):
+    response = client.post("/auth/signup", json={"email": "picker@example.com", "password": "secret-password"})
+    assert response.status_code == 201
+
+    response = client.post("/auth/login", json={"email": "picker@example.com", "password": "secret-password"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+
+    response = client.post("/auth/login", json={"email": "picker@example.com", "password": "wrong-password"})
+    assert response.status_code == 401
+
+    status = client.get("/monitoring/hash-pool").json()
+    assert status["in_flight"] == 0
+
+
+def test_login_rejected_when_hash_queue_is_full(client: TestClient, db_session):
+    client.post("/auth/signup", json={"email": "picker@example.com", "password": "secret-password"})
+
+    with patch.object(hashing, "HASH_WORKERS", 0), patch.object(hashing, "HASH_QUEUE_LIMIT", 0):
+        response = client.post("/auth/login", json={"email": "picker@example.com", "password": "secret-password"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,161 @@
+import json
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from sqlalchemy import select
+
+from ..app import models, schemas
+from ..app.routers import ledger
+
+
+def add_ledger_entries(db_session, inventory, count):
+    # Several entries share a timestamp, as they do when one document posts many lines
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    product_id = inventory["product_ids"][0]
+    entries = [
+        models.StockLedgerEntry(
+            product_id=product_id,
+            warehouse_id=inventory["warehouse_id"],
+            change_quantity=1,
+            new_stock_level=i + 1,
+            document_type="Receipt",
+            document_id=i // 3 + 1,
+            timestamp=base + timedelta(minutes=i // 3),
+            created_by=inventory["user_id"],
+        )
+        for i in range(count)
+    ]
+    db_session.add_all(entries)
+    db_session.commit()
+    return [entry.id for entry in entries]
+
+
+def test_ledger_cursor_pagination(client: TestClient, db_session, inventory):
+    ids = add_ledger_entries(db_session, inventory, 10)
+
+    seen = []
+    response = client.get("/ledger/", params={"limit": 4})
+    while True:
+        assert response.status_code == 200
+        seen.extend(entry["id"] for entry in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = client.get("/ledger/", params={"limit": 4, "cursor": cursor})
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_ledger_cursor_with_filters(client: TestClient, db_session, inventory):
+    add_ledger_entries(db_session, inventory, 6)
+
+    first_page = client.get("/ledger/", params={"limit": 2, "document_id": 1})
+    assert [entry["new_stock_level"] for entry in first_page.json()] == [3, 2]
+
+    second_page = client.get(
+        "/ledger/",
+        params={"limit": 2, "document_id": 1, "cursor": first_page.headers["X-Next-Cursor"]},
+    )
+    assert [entry["new_stock_level"] for entry in second_page.json()] == [1]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_ledger_list_matches_response_model(client: TestClient, db_session, inventory):
+    add_ledger_entries(db_session, inventory, 2)
+    location = models.Location(name="Shelf A", warehouse_id=inventory["warehouse_id"])
+    db_session.add(location)
+    db_session.flush()
+    db_session.add(models.StockLedgerEntry(
+        product_id=inventory["product_ids"][1],
+        warehouse_id=inventory["warehouse_id"],
+        location_id=location.id,
+        change_quantity=-4,
+        new_stock_level=6,
+        document_type="Adjustment",
+        document_id=9,
+        timestamp=datetime(2024, 2, 1, 8, 30, 15, 250000),
+        created_by=inventory["user_id"],
+    ))
+    db_session.commit()
+
+    # The fast path must produce exactly what validating through StockLedgerEntryOut would
+    entries = db_session.query(models.StockLedgerEntry).order_by(
+        models.StockLedgerEntry.timestamp.desc(), models.StockLedgerEntry.id.desc()
+    ).all()
+    expected = jsonable_encoder([schemas.StockLedgerEntryOut.from_orm(entry) for entry in entries])
+
+    response = client.get("/ledger/")
+    assert response.status_code == 200
+    assert response.json() == expected
+    assert response.json()[0]["location"]["warehouse"]["name"] == "Main Warehouse"
+
+
+def test_ledger_lists_entries_without_category_or_creator(client: TestClient, db_session, inventory):
+    add_ledger_entries(db_session, inventory, 1)
+    product = models.Product(name="Loose part", sku_code="LOOSE-1", unit_of_measure="pcs")
+    db_session.add(product)
+    db_session.flush()
+    db_session.add(models.StockLedgerEntry(
+        product_id=product.id,
+        warehouse_id=inventory["warehouse_id"],
+        change_quantity=2,
+        new_stock_level=2,
+        document_type="Adjustment",
+        document_id=5,
+        timestamp=datetime(2024, 3, 1),
+    ))
+    db_session.commit()
+
+    entries = db_session.query(models.StockLedgerEntry).order_by(
+        models.StockLedgerEntry.timestamp.desc(), models.StockLedgerEntry.id.desc()
+    ).all()
+    expected = jsonable_encoder([schemas.StockLedgerEntryOut.from_orm(entry) for entry in entries])
+
+    response = client.get("/ledger/")
+    assert response.status_code == 200
+    assert response.json() == expected
+    assert response.json()[0]["product"]["category"] is None
+    assert response.json()[0]["created_by_user"] is None
+
+    export = client.get("/ledger/export", params={"format": "ndjson"})
+    assert [json.loads(line)["product_id"] for line in export.text.splitlines()] == [inventory["product_ids"][0], product.id]
+
+
+def test_ledger_invalid_cursor(client: TestClient):
+    response = client.get("/ledger/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_ledger_export_csv(client: TestClient, db_session, inventory):
+    add_ledger_entries(db_session, inventory, 6)
+
+    response = client.get("/ledger/export", params={"format": "csv", "date_from": "2024-01-01T12:01:00"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    lines = response.text.splitlines()
+    assert lines[0].split(",")[:4] == ["id", "timestamp", "product_id", "sku_code"]
+    assert len(lines) == 1 + 3
+    assert all(",SKU-1," in line for line in lines[1:])
+
+
+def test_ledger_export_ndjson(client: TestClient, db_session, inventory):
+    add_ledger_entries(db_session, inventory, 6)
+
+    response = client.get("/ledger/export", params={"format": "ndjson", "document_id": 2})
+    assert response.status_code == 200
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["new_stock_level"] for row in rows] == [4, 5, 6]
+    assert rows[0]["warehouse_name"] == "Main Warehouse"
+
+
+def test_ledger_filter_combinations_read_in_index_order(db_session, inventory):
+    order = (models.StockLedgerEntry.timestamp.desc(), models.StockLedgerEntry.id.desc())
+    for filters in ({}, {"product_id": 1}, {"warehouse_id": 1}, {"product_id": 1, "warehouse_id": 1}):
+        statement = ledger.apply_ledger_filters(select(models.StockLedgerEntry.id), **filters).order_by(*order).limit(100)
+        compiled = statement.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = " ".join(str(row[-1]) for row in db_session.execute(f"EXPLAIN QUERY PLAN {compiled}"))
+        assert "TEMP B-TREE" not in plan, (filters, plan)  # No sort: an index provides the order
@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+import pytest
+
+from ..app import metrics
+from ..app.db_pool import TimedQueuePool, pool_status
+
+
+def test_db_pool_status(client: TestClient):
+    response = client.get("/monitoring/db-pool")
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
+
+
+def test_timed_pool_records_checkout_waits():
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    connection = engine.connect()
+    status = pool_status(engine.pool)
+    assert status["checked_out"] == 1
+    assert status["checkouts"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    connection.close()
+    status = pool_status(engine.pool)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    assert status["checkout_timeouts"] == 1
+    assert status["checkout_wait_seconds_total"] >= 0.05
+
+
+def test_metrics_by_route_template(client: TestClient, inventory):
+    metrics.request_metrics.clear()
+    product_id = inventory["product_ids"][0]
+    client.get(f"/products/{product_id}")
+    client.get("/products/9999")
+    client.get("/no-such-path")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/products/{product_id}",status="200"} 1' in text
+    assert 'http_requests_total{method="GET",route="/products/{product_id}",status="404"} 1' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/products/{product_id}",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/products/{product_id}"} 2' in text
+    assert "http_requests_in_flight 1" in text  # The /metrics request itself
+    assert "redis_up 1" in text
+    assert 'db_pool_checkouts_total{engine="sync"}' not in text  # SQLite keeps the default pool
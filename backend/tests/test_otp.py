@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import models, otp, utils
+
+TEST_OTP = "123456"
+
+
+@pytest.fixture(name="user")
+def user_fixture(db_session):
+    user = models.User(email="picker@example.com", hashed_password=utils.get_password_hash("old-password"))
+    db_session.add(user)
+    db_session.commit()
+    with patch.object(utils, "generate_otp", return_value=TEST_OTP), patch.object(utils, "BCRYPT_ROUNDS", 4):
+        yield user
+
+
+def request_otp(client: TestClient, email="picker@example.com"):
+    return client.post("/auth/request-reset-otp", json={"email": email})
+
+
+def verify_otp(client: TestClient, code=TEST_OTP, email="picker@example.com"):
+    return client.post("/auth/verify-reset-otp", json={"email": email, "otp_code": code})
+
+
+def test_password_reset_flow_stays_in_redis(client: TestClient, db_session, redis_client, user):
+    assert request_otp(client).json()["status"] == "success"
+    assert redis_client.ttl(otp.otp_key(user.email)) == otp.OTP_TTL_SECONDS
+    assert db_session.query(models.OTP).count() == 0
+
+    response = verify_otp(client)
+    assert response.status_code == 200
+    assert not redis_client.exists(otp.otp_key(user.email))
+
+    # Single use
+    assert verify_otp(client).json() == {"detail": "OTP expired or not found"}
+
+    response = client.post("/auth/reset-password", json={"reset_token": response.json()["reset_token"], "new_password": "new-password"})
+    assert response.status_code == 200
+    assert client.post("/auth/login", json={"email": user.email, "password": "new-password"}).status_code == 200
+
+
+def test_otp_request_rate_limits(client: TestClient, redis_client, user):
+    request_otp(client)
+    first_hash = redis_client.hget(otp.otp_key(user.email), "hash")
+
+    # Within the email window: generic answer, the first OTP stays valid
+    assert request_otp(client).json()["status"] == "success"
+    assert redis_client.hget(otp.otp_key(user.email), "hash") == first_hash
+
+    with patch.object(otp, "OTP_IP_LIMIT", 2):
+        assert request_otp(client, "other@example.com").status_code == 200
+        response = request_otp(client, "third@example.com")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(otp.OTP_IP_WINDOW_SECONDS)
+
+
+def test_otp_attempts_are_limited(client: TestClient, user):
+    request_otp(client)
+    with patch.object(otp, "OTP_MAX_ATTEMPTS", 2):
+        assert verify_otp(client, "000000").json() == {"detail": "Invalid OTP or Email"}
+        assert verify_otp(client, "000000").json() == {"detail": "Invalid OTP or Email"}
+        assert verify_otp(client).json() == {"detail": "OTP expired or not found"}
+
+
+def test_otp_audit_log(client: TestClient, db_session, user):
+    with patch.object(otp, "OTP_AUDIT_LOG", True):
+        request_otp(client)
+    entry = db_session.query(models.OTP).one()
+    assert entry.user_id == user.id
+    assert entry.is_used is False
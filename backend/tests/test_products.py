@@ -0,0 +1,152 @@
+import json
+from unittest.mock import patch
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from ..app import models, product_import, schemas, search
+
+
+def test_get_products(client: TestClient, inventory):
+    response = client.get("/products/")
+    assert response.status_code == 200
+    assert [product["sku_code"] for product in response.json()] == ["SKU-1", "SKU-2", "SKU-3"]
+    assert response.json()[0]["category"]["name"] == "Test Category"
+
+    pages = [client.get("/products/", params={"skip": skip, "limit": 2}).json() for skip in (0, 2)]
+    assert [[product["sku_code"] for product in page] for page in pages] == [["SKU-1", "SKU-2"], ["SKU-3"]]
+
+    response = client.get("/products/", params={"search": "sku-2"})
+    assert [product["sku_code"] for product in response.json()] == ["SKU-2"]
+
+
+def test_product_list_matches_response_model(client: TestClient, db_session, inventory):
+    products = db_session.query(models.Product).order_by(models.Product.id).all()
+    expected = jsonable_encoder([schemas.ProductOut.from_orm(product) for product in products])
+
+    response = client.get("/products/")
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_get_product(client: TestClient, inventory):
+    product_id = inventory["product_ids"][0]
+    response = client.get(f"/products/{product_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Product 1"
+
+    assert client.get("/products/9999").status_code == 404
+
+
+def test_search_products_ranked_by_similarity(client: TestClient, db_session, inventory):
+    db_session.add_all([
+        models.Product(name="Steel bolt cutter", sku_code="TOOL-77", category_id=inventory["category_id"], unit_of_measure="pcs"),
+        models.Product(name="Bolt", sku_code="HW-1", category_id=inventory["category_id"], unit_of_measure="pcs"),
+        models.Product(name="Hex nut", sku_code="BOLT-NUT-M8", category_id=inventory["category_id"], unit_of_measure="pcs"),
+    ])
+    db_session.commit()
+
+    response = client.get("/products/", params={"search": "BOLT"})
+    assert response.status_code == 200
+    assert [product["sku_code"] for product in response.json()] == ["HW-1", "BOLT-NUT-M8", "TOOL-77"]
+
+    response = client.get("/products/", params={"search": "bolt", "skip": 1, "limit": 1})
+    assert [product["sku_code"] for product in response.json()] == ["BOLT-NUT-M8"]
+
+    # Products created through the API are searchable right away
+    created = client.post("/products/", json={"name": "Anchor bolt", "sku_code": "ANC-1", "category_id": inventory["category_id"], "unit_of_measure": "pcs"})
+    assert created.status_code == 201
+    response = client.get("/products/", params={"search": "anchor"})
+    assert [product["sku_code"] for product in response.json()] == ["ANC-1"]
+
+    client.put(f"/products/{created.json()['id']}", json={"name": "Wall plug"})
+    assert client.get("/products/", params={"search": "anchor"}).json() == []
+
+
+def test_similarity_matches_pg_trgm():
+    assert round(search.similarity("word", "two words"), 4) == 0.3636
+    assert search.similarity("Bolt", "bolt") == 1.0
+    assert search.similarity("", "bolt") == 0.0
+
+
+def test_import_products_csv(client: TestClient, db_session, inventory):
+    category_id = inventory["category_id"]
+    body = (
+        "name,sku_code,category_id,unit_of_measure,initial_stock\n"
+        f"Washer,W-1,{category_id},pcs,\n"
+        f"\"Cable, 3m\nreel\",C-3,{category_id},m,5\n"
+        f"Existing,SKU-1,{category_id},pcs,0\n"
+        "No category,N-1,999,pcs,0\n"
+        f"Washer again,W-1,{category_id},pcs,0\n"
+        f"Missing unit,M-1,{category_id},,0\n"
+    )
+    response = client.post("/products/import", params={"format": "csv"}, data=body.encode("utf-8"))
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total_rows"], result["imported"], result["failed"]) == (6, 2, 4)
+    assert [(error["row"], error["sku_code"], error["error"]) for error in result["errors"]] == [
+        (3, "SKU-1", "SKU code already exists"),
+        (4, "N-1", "Category not found"),
+        (5, "W-1", "Duplicate SKU code in import"),
+        (6, "M-1", "unit_of_measure: field required"),
+    ]
+
+    products = {product.sku_code: product for product in db_session.query(models.Product)}
+    assert products["C-3"].name == "Cable, 3m\nreel"
+    assert products["C-3"].initial_stock == 5
+    assert products["W-1"].initial_stock == 0
+
+    response = client.get("/products/", params={"search": "washer"})
+    assert [product["sku_code"] for product in response.json()] == ["W-1"]
+
+
+def test_import_products_csv_quote_inside_unquoted_field(client: TestClient, db_session, inventory):
+    category_id = inventory["category_id"]
+    body = (
+        "name,sku_code,category_id,unit_of_measure\r\n"
+        f"12\" pipe,P-12,{category_id},pcs\r\n"
+        f"Elbow,E-1,{category_id},pcs\r\n"
+        f"\"Tee, \"\"3/4\"\"\",T-3,{category_id},pcs\r\n"
+        f"Cap,C-1,{category_id},pcs"
+    )
+    response = client.post("/products/import", params={"format": "csv"}, data=body.encode("utf-8"))
+    assert response.status_code == 200
+    assert (response.json()["total_rows"], response.json()["imported"]) == (4, 4)
+
+    names = {product.sku_code: product.name for product in db_session.query(models.Product)}
+    assert (names["P-12"], names["E-1"], names["T-3"], names["C-1"]) == ('12" pipe', "Elbow", 'Tee, "3/4"', "Cap")
+
+
+def test_import_products_ndjson(client: TestClient, db_session, inventory):
+    category_id = inventory["category_id"]
+    body = "\n".join([
+        json.dumps({"name": "Glue", "sku_code": "G-1", "category_id": category_id, "unit_of_measure": "ml"}),
+        "",
+        "not json",
+        json.dumps({"name": "Tape", "sku_code": "T-1", "category_id": category_id, "unit_of_measure": "roll", "initial_stock": 2}),
+    ])
+    response = client.post("/products/import", params={"format": "ndjson"}, data=body.encode("utf-8"))
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total_rows"], result["imported"], result["failed"]) == (3, 2, 1)
+    assert result["errors"] == [{"row": 3, "sku_code": None, "error": "Row is not a JSON object"}]
+    assert db_session.query(models.Product).filter(models.Product.sku_code.in_(["G-1", "T-1"])).count() == 2
+
+
+def test_import_products_reports_skus_inserted_concurrently(client: TestClient, db_session, inventory):
+    category_id = inventory["category_id"]
+    body = "\n".join(
+        json.dumps({"name": name, "sku_code": sku_code, "category_id": category_id, "unit_of_measure": "pcs"})
+        for name, sku_code in [("Nut", "N-1"), ("Existing", "SKU-2"), ("Bolt", "B-1")]
+    )
+
+    # As if another import created SKU-2 between the existing-SKU lookup and the insert
+    async def no_existing_skus(self, sku_codes):
+        return set()
+
+    with patch.object(product_import.ProductImporter, "_existing_skus", no_existing_skus):
+        response = client.post("/products/import", params={"format": "ndjson"}, data=body.encode("utf-8"))
+    result = response.json()
+    assert (result["total_rows"], result["imported"], result["failed"]) == (3, 2, 1)
+    assert result["errors"] == [{"row": 2, "sku_code": "SKU-2", "error": "SKU code already exists"}]
+    assert db_session.query(models.Product).filter(models.Product.sku_code.in_(["N-1", "B-1"])).count() == 2
@@ -0,0 +1,63 @@
+import logging
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from ..app import models, query_stats
+from .test_receipts import create_receipt
+
+
+def test_receipt_list_query_count_does_not_grow_with_rows(client: TestClient, inventory, query_budget):
+    first, second, third = inventory["product_ids"]
+    create_receipt(client, inventory, [{"product_id": first, "quantity_received": 1}])
+    few = query_budget(client.get("/receipts/"), 10)
+
+    for _ in range(5):
+        create_receipt(client, inventory, [
+            {"product_id": first, "quantity_received": 1},
+            {"product_id": second, "quantity_received": 2},
+            {"product_id": third, "quantity_received": 3},
+        ])
+    many = query_budget(client.get("/receipts/"), 10)
+
+    assert many == few
+
+
+def test_receipt_validation_query_count_does_not_grow_with_lines(client: TestClient, db_session, inventory, query_budget):
+    first, second, third = inventory["product_ids"]
+    # Existing stock rows for every product, so both validations take the same update path
+    db_session.add_all([
+        models.StockLevel(product_id=product_id, warehouse_id=inventory["warehouse_id"], quantity=0)
+        for product_id in inventory["product_ids"]
+    ])
+    db_session.commit()
+    single = create_receipt(client, inventory, [{"product_id": first, "quantity_received": 1}])
+    several = create_receipt(client, inventory, [
+        {"product_id": first, "quantity_received": 1},
+        {"product_id": second, "quantity_received": 2},
+        {"product_id": third, "quantity_received": 3},
+        {"product_id": first, "quantity_received": 4},
+    ])
+
+    single_count = query_budget(client.put(f"/receipts/{single}/validate"), 25)
+    several_count = query_budget(client.put(f"/receipts/{several}/validate"), 25)
+
+    assert several_count == single_count
+
+
+def test_query_headers_are_off_by_default(client: TestClient, inventory):
+    with patch.object(query_stats, "DEBUG_HEADERS", False):
+        response = client.get("/receipts/")
+
+    assert response.status_code == 200
+    assert query_stats.QUERY_COUNT_HEADER not in response.headers
+    assert query_stats.QUERY_TIME_HEADER not in response.headers
+
+
+def test_slow_queries_are_logged_with_their_endpoint(client: TestClient, inventory, caplog):
+    with patch.object(query_stats, "SLOW_QUERY_SECONDS", 0), caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+        response = client.get("/receipts/")
+
+    assert response.status_code == 200
+    assert float(response.headers[query_stats.QUERY_TIME_HEADER]) >= 0
+    assert any("routers.receipts.get_receipts" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from ..app import models
+from ..app.pagination import NEXT_CURSOR_HEADER
+from .conftest import engine
+
+
+def create_receipt(client: TestClient, inventory, items):
+    response = client.post(
+        "/receipts/",
+        json={
+            "supplier_id": inventory["supplier_id"],
+            "warehouse_id": inventory["warehouse_id"],
+            "receipt_items": items,
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_validate_receipt_posts_stock_and_ledger(client: TestClient, db_session, inventory):
+    first, second, _ = inventory["product_ids"]
+    db_session.add(models.StockLevel(product_id=first, warehouse_id=inventory["warehouse_id"], quantity=5, reorder_point=2))
+    db_session.commit()
+
+    receipt_id = create_receipt(client, inventory, [
+        {"product_id": first, "quantity_received": 10},
+        {"product_id": second, "quantity_received": 7},
+        {"product_id": first, "quantity_received": 3},
+    ])
+
+    response = client.put(f"/receipts/{receipt_id}/validate")
+    assert response.status_code == 200
+    assert response.json()["status"] == "Done"
+
+    db_session.expire_all()
+    levels = {
+        level.product_id: level
+        for level in db_session.query(models.StockLevel).filter(models.StockLevel.warehouse_id == inventory["warehouse_id"])
+    }
+    assert levels[first].quantity == 18
+    assert levels[first].reorder_point == 2
+    assert levels[second].quantity == 7
+
+    entries = db_session.query(models.StockLedgerEntry).filter(
+        models.StockLedgerEntry.document_type == "Receipt",
+        models.StockLedgerEntry.document_id == receipt_id
+    ).order_by(models.StockLedgerEntry.id).all()
+    assert [(e.product_id, e.change_quantity, e.new_stock_level) for e in entries] == [
+        (first, 10, 15),
+        (second, 7, 7),
+        (first, 3, 18),
+    ]
+
+
+def test_validate_receipt_twice(client: TestClient, inventory):
+    receipt_id = create_receipt(client, inventory, [{"product_id": inventory["product_ids"][0], "quantity_received": 1}])
+
+    assert client.put(f"/receipts/{receipt_id}/validate").status_code == 200
+    response = client.put(f"/receipts/{receipt_id}/validate")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Receipt already validated"}
+
+
+def test_list_receipts_cursor_pagination(client: TestClient, db_session, inventory):
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    for index in range(5):
+        db_session.add(models.Receipt(
+            id=index + 1,
+            created_by=inventory["user_id"],
+            supplier_id=inventory["supplier_id"],
+            warehouse_id=inventory["warehouse_id"] if index % 2 == 0 else inventory["second_warehouse_id"],
+            status="Draft" if index < 4 else "Done",
+            created_at=created + timedelta(minutes=index // 2)
+        ))
+    db_session.commit()
+
+    first_page = client.get("/receipts/", params={"limit": 2})
+    assert first_page.status_code == 200
+    assert [receipt["id"] for receipt in first_page.json()] == [5, 4]
+
+    second_page = client.get("/receipts/", params={"limit": 2, "cursor": first_page.headers[NEXT_CURSOR_HEADER]})
+    assert [receipt["id"] for receipt in second_page.json()] == [3, 2]
+
+    last_page = client.get("/receipts/", params={"limit": 2, "cursor": second_page.headers[NEXT_CURSOR_HEADER]})
+    assert [receipt["id"] for receipt in last_page.json()] == [1]
+    assert NEXT_CURSOR_HEADER not in last_page.headers
+
+    filtered = client.get("/receipts/", params={"status": "Draft", "warehouse_id": inventory["warehouse_id"]})
+    assert [receipt["id"] for receipt in filtered.json()] == [3, 1]
+
+
+def test_validate_receipts_batch(client: TestClient, db_session, inventory):
+    first, second, _ = inventory["product_ids"]
+    receipts = [
+        create_receipt(client, inventory, [{"product_id": first, "quantity_received": 5}]),
+        create_receipt(client, inventory, [{"product_id": first, "quantity_received": 2}, {"product_id": second, "quantity_received": 1}]),
+    ]
+    canceled = create_receipt(client, inventory, [{"product_id": first, "quantity_received": 1}])
+    db_session.query(models.Receipt).filter(models.Receipt.id == canceled).update({"status": "Canceled"})
+    db_session.commit()
+
+    response = client.post("/receipts/validate-batch", json={"document_ids": receipts + [canceled]})
+    assert response.status_code == 200
+    assert [(result["validated"], result["error"]) for result in response.json()["results"]] == [
+        (True, None), (True, None), (False, "Cannot validate a canceled receipt"),
+    ]
+
+    entries = db_session.query(models.StockLedgerEntry).order_by(models.StockLedgerEntry.id).all()
+    assert [(e.document_id, e.product_id, e.new_stock_level) for e in entries] == [
+        (receipts[0], first, 5), (receipts[1], first, 7), (receipts[1], second, 1),
+    ]
+    for receipt_id in receipts:
+        receipt = client.get(f"/receipts/{receipt_id}").json()
+        assert receipt["status"] == "Done" and receipt["validated_at"]
+
+    assert client.post("/receipts/validate-batch", json={"document_ids": []}).status_code == 422
+
+
+def test_validate_receipt_locks_stock_before_counters(client: TestClient, db_session, inventory):
+    receipt_id = create_receipt(client, inventory, [{"product_id": inventory["product_ids"][0], "quantity_received": 1}])
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        table = next((name for name in ("kpi_counters", "stock_levels") if name in statement), "-")
+        statements.append(f"{statement.split()[0]} {table}")
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert client.put(f"/receipts/{receipt_id}/validate").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Same order as deliveries and transfers: stock rows first, counters last
+    first_counter_write = statements.index("INSERT kpi_counters")
+    assert statements.index("SELECT stock_levels") < first_counter_write
+    assert statements.index("INSERT stock_levels") < first_counter_write
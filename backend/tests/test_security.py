@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ..app import models, security, utils
+from ..app.main import app
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(client: TestClient, db_session):
+    app.dependency_overrides.pop(security.get_current_user)
+    db_session.add(models.User(email="picker@example.com", hashed_password=utils.get_password_hash("secret-password")))
+    db_session.commit()
+    return client
+
+
+def login(client: TestClient, password="secret-password"):
+    response = client.post("/auth/login", json={"email": "picker@example.com", "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_category(db_session):
+    category = models.Category(name="Fasteners")
+    db_session.add(category)
+    db_session.commit()
+    return category.id
+
+
+def test_write_endpoints_require_token(auth_client: TestClient, db_session):
+    category_id = create_category(db_session)
+    product = {"name": "Bolt", "sku_code": "B-1", "category_id": category_id, "unit_of_measure": "pcs"}
+
+    response = auth_client.post("/products/", json=product)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    assert auth_client.post("/products/", json=product, headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+    # Password reset tokens are not access tokens
+    reset_token = utils.create_access_token({"sub": "picker@example.com", "type": "password_reset"})
+    assert auth_client.post("/products/", json=product, headers={"Authorization": f"Bearer {reset_token}"}).status_code == 401
+
+    assert auth_client.post("/products/", json=product, headers=login(auth_client)).status_code == 201
+
+
+def test_verified_tokens_are_cached(auth_client: TestClient, db_session):
+    category_id = create_category(db_session)
+    headers = login(auth_client)
+    product = {"name": "Bolt", "sku_code": "B-1", "category_id": category_id, "unit_of_measure": "pcs"}
+    assert auth_client.post("/products/", json=product, headers=headers).status_code == 201
+
+    with patch.object(utils, "decode_token", side_effect=AssertionError("token decoded again")):
+        response = auth_client.put("/products/1", json={"name": "Hex bolt"}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_password_reset_revokes_tokens(auth_client: TestClient, db_session):
+    category_id = create_category(db_session)
+    headers = login(auth_client)
+    product = {"name": "Bolt", "sku_code": "B-1", "category_id": category_id, "unit_of_measure": "pcs"}
+    assert auth_client.post("/products/", json=product, headers=headers).status_code == 201
+
+    # Token issued a second before the reset
+    with patch.object(security.time, "time", return_value=security.time.time() + 1):
+        reset_token = utils.create_access_token({"sub": "picker@example.com", "type": "password_reset"})
+        response = auth_client.post("/auth/reset-password", json={"reset_token": reset_token, "new_password": "new-password"})
+        assert response.status_code == 200
+
+    assert auth_client.put("/products/1", json={"name": "Hex bolt"}, headers=headers).status_code == 401
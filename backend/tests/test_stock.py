@@ -0,0 +1,105 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from ..app import migrations, models, stock
+from ..app.routers.stock import SHORTFALL
+from .test_deliveries import create_delivery
+
+
+def test_post_stock_moves_adds_to_row_created_concurrently(db_session, inventory):
+    product_id, warehouse_id = inventory["product_ids"][0], inventory["warehouse_id"]
+    db_session.add(models.StockLevel(product_id=product_id, warehouse_id=warehouse_id, location_id=None, quantity=4, reorder_point=1))
+    db_session.commit()
+
+    # The caller looked the row up before it was created, so it posts as if the row were new
+    stock.post_stock_moves(db_session, [stock.StockMove(product_id, warehouse_id, 6)], "Receipt", 1, inventory["user_id"], levels={})
+    db_session.commit()
+
+    levels = db_session.query(models.StockLevel).filter(models.StockLevel.product_id == product_id).all()
+    assert [(level.quantity, level.reorder_point) for level in levels] == [(10, 1)]
+    # The ledger and the counters start from the row's stored quantity, not from an empty row
+    entry = db_session.query(models.StockLedgerEntry).one()
+    assert (entry.change_quantity, entry.new_stock_level) == (6, 10)
+    # The row was added without counters, so they hold only the change from (4, 1) to (10, 1)
+    counters = db_session.query(models.KPICounter).filter(models.KPICounter.warehouse_id == warehouse_id).one()
+    assert (counters.total_quantity, counters.low_stock_items, counters.out_of_stock_items) == (6, 0, 0)
+
+
+def test_merge_duplicate_stock_levels(db_session, inventory):
+    engine = db_session.get_bind()
+    unique_index = next(index for index in models.StockLevel.__table__.indexes if index.name == "uq_stock_levels_product_warehouse")
+    unique_index.drop(bind=engine)
+
+    first, second, _ = inventory["product_ids"]
+    warehouse_id = inventory["warehouse_id"]
+    location = models.Location(name="Shelf A", warehouse_id=warehouse_id)
+    db_session.add(location)
+    db_session.flush()
+    db_session.add_all([
+        models.StockLevel(product_id=first, warehouse_id=warehouse_id, quantity=3, reorder_point=8),
+        models.StockLevel(product_id=first, warehouse_id=warehouse_id, location_id=location.id, quantity=4, reorder_point=0),
+        models.StockLevel(product_id=second, warehouse_id=warehouse_id, quantity=2, reorder_point=0),
+    ])
+    db_session.commit()
+
+    assert migrations.merge_duplicate_stock_levels(engine) == 1
+    migrations.create_missing_indexes(engine)
+
+    db_session.expire_all()
+    levels = {level.product_id: level for level in db_session.query(models.StockLevel)}
+    assert len(levels) == 2
+    assert (levels[first].quantity, levels[first].reorder_point, levels[first].location_id) == (7, 8, location.id)
+
+    # The row was added without counters, so they hold only the change from (4, 1) to (10, 1)
+    counters = db_session.query(models.KPICounter).filter(models.KPICounter.warehouse_id == warehouse_id).one()
+    assert (counters.total_quantity, counters.low_stock_items) == (9, 1)
+
+
+def test_low_stock_list(client: TestClient, db_session, inventory):
+    first, second, third = inventory["product_ids"]
+    main, other = inventory["warehouse_id"], inventory["second_warehouse_id"]
+    db_session.add_all([
+        models.StockLevel(product_id=first, warehouse_id=main, quantity=2, reorder_point=10),   # shortfall 8
+        models.StockLevel(product_id=second, warehouse_id=main, quantity=5, reorder_point=5),   # shortfall 0
+        models.StockLevel(product_id=third, warehouse_id=main, quantity=0, reorder_point=5),    # out of stock
+        models.StockLevel(product_id=first, warehouse_id=other, quantity=9, reorder_point=12),  # shortfall 3
+        models.StockLevel(product_id=second, warehouse_id=other, quantity=20, reorder_point=5), # fine
+    ])
+    db_session.commit()
+
+    first_page = client.get("/stock/low", params={"limit": 2})
+    assert first_page.status_code == 200
+    assert [(item["product_id"], item["warehouse_id"], item["shortfall"]) for item in first_page.json()] == [
+        (first, main, 8), (first, other, 3),
+    ]
+    assert first_page.json()[0]["sku_code"] == "SKU-1"
+
+    second_page = client.get("/stock/low", params={"limit": 2, "cursor": first_page.headers["X-Next-Cursor"]})
+    assert [(item["product_id"], item["shortfall"]) for item in second_page.json()] == [(second, 0)]
+    assert "X-Next-Cursor" not in second_page.headers
+
+    assert [item["product_id"] for item in client.get("/stock/low", params={"warehouse_id": other}).json()] == [first]
+    assert client.get("/stock/low", params={"cursor": "nonsense"}).status_code == 400
+
+
+def test_low_stock_follows_stock_changes(client: TestClient, db_session, inventory):
+    product_id, warehouse_id = inventory["product_ids"][1], inventory["warehouse_id"]
+    db_session.add(models.StockLevel(product_id=product_id, warehouse_id=warehouse_id, quantity=10, reorder_point=4))
+    db_session.commit()
+    assert client.get("/stock/low").json() == []
+
+    delivery_id = create_delivery(client, inventory, [{"product_id": product_id, "quantity_delivered": 7}])
+    assert client.put(f"/deliveries/{delivery_id}/validate").status_code == 200
+    assert [(item["product_id"], item["quantity"], item["shortfall"]) for item in client.get("/stock/low").json()] == [
+        (product_id, 3, 1),
+    ]
+
+
+def test_low_stock_query_reads_partial_index(db_session, inventory):
+    statement = select(models.StockLevel.id).filter(models.LOW_STOCK_CONDITION).order_by(
+        SHORTFALL.desc(), models.StockLevel.id.desc()
+    ).limit(10)
+    compiled = statement.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = " ".join(str(row[-1]) for row in db_session.execute(f"EXPLAIN QUERY PLAN {compiled}"))
+    assert "ix_stock_levels_low_stock_shortfall" in plan
+    assert "TEMP B-TREE" not in plan  # No sort: the index provides the order
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+
+from ..app import synthetic
+from ..app.database import Base
+
+OPTIONS = synthetic.GeneratorOptions(
+    seed=7, products=200, warehouses=3, locations_per_warehouse=2, suppliers=5,
+    ledger_rows=5000, years=1, end=datetime(2025, 1, 1), pending_documents=10, batch_size=500,
+)
+USERS = [("a@example.com", "-"), ("b@example.com", "-")]
+
+
+def generate_into_memory(options, foreign_keys=False):
+    engine = create_engine("sqlite://")
+    if foreign_keys:
+        event.listen(engine, "connect", lambda dbapi_conn, _: dbapi_conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        counts = synthetic.generate(conn, options, USERS)
+    return engine, counts
+
+
+def test_generated_stock_matches_ledger():
+    engine, counts = generate_into_memory(OPTIONS)
+    assert counts["stock_ledger_entries"] >= OPTIONS.ledger_rows
+    assert counts["products"] == OPTIONS.products
+
+    with engine.connect() as conn:
+        assert synthetic.stock_level_mismatches(conn) == []
+        assert conn.execute(text("SELECT MIN(new_stock_level) FROM stock_ledger_entries")).scalar() >= 0
+        # Every line's ledger entries belong to a document that exists
+        assert conn.execute(text(
+            "SELECT COUNT(*) FROM stock_ledger_entries l WHERE l.document_type = 'Delivery' "
+            "AND NOT EXISTS (SELECT 1 FROM delivery_orders d WHERE d.id = l.document_id)"
+        )).scalar() == 0
+        assert conn.execute(text("SELECT COUNT(*) FROM receipts WHERE status <> 'Done'")).scalar() > 0
+
+
+def test_rows_are_written_after_the_rows_they_reference():
+    # Small batches flush mid-document; with foreign keys enforced (as on PostgreSQL) a line
+    # written before its document, or a document before its user, fails the insert
+    engine, counts = generate_into_memory(OPTIONS._replace(batch_size=7), foreign_keys=True)
+    assert counts == generate_into_memory(OPTIONS)[1]
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+
+
+def test_product_popularity_is_skewed():
+    engine, _ = generate_into_memory(OPTIONS)
+    with engine.connect() as conn:
+        per_product = [row[0] for row in conn.execute(text(
+            "SELECT COUNT(*) FROM stock_ledger_entries GROUP BY product_id ORDER BY COUNT(*) DESC"
+        ))]
+    # With a Zipf exponent above 1, the top 5% of products carry most of the movements
+    top = per_product[:OPTIONS.products // 20]
+    assert sum(top) > 0.5 * sum(per_product)
+
+
+def test_same_seed_gives_same_data():
+    query = text("SELECT * FROM stock_ledger_entries ORDER BY id")
+    first, _ = generate_into_memory(OPTIONS)
+    second, _ = generate_into_memory(OPTIONS)
+    other, _ = generate_into_memory(OPTIONS._replace(seed=8))
+    with first.connect() as a, second.connect() as b, other.connect() as c:
+        rows = a.execute(query).all()
+        assert rows == b.execute(query).all()
+        assert rows != c.execute(query).all()
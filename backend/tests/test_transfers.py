@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from ..app import models
+
+
+def test_list_transfers_warehouse_filter_matches_either_side(client: TestClient, db_session, inventory):
+    main, second = inventory["warehouse_id"], inventory["second_warehouse_id"]
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    db_session.add_all([
+        models.InternalTransfer(id=1, created_by=inventory["user_id"], from_warehouse_id=main, to_warehouse_id=second, created_at=created),
+        models.InternalTransfer(id=2, created_by=inventory["user_id"], from_warehouse_id=second, to_warehouse_id=main, created_at=created + timedelta(minutes=1)),
+        models.InternalTransfer(id=3, created_by=inventory["user_id"], from_warehouse_id=second, to_warehouse_id=second, created_at=created + timedelta(minutes=2)),
+    ])
+    db_session.commit()
+
+    response = client.get("/transfers/", params={"warehouse_id": main})
+    assert response.status_code == 200
+    assert [transfer["id"] for transfer in response.json()] == [2, 1]
+
+    response = client.get("/transfers/", params={"date_from": (created + timedelta(minutes=1)).isoformat()})
+    assert [transfer["id"] for transfer in response.json()] == [3, 2]
+
+
+def test_complete_transfers_batch_uses_stock_moved_in_earlier(client: TestClient, db_session, inventory):
+    main, second = inventory["warehouse_id"], inventory["second_warehouse_id"]
+    product_id = inventory["product_ids"][0]
+    db_session.add(models.StockLevel(product_id=product_id, warehouse_id=main, quantity=5, reorder_point=0))
+    db_session.commit()
+
+    def create_transfer(from_warehouse_id, to_warehouse_id, quantity):
+        response = client.post("/transfers/", json={
+            "from_warehouse_id": from_warehouse_id,
+            "to_warehouse_id": to_warehouse_id,
+            "transfer_items": [{"product_id": product_id, "quantity": quantity}],
+        })
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    # The second transfer ships on stock the first one brings in; the third asks for more than is left
+    transfers = [create_transfer(main, second, 5), create_transfer(second, main, 3), create_transfer(second, main, 3)]
+    response = client.post("/transfers/complete-batch", json={"document_ids": transfers})
+    assert response.status_code == 200
+    assert [(result["validated"], result["error"]) for result in response.json()["results"]] == [
+        (True, None),
+        (True, None),
+        (False, "Insufficient stock for product Product 1 in source warehouse. Available: 2, Required: 3"),
+    ]
+
+    db_session.expire_all()
+    levels = {level.warehouse_id: level.quantity for level in db_session.query(models.StockLevel)}
+    assert levels == {main: 3, second: 2}
+    assert client.get(f"/transfers/{transfers[0]}").json()["status"] == "Done"
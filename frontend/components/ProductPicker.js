@@ -0,0 +1,60 @@
+import { useState, useEffect } from 'react';
+import { productsAPI } from '../lib/api';
+
+// Product select for document lines: typing searches the products on the server
+// (name or SKU, best matches first), so the catalog is never loaded in full.
+export default function ProductPicker({ value, onChange, required }) {
+  const [term, setTerm] = useState('');
+  const [options, setOptions] = useState([]);
+  const [selected, setSelected] = useState(null);
+
+  useEffect(() => {
+    let current = true;
+    // Wait for a pause in typing instead of searching on every key
+    const timer = setTimeout(async () => {
+      try {
+        const response = await productsAPI.search(term.trim());
+        if (current) setOptions(response.data);
+      } catch (err) {
+        console.error('Error searching products:', err);
+      }
+    }, 250);
+    return () => {
+      current = false;
+      clearTimeout(timer);
+    };
+  }, [term]);
+
+  useEffect(() => {
+    if (!value) setSelected(null);
+  }, [value]);
+
+  // The chosen product stays selectable when a new search no longer returns it
+  const choices = selected && !options.some(p => p.id === selected.id) ? [selected, ...options] : options;
+
+  return (
+    <div style={{ display: 'grid', gridTemplateColumns: '1fr 2fr', gap: '10px' }}>
+      <input
+        type="search"
+        placeholder="Search name or SKU"
+        value={term}
+        onChange={(e) => setTerm(e.target.value)}
+        style={{ padding: '8px', border: '1px solid #ddd', borderRadius: '4px' }}
+      />
+      <select
+        value={value}
+        onChange={(e) => {
+          setSelected(choices.find(p => p.id === parseInt(e.target.value)) || null);
+          onChange(e.target.value);
+        }}
+        required={required}
+        style={{ padding: '8px', border: '1px solid #ddd', borderRadius: '4px' }}
+      >
+        <option value="">Select Product</option>
+        {choices.map(product => (
+          <option key={product.id} value={product.id}>{product.name} ({product.sku_code})</option>
+        ))}
+      </select>
+    </div>
+  );
+}
@@ -19,6 +19,20 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// List endpoints return one page at a time (at most PAGE_SIZE rows)
+const PAGE_SIZE = 100;
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+// Product pickers show the best matches of the typed text, not the catalog
+const SEARCH_LIMIT = 20;
+
+// Document lists and the ledger are cursor-paginated: the X-Next-Cursor header holds the
+// cursor of the next page and is absent on the last one. Pages load on demand ("Load more").
+// Resolves to { data, nextCursor }; nextCursor is undefined on the last page.
+const getPage = async (url, params = {}, cursor) => {
+  const response = await api.get(url, { params: { ...params, limit: PAGE_SIZE, ...(cursor && { cursor }) } });
+  return { data: response.data, nextCursor: response.headers[NEXT_CURSOR_HEADER] };
+};
+
 // Auth API
 export const authAPI = {
   signup: (data) => api.post('/auth/signup', data),
@@ -35,7 +49,13 @@ export const dashboardAPI = {
 
 // Products API
 export const productsAPI = {
-  getAll: (params) => api.get('/products', { params }),
+  // Products are paginated by offset, in id order. Resolves to { data, nextSkip };
+  // nextSkip is null once a short page shows there is nothing more.
+  getPage: async (params, skip = 0) => {
+    const response = await api.get('/products', { params: { ...params, skip, limit: PAGE_SIZE } });
+    return { data: response.data, nextSkip: response.data.length < PAGE_SIZE ? null : skip + PAGE_SIZE };
+  },
+  search: (term) => api.get('/products', { params: { ...(term && { search: term }), limit: SEARCH_LIMIT } }),
   getById: (id) => api.get(`/products/${id}`),
   create: (data) => api.post('/products', data),
   update: (id, data) => api.put(`/products/${id}`, data),
@@ -43,7 +63,7 @@ export const productsAPI = {
 
 // Receipts API
 export const receiptsAPI = {
-  getAll: () => api.get('/receipts'),
+  getPage: (cursor) => getPage('/receipts', {}, cursor),
   getById: (id) => api.get(`/receipts/${id}`),
   create: (data) => api.post('/receipts', data),
   validate: (id) => api.put(`/receipts/${id}/validate`),
@@ -51,7 +71,7 @@ export const receiptsAPI = {
 
 // Deliveries API
 export const deliveriesAPI = {
-  getAll: () => api.get('/deliveries'),
+  getPage: (cursor) => getPage('/deliveries', {}, cursor),
   getById: (id) => api.get(`/deliveries/${id}`),
   create: (data) => api.post('/deliveries', data),
   validate: (id) => api.put(`/deliveries/${id}/validate`),
@@ -59,7 +79,7 @@ export const deliveriesAPI = {
 
 // Transfers API
 export const transfersAPI = {
-  getAll: () => api.get('/transfers'),
+  getPage: (cursor) => getPage('/transfers', {}, cursor),
   getById: (id) => api.get(`/transfers/${id}`),
   create: (data) => api.post('/transfers', data),
   complete: (id) => api.put(`/transfers/${id}/complete`),
@@ -67,14 +87,15 @@ export const transfersAPI = {
 
 // Adjustments API
 export const adjustmentsAPI = {
-  getAll: () => api.get('/adjustments'),
+  getPage: (cursor) => getPage('/adjustments', {}, cursor),
   getById: (id) => api.get(`/adjustments/${id}`),
   create: (data) => api.post('/adjustments', data),
 };
 
 // Ledger API
 export const ledgerAPI = {
-  getAll: (params) => api.get('/ledger', { params }),
+  // Newest first
+  getPage: (params, cursor) => getPage('/ledger', params, cursor),
 };
 
 // Warehouses API
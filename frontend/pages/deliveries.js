@@ -1,12 +1,14 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/router';
 import Layout from '../components/Layout';
-import { deliveriesAPI, productsAPI, warehousesAPI } from '../lib/api';
+import ProductPicker from '../components/ProductPicker';
+import { deliveriesAPI, warehousesAPI } from '../lib/api';
 
 export default function DeliveriesPage() {
   const router = useRouter();
   const [deliveries, setDeliveries] = useState([]);
-  const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [warehouses, setWarehouses] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -19,15 +21,15 @@ export default function DeliveriesPage() {
 
   useEffect(() => {
     fetchDeliveries();
-    fetchProducts();
     fetchWarehouses();
   }, []);
 
   const fetchDeliveries = async () => {
     try {
       setLoading(true);
-      const response = await deliveriesAPI.getAll();
-      setDeliveries(response.data);
+      const page = await deliveriesAPI.getPage();
+      setDeliveries(page.data);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to fetch deliveries');
     } finally {
@@ -35,12 +37,16 @@ export default function DeliveriesPage() {
     }
   };
 
-  const fetchProducts = async () => {
+  const loadMore = async () => {
     try {
-      const response = await productsAPI.getAll();
-      setProducts(response.data);
+      setLoadingMore(true);
+      const page = await deliveriesAPI.getPage(nextCursor);
+      setDeliveries([...deliveries, ...page.data]);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
-      console.error('Error fetching products:', err);
+      setError(err.response?.data?.detail || 'Failed to fetch deliveries');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -85,10 +91,9 @@ export default function DeliveriesPage() {
     }
   };
 
-  const getProductName = (id) => {
-    const product = products.find(p => p.id === id);
-    return product ? `${product.name} (${product.sku_code})` : `Product #${id}`;
-  };
+  const getProductName = (item) => (
+    item.product ? `${item.product.name} (${item.product.sku_code})` : `Product #${item.product_id}`
+  );
 
   const getWarehouseName = (id) => {
     const warehouse = warehouses.find(w => w.id === id);
@@ -142,21 +147,15 @@ export default function DeliveriesPage() {
               <label style={{ display: 'block', marginBottom: '10px', fontWeight: 'bold' }}>Products</label>
               {newDelivery.delivery_items.map((item, index) => (
                 <div key={index} style={{ display: 'grid', gridTemplateColumns: '2fr 1fr auto', gap: '10px', marginBottom: '10px' }}>
-                  <select
+                  <ProductPicker
                     value={item.product_id}
-                    onChange={(e) => {
+                    onChange={(productId) => {
                       const items = [...newDelivery.delivery_items];
-                      items[index].product_id = e.target.value;
+                      items[index].product_id = productId;
                       setNewDelivery({ ...newDelivery, delivery_items: items });
                     }}
                     required
-                    style={{ padding: '8px', border: '1px solid #ddd', borderRadius: '4px' }}
-                  >
-                    <option value="">Select Product</option>
-                    {products.map(product => (
-                      <option key={product.id} value={product.id}>{product.name} ({product.sku_code})</option>
-                    ))}
-                  </select>
+                  />
                   <input
                     type="number"
                     placeholder="Quantity"
@@ -243,7 +242,7 @@ export default function DeliveriesPage() {
                   <td style={{ padding: '12px' }}>
                     {delivery.delivery_items?.map(item => (
                       <div key={item.id} style={{ fontSize: '12px' }}>
-                        {getProductName(item.product_id)}: {item.quantity_delivered}
+                        {getProductName(item)}: {item.quantity_delivered}
                       </div>
                     ))}
                   </td>
@@ -272,6 +271,18 @@ export default function DeliveriesPage() {
           {deliveries.length === 0 && (
             <div style={{ padding: '40px', textAlign: 'center', color: '#7f8c8d' }}>No deliveries found</div>
           )}
+          {nextCursor && (
+            <div style={{ padding: '20px', textAlign: 'center' }}>
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={{ padding: '10px 20px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </Layout>
@@ -7,6 +7,8 @@ import { isAuthenticated } from '../lib/auth';
 export default function LedgerPage() {
   const router = useRouter();
   const [entries, setEntries] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [filters, setFilters] = useState({
@@ -21,14 +23,16 @@ export default function LedgerPage() {
     fetchLedger();
   }, [filters]);
 
+  const activeFilters = () => Object.fromEntries(
+    Object.entries(filters).filter(([_, v]) => v !== '')
+  );
+
   const fetchLedger = async () => {
     try {
       setLoading(true);
-      const params = Object.fromEntries(
-        Object.entries(filters).filter(([_, v]) => v !== '')
-      );
-      const response = await ledgerAPI.getAll(params);
-      setEntries(response.data);
+      const page = await ledgerAPI.getPage(activeFilters());
+      setEntries(page.data);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to fetch ledger entries');
     } finally {
@@ -36,6 +40,19 @@ export default function LedgerPage() {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await ledgerAPI.getPage(activeFilters(), nextCursor);
+      setEntries([...entries, ...page.data]);
+      setNextCursor(page.nextCursor || null);
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to fetch ledger entries');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Authentication bypassed for local development
 
   return (
@@ -152,6 +169,18 @@ export default function LedgerPage() {
           {entries.length === 0 && (
             <div style={{ padding: '40px', textAlign: 'center', color: '#7f8c8d' }}>No ledger entries found</div>
           )}
+          {nextCursor && (
+            <div style={{ padding: '20px', textAlign: 'center' }}>
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={{ padding: '10px 20px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </Layout>
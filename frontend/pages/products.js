@@ -8,6 +8,8 @@ import { isAuthenticated } from '../lib/auth';
 export default function ProductsPage() {
   const router = useRouter();
   const [products, setProducts] = useState([]);
+  const [nextSkip, setNextSkip] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -29,8 +31,8 @@ export default function ProductsPage() {
 
   const fetchCategories = async () => {
     try {
-      // Fetch products to extract unique categories
-      const response = await productsAPI.getAll();
+      // Extract unique categories from the first page of products
+      const response = await productsAPI.getPage();
       const uniqueCategories = {};
       response.data.forEach(product => {
         if (product.category && !uniqueCategories[product.category.id]) {
@@ -54,9 +56,9 @@ export default function ProductsPage() {
   const fetchProducts = async () => {
     try {
       setLoading(true);
-      const params = searchTerm ? { search: searchTerm } : {};
-      const response = await productsAPI.getAll(params);
-      setProducts(response.data);
+      const page = await productsAPI.getPage(searchParams());
+      setProducts(page.data);
+      setNextSkip(page.nextSkip);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to fetch products');
     } finally {
@@ -64,6 +66,21 @@ export default function ProductsPage() {
     }
   };
 
+  const searchParams = () => (searchTerm ? { search: searchTerm } : {});
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await productsAPI.getPage(searchParams(), nextSkip);
+      setProducts([...products, ...page.data]);
+      setNextSkip(page.nextSkip);
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to fetch products');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearch = (e) => {
     e.preventDefault();
     fetchProducts();
@@ -267,6 +284,18 @@ export default function ProductsPage() {
           {products.length === 0 && (
             <div style={{ padding: '40px', textAlign: 'center', color: '#7f8c8d' }}>No products found</div>
           )}
+          {nextSkip !== null && (
+            <div style={{ padding: '20px', textAlign: 'center' }}>
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={{ padding: '10px 20px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </Layout>
@@ -1,12 +1,14 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/router';
 import Layout from '../components/Layout';
-import { receiptsAPI, productsAPI, suppliersAPI, warehousesAPI } from '../lib/api';
+import ProductPicker from '../components/ProductPicker';
+import { receiptsAPI, suppliersAPI, warehousesAPI } from '../lib/api';
 
 export default function ReceiptsPage() {
   const router = useRouter();
   const [receipts, setReceipts] = useState([]);
-  const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [suppliers, setSuppliers] = useState([]);
   const [warehouses, setWarehouses] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -21,7 +23,6 @@ export default function ReceiptsPage() {
 
   useEffect(() => {
     fetchReceipts();
-    fetchProducts();
     fetchSuppliers();
     fetchWarehouses();
   }, []);
@@ -29,8 +30,9 @@ export default function ReceiptsPage() {
   const fetchReceipts = async () => {
     try {
       setLoading(true);
-      const response = await receiptsAPI.getAll();
-      setReceipts(response.data);
+      const page = await receiptsAPI.getPage();
+      setReceipts(page.data);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to fetch receipts');
     } finally {
@@ -38,12 +40,16 @@ export default function ReceiptsPage() {
     }
   };
 
-  const fetchProducts = async () => {
+  const loadMore = async () => {
     try {
-      const response = await productsAPI.getAll();
-      setProducts(response.data);
+      setLoadingMore(true);
+      const page = await receiptsAPI.getPage(nextCursor);
+      setReceipts([...receipts, ...page.data]);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
-      console.error('Error fetching products:', err);
+      setError(err.response?.data?.detail || 'Failed to fetch receipts');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -98,10 +104,9 @@ export default function ReceiptsPage() {
     }
   };
 
-  const getProductName = (id) => {
-    const product = products.find(p => p.id === id);
-    return product ? `${product.name} (${product.sku_code})` : `Product #${id}`;
-  };
+  const getProductName = (item) => (
+    item.product ? `${item.product.name} (${item.product.sku_code})` : `Product #${item.product_id}`
+  );
 
   const getSupplierName = (id) => {
     const supplier = suppliers.find(s => s.id === id);
@@ -176,21 +181,15 @@ export default function ReceiptsPage() {
               <label style={{ display: 'block', marginBottom: '10px', fontWeight: 'bold' }}>Products</label>
               {newReceipt.receipt_items.map((item, index) => (
                 <div key={index} style={{ display: 'grid', gridTemplateColumns: '2fr 1fr auto', gap: '10px', marginBottom: '10px' }}>
-                  <select
+                  <ProductPicker
                     value={item.product_id}
-                    onChange={(e) => {
+                    onChange={(productId) => {
                       const items = [...newReceipt.receipt_items];
-                      items[index].product_id = e.target.value;
+                      items[index].product_id = productId;
                       setNewReceipt({ ...newReceipt, receipt_items: items });
                     }}
                     required
-                    style={{ padding: '8px', border: '1px solid #ddd', borderRadius: '4px' }}
-                  >
-                    <option value="">Select Product</option>
-                    {products.map(product => (
-                      <option key={product.id} value={product.id}>{product.name} ({product.sku_code})</option>
-                    ))}
-                  </select>
+                  />
                   <input
                     type="number"
                     placeholder="Quantity"
@@ -279,7 +278,7 @@ export default function ReceiptsPage() {
                   <td style={{ padding: '12px' }}>
                     {receipt.receipt_items?.map(item => (
                       <div key={item.id} style={{ fontSize: '12px' }}>
-                        {getProductName(item.product_id)}: {item.quantity_received}
+                        {getProductName(item)}: {item.quantity_received}
                       </div>
                     ))}
                   </td>
@@ -309,6 +308,18 @@ export default function ReceiptsPage() {
           {receipts.length === 0 && (
             <div style={{ padding: '40px', textAlign: 'center', color: '#7f8c8d' }}>No receipts found</div>
           )}
+          {nextCursor && (
+            <div style={{ padding: '20px', textAlign: 'center' }}>
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={{ padding: '10px 20px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </Layout>
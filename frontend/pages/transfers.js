@@ -1,12 +1,14 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/router';
 import Layout from '../components/Layout';
-import { transfersAPI, productsAPI, warehousesAPI } from '../lib/api';
+import ProductPicker from '../components/ProductPicker';
+import { transfersAPI, warehousesAPI } from '../lib/api';
 
 export default function TransfersPage() {
   const router = useRouter();
   const [transfers, setTransfers] = useState([]);
-  const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [warehouses, setWarehouses] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -20,15 +22,15 @@ export default function TransfersPage() {
 
   useEffect(() => {
     fetchTransfers();
-    fetchProducts();
     fetchWarehouses();
   }, []);
 
   const fetchTransfers = async () => {
     try {
       setLoading(true);
-      const response = await transfersAPI.getAll();
-      setTransfers(response.data);
+      const page = await transfersAPI.getPage();
+      setTransfers(page.data);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to fetch transfers');
     } finally {
@@ -36,12 +38,16 @@ export default function TransfersPage() {
     }
   };
 
-  const fetchProducts = async () => {
+  const loadMore = async () => {
     try {
-      const response = await productsAPI.getAll();
-      setProducts(response.data);
+      setLoadingMore(true);
+      const page = await transfersAPI.getPage(nextCursor);
+      setTransfers([...transfers, ...page.data]);
+      setNextCursor(page.nextCursor || null);
     } catch (err) {
-      console.error('Error fetching products:', err);
+      setError(err.response?.data?.detail || 'Failed to fetch transfers');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -89,10 +95,9 @@ export default function TransfersPage() {
     }
   };
 
-  const getProductName = (id) => {
-    const product = products.find(p => p.id === id);
-    return product ? `${product.name} (${product.sku_code})` : `Product #${id}`;
-  };
+  const getProductName = (item) => (
+    item.product ? `${item.product.name} (${item.product.sku_code})` : `Product #${item.product_id}`
+  );
 
   const getWarehouseName = (id) => {
     const warehouse = warehouses.find(w => w.id === id);
@@ -163,21 +168,15 @@ export default function TransfersPage() {
               {newTransfer.transfer_items.map((item, index) => (
                 <div key={index} style={{ marginBottom: '15px', padding: '15px', border: '1px solid #ddd', borderRadius: '4px' }}>
                   <div style={{ display: 'grid', gridTemplateColumns: '2fr 1fr 1fr 1fr auto', gap: '10px' }}>
-                    <select
+                    <ProductPicker
                       value={item.product_id}
-                      onChange={(e) => {
+                      onChange={(productId) => {
                         const items = [...newTransfer.transfer_items];
-                        items[index].product_id = e.target.value;
+                        items[index].product_id = productId;
                         setNewTransfer({ ...newTransfer, transfer_items: items });
                       }}
                       required
-                      style={{ padding: '8px', border: '1px solid #ddd', borderRadius: '4px' }}
-                    >
-                      <option value="">Select Product</option>
-                      {products.map(product => (
-                        <option key={product.id} value={product.id}>{product.name} ({product.sku_code})</option>
-                      ))}
-                    </select>
+                    />
                     <input
                       type="number"
                       placeholder="Quantity"
@@ -289,7 +288,7 @@ export default function TransfersPage() {
                   <td style={{ padding: '12px' }}>
                     {transfer.transfer_items?.map(item => (
                       <div key={item.id} style={{ fontSize: '12px' }}>
-                        {getProductName(item.product_id)}: {item.quantity}
+                        {getProductName(item)}: {item.quantity}
                       </div>
                     ))}
                   </td>
@@ -318,6 +317,18 @@ export default function TransfersPage() {
           {transfers.length === 0 && (
             <div style={{ padding: '40px', textAlign: 'center', color: '#7f8c8d' }}>No transfers found</div>
           )}
+          {nextCursor && (
+            <div style={{ padding: '20px', textAlign: 'center' }}>
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={{ padding: '10px 20px', backgroundColor: '#3498db', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </Layout>